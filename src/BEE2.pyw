@@ -71,6 +71,8 @@ DEFAULT_SETTINGS = {
         'log_missing_ent_count': '0',
         # Warn if a file is missing that a packfile refers to
         'log_incorrect_packfile': '0',
+        # Name the item each condition came from, for VBSP's profiler
+        'tag_condition_sources': '0',
 
         # Show the log window on startup
         'show_log_win': '0',
@@ -120,6 +122,8 @@ if __name__ == '__main__':
                 'Debug', 'log_missing_ent_count'),
             log_incorrect_packfile=GEN_OPTS.get_bool(
                 'Debug', 'log_incorrect_packfile'),
+            tag_condition_sources=GEN_OPTS.get_bool(
+                'Debug', 'tag_condition_sources'),
         )
         UI.load_packages(pack_data)
         LOGGER.info('Done!')
@@ -0,0 +1,92 @@
+"""Time running many conditions, with and without instance filtering.
+
+Run from the src/ folder:
+    python -m bench.conditions [conditions] [instances]
+"""
+import random
+import sys
+
+from property_parser import Property
+from bench.property_parse import best_time
+import conditions
+import conditions.instances  # Register the instance flags.
+import vmfLib
+
+FILES = [
+    'instances/bench/item_{}.vmf'.format(i)
+    for i in range(60)
+]
+
+# (condition, instance) pairs from the result below.
+RAN = []
+
+
+@conditions.make_result('BenchRecord')
+def res_record(inst, res):
+    RAN.append((res.value, inst['targetname']))
+
+
+def make_conditions(count, seed=0):
+    """Build conditions like a style config, mostly for single items."""
+    rand = random.Random(seed)
+    conds = []
+    for i in range(count):
+        kind = rand.random()
+        if kind < 0.7:
+            flags = [Property('instance', rand.choice(FILES))]
+        elif kind < 0.9:
+            flags = [Property('instFlag', 'item_' + str(rand.randrange(60)))]
+        else:
+            # Can't be filtered, so every instance is checked.
+            flags = [Property('hasInst', rand.choice(FILES))]
+        flags.append(Property('instVar', '$bench ' + str(rand.randrange(4))))
+        conds.append(conditions.Condition(
+            flags=flags,
+            results=[Property('BenchRecord', str(i))],
+        ))
+    return conds
+
+
+def make_map(instances, seed=0):
+    rand = random.Random(seed)
+    vmf = vmfLib.VMF()
+    for i in range(instances):
+        inst = vmf.create_ent(
+            classname='func_instance',
+            targetname='inst_' + str(i),
+            file=rand.choice(FILES),
+            origin='0 0 0',
+        )
+        inst.fixup['bench'] = str(rand.randrange(4))
+    return vmf
+
+
+def run(conds):
+    RAN.clear()
+    for cond in conds:
+        conditions.check_condition(cond)
+
+
+def main(cond_count=500, instances=2000):
+    conditions.VMF = make_map(instances)
+    conds = make_conditions(cond_count)
+    unfiltered = make_conditions(cond_count)
+    for cond in unfiltered:
+        cond._file_filters = []
+
+    run(conds)
+    new_ran = sorted(RAN)
+    run(unfiltered)
+    if sorted(RAN) != new_ran:
+        raise AssertionError('Filtering changed the results!')
+
+    old_time = best_time(run, unfiltered)
+    new_time = best_time(run, conds)
+    print('{} conditions, {} instances'.format(cond_count, instances))
+    print('Unfiltered: {:.3f}s'.format(old_time))
+    print('Filtered:   {:.3f}s'.format(new_time))
+    print('Speedup:    {:.2f}x'.format(old_time / new_time))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
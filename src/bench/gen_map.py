@@ -0,0 +1,134 @@
+"""Generate large synthetic VMF files for the benchmarks.
+
+This produces text in the same layout Hammer and the BEE2 write, with a
+grid of cube brushes and a set of instances with fixups and outputs.
+"""
+import random
+
+MATERIALS = [
+    'tile/white_wall_tile003a',
+    'tile/white_floor_tile002a',
+    'metal/black_wall_metal_002c',
+    'metal/black_floor_metal_001c',
+    'tools/toolsnodraw',
+    'anim_wp/framework/backpanels_cheap',
+]
+
+INSTANCES = [
+    'instances/p2editor/cube.vmf',
+    'instances/p2editor/button_floor.vmf',
+    'instances/p2editor/light_strip.vmf',
+    'instances/p2editor/glass_128x128.vmf',
+    'instances/bee2/clean/ceiling_light.vmf',
+]
+
+# (normal, uaxis, vaxis) for each cube face.
+_FACES = [
+    ((0, 0, 1), '[1 0 0 0] 0.25', '[0 -1 0 0] 0.25'),
+    ((0, 0, -1), '[1 0 0 0] 0.25', '[0 -1 0 0] 0.25'),
+    ((-1, 0, 0), '[0 1 0 0] 0.25', '[0 0 -1 0] 0.25'),
+    ((1, 0, 0), '[0 1 0 0] 0.25', '[0 0 -1 0] 0.25'),
+    ((0, 1, 0), '[1 0 0 0] 0.25', '[0 0 -1 0] 0.25'),
+    ((0, -1, 0), '[1 0 0 0] 0.25', '[0 0 -1 0] 0.25'),
+]
+
+
+def _planes(x, y, z, normal):
+    """Produce a plane string for one face of a 128 cube."""
+    x1, y1, z1 = x + 128, y + 128, z + 128
+    nx, ny, nz = normal
+    if nz == 1:
+        pts = ((x, y1, z1), (x1, y1, z1), (x1, y, z1))
+    elif nz == -1:
+        pts = ((x, y, z), (x1, y, z), (x1, y1, z))
+    elif nx == -1:
+        pts = ((x, y1, z1), (x, y, z1), (x, y, z))
+    elif nx == 1:
+        pts = ((x1, y1, z), (x1, y, z), (x1, y, z1))
+    elif ny == 1:
+        pts = ((x, y1, z), (x1, y1, z), (x1, y1, z1))
+    else:
+        pts = ((x1, y, z), (x, y, z), (x, y, z1))
+    return ' '.join('({} {} {})'.format(*pt) for pt in pts)
+
+
+def generate_vmf(brushes=10000, instances=2000, seed=0) -> str:
+    """Build the text of a VMF with the given number of brushes and instances.
+    """
+    rand = random.Random(seed)
+    out = []
+    write = out.append
+    write('versioninfo\n{\n')
+    write('\t"editorversion" "400"\n\t"editorbuild" "5304"\n')
+    write('\t"mapversion" "12"\n\t"formatversion" "100"\n\t"prefab" "0"\n}\n')
+    write('viewsettings\n{\n\t"bSnapToGrid" "1"\n\t"bShowGrid" "1"\n')
+    write('\t"bShowLogicalGrid" "0"\n\t"nGridSpacing" "64"\n')
+    write('\t"bShow3DGrid" "0"\n}\n')
+
+    write('world\n{\n\t"id" "1"\n\t"mapversion" "12"\n')
+    write('\t"classname" "worldspawn"\n\t"skyname" "sky_black_nofog"\n')
+    side_id = 1
+    side_width = max(1, int(brushes ** (1/3)) + 1)
+    for solid_id in range(brushes):
+        x = (solid_id % side_width) * 128
+        y = (solid_id // side_width % side_width) * 128
+        z = (solid_id // side_width // side_width) * 128
+        write('\tsolid\n\t{\n\t\t"id" "' + str(solid_id + 2) + '"\n')
+        for normal, uaxis, vaxis in _FACES:
+            side_id += 1
+            write(
+                '\t\tside\n\t\t{\n'
+                '\t\t\t"id" "' + str(side_id) + '"\n'
+                '\t\t\t"plane" "' + _planes(x, y, z, normal) + '"\n'
+                '\t\t\t"material" "' + rand.choice(MATERIALS) + '"\n'
+                '\t\t\t"uaxis" "' + uaxis + '"\n'
+                '\t\t\t"vaxis" "' + vaxis + '"\n'
+                '\t\t\t"rotation" "0"\n'
+                '\t\t\t"lightmapscale" "16"\n'
+                '\t\t\t"smoothing_groups" "0"\n'
+                '\t\t}\n'
+            )
+        write(
+            '\t\teditor\n\t\t{\n'
+            '\t\t\t"color" "0 175 108"\n'
+            '\t\t\t"visgroupshown" "1"\n'
+            '\t\t\t"visgroupautoshown" "1"\n'
+            '\t\t}\n'
+            '\t}\n'
+        )
+    write('}\n')
+
+    for ent_id in range(instances):
+        origin = '{} {} {}'.format(
+            rand.randrange(-64, 64) * 64,
+            rand.randrange(-64, 64) * 64,
+            rand.randrange(0, 16) * 64,
+        )
+        write(
+            'entity\n{\n'
+            '\t"id" "' + str(side_id + ent_id + 1) + '"\n'
+            '\t"classname" "func_instance"\n'
+            '\t"angles" "0 ' + str(rand.choice((0, 90, 180, 270))) + ' 0"\n'
+            '\t"file" "' + rand.choice(INSTANCES) + '"\n'
+            '\t"fixup_style" "0"\n'
+            '\t"origin" "' + origin + '"\n'
+            '\t"targetname" "inst_' + str(ent_id) + '"\n'
+            '\t"replace01" "$connectioncount 0"\n'
+            '\t"replace02" "$start_enabled ' + str(rand.randrange(2)) + '"\n'
+            '\t"replace03" "$timer_delay 3"\n'
+            '\tconnections\n\t{\n'
+            '\t\t"OnProxyRelay1" "inst_' + str(rand.randrange(instances)) +
+            '\x1bInput1\x1b\x1b0\x1b-1"\n'
+            '\t}\n'
+            '\teditor\n\t{\n'
+            '\t\t"color" "220 30 220"\n'
+            '\t\t"visgroupshown" "1"\n'
+            '\t\t"visgroupautoshown" "1"\n'
+            '\t\t"logicalpos" "[0 ' + str(ent_id) + ']"\n'
+            '\t}\n'
+            '}\n'
+        )
+
+    write('cameras\n{\n\t"activecamera" "-1"\n}\n')
+    write('cordons\n{\n\t"active" "0"\n}\n')
+    return ''.join(out)
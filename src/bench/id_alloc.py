@@ -0,0 +1,68 @@
+"""Time allocating lots of solid and face IDs.
+
+Run from the src/ folder:
+    python -m bench.id_alloc [solids]
+"""
+import sys
+
+from bench.property_parse import best_time
+import vmfLib
+
+
+class LegacyIDMan(set):
+    """The original IDMan, which checks every ID from 1 upward."""
+    __slots__ = ()
+
+    def get_id(self, desired=-1):
+        if desired == -1:
+            desired = 1
+
+        if desired not in self:
+            self.add(desired)
+            return desired
+
+        poss_id = 1
+        while poss_id in self:
+            poss_id += 1
+        self.add(poss_id)
+        return poss_id
+
+
+def allocate(id_man, solids):
+    """Allocate IDs like templates being copied many times.
+
+    Every so often a brush is deleted, freeing its IDs.
+    """
+    solid_ids, face_ids = id_man(), id_man()
+    allocated = []
+    for i in range(solids):
+        solid = solid_ids.get_id()
+        faces = [face_ids.get_id() for _ in range(6)]
+        if i % 64 == 63:
+            solid_ids.remove(solid)
+            for face in faces:
+                face_ids.remove(face)
+        allocated.append(solid)
+    return allocated
+
+
+def main(solids=200000):
+    print('Allocating {} solid, {} face IDs'.format(solids, solids * 6))
+    # The old version is quadratic - time a smaller run and scale it.
+    legacy_count = min(solids, 1000)
+    if allocate(LegacyIDMan, legacy_count) != allocate(
+            vmfLib.IDMan, legacy_count):
+        raise AssertionError('Different IDs were allocated!')
+
+    old_time = best_time(allocate, LegacyIDMan, legacy_count, repeat=1)
+    new_time = best_time(allocate, vmfLib.IDMan, solids)
+    print('Old ({} solids): {:.3f}s'.format(legacy_count, old_time))
+    print('New ({} solids): {:.3f}s'.format(solids, new_time))
+    print('Per solid: {:.2f}us -> {:.2f}us'.format(
+        old_time / legacy_count * 1e6,
+        new_time / solids * 1e6,
+    ))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,139 @@
+"""Compare Property.export_to() with the old recursive generator export.
+
+Run from the src/ folder:
+    python -m bench.property_export [items]
+"""
+import io
+import random
+import sys
+
+from property_parser import Property
+from bench.property_parse import best_time
+
+
+def legacy_export(prop: Property):
+    """The original generator-based Property.export()."""
+    if isinstance(prop.value, list):
+        if prop.name is None:
+            for child in prop.value:
+                yield from legacy_export(child)
+        else:
+            yield '"' + prop.real_name + '"\n'
+            yield '\t{\n'
+            yield from (
+                '\t' + line
+                for child in prop.value
+                for line in legacy_export(child)
+                )
+            yield '\t}\n'
+    else:
+        yield '"' + prop.real_name + '" "' + str(prop.value) + '"\n'
+
+
+def generate_editoritems(items=500, seed=0) -> Property:
+    """Build a tree shaped like the editoritems.txt written on export."""
+    rand = random.Random(seed)
+    root = Property('ItemData', [])
+    for item_num in range(items):
+        subtypes = []
+        for sub_num in range(rand.randint(1, 4)):
+            subtypes.append(Property('SubType', [
+                Property('Name', 'PORTAL2_PuzzleEditor_Item_' + str(item_num)),
+                Property('Model', [
+                    Property('ModelName', 'item_{}_{}.3ds'.format(
+                        item_num, sub_num,
+                    )),
+                ]),
+                Property('Palette', [
+                    Property('Tooltip', 'ITEM ' + str(item_num)),
+                    Property('Image', 'palette/item_{}.png'.format(item_num)),
+                    Property('Position', '{} {} 0'.format(
+                        rand.randint(0, 3), rand.randint(0, 7),
+                    )),
+                ]),
+                Property('Sounds', [
+                    Property('SOUND_CREATED', 'P2Editor.PlaceOther'),
+                    Property('SOUND_EDITING_ACTIVATE', 'P2Editor.ExpandOther'),
+                    Property('SOUND_DELETED', 'P2Editor.RemoveOther'),
+                ]),
+                Property('Animations', [
+                    Property('ANIM_IDLE', '0'),
+                    Property('ANIM_EDITING_ACTIVATE', '1'),
+                    Property('ANIM_EDITING_DEACTIVATE', '2'),
+                ]),
+            ]))
+        instances = [
+            Property(str(inst_num), [
+                Property('Name', 'instances/bee2/item_{}_{}.vmf'.format(
+                    item_num, inst_num,
+                )),
+                Property('EntityCount', str(rand.randint(0, 30))),
+                Property('BrushCount', str(rand.randint(0, 10))),
+                Property('BrushSideCount', str(rand.randint(0, 60))),
+            ])
+            for inst_num in range(rand.randint(1, 6))
+        ]
+        root.append(Property('Item', [
+            Property('Type', 'ITEM_' + str(item_num)),
+            Property('ItemClass', 'ItemBase'),
+            Property('Editor', subtypes + [
+                Property('MovementHandle', 'HANDLE_4_DIRECTIONS'),
+                Property('DesiredFacing', 'DESIRES_UP'),
+            ]),
+            Property('Properties', [
+                Property('StartEnabled', [
+                    Property('DefaultValue', '1'),
+                    Property('Index', '1'),
+                ]),
+            ]),
+            Property('Exporting', [
+                Property('Instances', instances),
+                Property('TargetName', 'item'),
+                Property('Offset', '64 64 64'),
+                Property('OccupiedVoxels', [
+                    Property('Voxel', [
+                        Property('Pos', '0 0 0'),
+                        Property('Surface', [
+                            Property('Normal', '0 0 1'),
+                        ]),
+                    ]),
+                ]),
+            ]),
+        ]))
+    return Property(None, [root])
+
+
+def export_legacy(tree: Property):
+    buffer = io.StringIO()
+    for line in legacy_export(tree):
+        buffer.write(line)
+    return buffer.getvalue()
+
+
+def export_buffered(tree: Property):
+    buffer = io.StringIO()
+    tree.export_to(buffer)
+    return buffer.getvalue()
+
+
+def main(items=2000):
+    tree = generate_editoritems(items)
+    text = export_buffered(tree)
+    print('Generated editoritems: {:.2f}MB, {} lines'.format(
+        len(text) / 1024 / 1024,
+        text.count('\n'),
+    ))
+    if text != export_legacy(tree):
+        raise AssertionError('Exports produced different text!')
+    if ''.join(tree.export()) != text:
+        raise AssertionError('export() and export_to() differ!')
+
+    old_time = best_time(export_legacy, tree)
+    new_time = best_time(export_buffered, tree)
+    print('Generator export: {:.3f}s'.format(old_time))
+    print('Buffered export:  {:.3f}s'.format(new_time))
+    print('Speedup:          {:.2f}x'.format(old_time / new_time))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
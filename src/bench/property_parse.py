@@ -0,0 +1,202 @@
+"""Compare the buffered Property.parse() with the old line-by-line parser.
+
+Run from the src/ folder:
+    python -m bench.property_parse [brushes] [instances]
+"""
+import sys
+import time
+
+from property_parser import (
+    Property, KeyValError,
+    REPLACE_CHARS, _RE_IDENTIFIER, read_flag,
+)
+from bench.gen_map import generate_vmf
+
+
+def legacy_read_multiline_value(file, line_num, filename):
+    """Pull lines out until a quote character is reached."""
+    lines = ['']  # We return with a beginning newline
+    # Re-looping over the same iterator means we don't repeat lines
+    for line_num, line in file:
+        if isinstance(line, bytes):
+            # Decode bytes using utf-8
+            line = line.decode('utf-8')
+        line = line.strip()
+        if line.endswith('"'):
+            lines.append(line[:-1])
+            return '\n'.join(lines)
+        lines.append(line)
+    else:
+        # We hit EOF!
+        raise KeyValError(
+            "Reached EOF without ending quote!",
+            filename,
+            line_num,
+        )
+
+
+def legacy_parse(file_contents, filename='') -> Property:
+    """The original line-based Property.parse().
+
+    filename, if set should be the source of the text for debug purposes.
+    file_contents should be an iterable of strings
+    """
+
+    file_iter = enumerate(file_contents, start=1)
+
+    # The block we are currently adding to.
+
+    # The special name 'None' marks it as the root property, which
+    # just outputs its children when exported. This way we can handle
+    # multiple root blocks in the file, while still returning a single
+    # Property object which has all the methods.
+    cur_block = Property(None, [])
+
+    # A queue of the properties we are currently in (outside to inside).
+    open_properties = [cur_block]
+
+    # Do we require a block to be opened next? ("name"\n must have { next.)
+    requires_block = False
+
+    is_identifier = _RE_IDENTIFIER.match
+
+    for line_num, line in file_iter:
+        if isinstance(line, bytes):
+            # Decode bytes using utf-8
+            line = line.decode('utf-8')
+        freshline = line.strip()
+
+        if not freshline or freshline[:2] == '//':
+            # Skip blank lines and comments!
+            continue
+
+        if freshline[0] == '"':   # data string
+            line_contents = freshline.split('"')
+            name = line_contents[1]
+            try:
+                value = line_contents[3]
+            except IndexError:  # It doesn't have a value - it's a block.
+                cur_block.append(Property(name, ''))
+                requires_block = True  # Ensure the next token must be a '{'.
+                continue  # Ensure we skip the check for the above value
+
+            # Special case - comment between name/value sections -
+            # it's a name block then.
+            if line_contents[2].lstrip().startswith('//'):
+                cur_block.append(Property(name, ''))
+                requires_block = True
+                continue
+            else:
+                if len(line_contents) < 5:
+                    # It's a multiline value - no ending quote!
+                    value += legacy_read_multiline_value(
+                        file_iter,
+                        line_num,
+                        filename,
+                    )
+                if value and '\\' in value:
+                    for orig, new in REPLACE_CHARS.items():
+                        value = value.replace(orig, new)
+
+            # Line_contents[4] is the start of the comment, check for [] flags.
+            if len(line_contents) >= 5:
+                if read_flag(line_contents[4], filename, line_num):
+                    cur_block.append(Property(name, value))
+            else:
+                # No flag, add unconditionally
+                cur_block.append(Property(name, value))
+
+        elif freshline[0] == '{':
+            # Open a new block - make sure the last token was a name..
+            if not requires_block:
+                raise KeyValError(
+                    'Property cannot have sub-section if it already '
+                    'has an in-line value.',
+                    filename,
+                    line_num,
+                )
+            requires_block = False
+            cur_block = cur_block[-1]
+            cur_block.value = []
+            open_properties.append(cur_block)
+        elif freshline[0] == '}':
+            # Move back a block
+            open_properties.pop()
+            try:
+                cur_block = open_properties[-1].value
+            except IndexError:
+                # No open blocks!
+                raise KeyValError(
+                    'Too many closing brackets.',
+                    filename,
+                    line_num,
+                )
+
+        # Handle name bare on one line - it's a name block. This is used
+        # in VMF files...
+        elif is_identifier(freshline):
+            cur_block.append(Property(freshline, ''))
+            requires_block = True
+            continue
+        else:
+            raise KeyValError(
+                "Unexpected beginning character '"
+                + freshline[0]
+                + '"!',
+                filename,
+                line_num,
+            )
+
+        # A "name" line was found, but it wasn't followed by '{'!
+        if requires_block:
+            raise KeyValError(
+                "Block opening ('{') required!",
+                filename,
+                line_num,
+            )
+
+    if len(open_properties) > 1:
+        raise KeyValError(
+            'End of text reached with remaining open sections.',
+            filename,
+            line=None,
+        )
+    return open_properties[0]
+
+
+def best_time(func, *args, repeat=3):
+    """Return the fastest of several runs of func(*args).
+
+    Unlike timeit, this leaves the garbage collector enabled - the cost of
+    collections while building large trees is part of what we measure.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(brushes=10000, instances=2000):
+    text = generate_vmf(brushes, instances)
+    lines = text.splitlines(keepends=True)
+    print('Generated VMF: {:.2f}MB, {} lines'.format(
+        len(text) / 1024 / 1024,
+        len(lines),
+    ))
+
+    new_tree = Property.parse(text)
+    old_tree = legacy_parse(lines)
+    if ''.join(new_tree.export()) != ''.join(old_tree.export()):
+        raise AssertionError('Parsers produced different trees!')
+
+    old_time = best_time(legacy_parse, lines)
+    new_time = best_time(Property.parse, lines)
+    print('Line-based parser: {:.3f}s'.format(old_time))
+    print('Buffered parser:   {:.3f}s'.format(new_time))
+    print('Speedup:           {:.2f}x'.format(old_time / new_time))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
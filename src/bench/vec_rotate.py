@@ -0,0 +1,130 @@
+"""Compare Vec.rotate() with the old version, which rebuilt its matrices.
+
+Run from the src/ folder:
+    python -m bench.vec_rotate [points]
+"""
+import itertools
+import math
+import random
+import sys
+
+from bench.property_parse import best_time
+from utils import Vec
+
+# The angles PeTI items actually use.
+ANGLES = [
+    (pitch, yaw, roll)
+    for pitch in (0, 90, 270)
+    for yaw in (0, 90, 180, 270)
+    for roll in (0, 90, 180, 270)
+] + [(0, yaw, 0) for yaw in range(0, 360, 15)]
+
+
+def legacy_rotate(vec: Vec, pitch=0.0, yaw=0.0, roll=0.0, round_vals=True):
+    """The original Vec.rotate()."""
+    rad_pitch = math.radians(pitch)
+    rad_yaw = math.radians(yaw)
+    rad_roll = math.radians(roll)
+    cos_p = math.cos(rad_pitch)
+    cos_y = math.cos(rad_yaw)
+    cos_r = math.cos(rad_roll)
+
+    sin_p = math.sin(rad_pitch)
+    sin_y = math.sin(rad_yaw)
+    sin_r = math.sin(rad_roll)
+
+    mat_roll = (
+        1, 0, 0,
+        0, cos_r, -sin_r,
+        0, sin_r, cos_r,
+    )
+    mat_yaw = (
+        cos_y, -sin_y, 0,
+        sin_y, cos_y, 0,
+        0, 0, 1,
+    )
+    mat_pitch = (
+        cos_p, 0, sin_p,
+        0, 1, 0,
+        -sin_p, 0, cos_p,
+    )
+    vec.mat_mul(mat_roll)
+    vec.mat_mul(mat_pitch)
+    vec.mat_mul(mat_yaw)
+
+    if round_vals:
+        vec.x = round(vec.x, 3)
+        vec.y = round(vec.y, 3)
+        vec.z = round(vec.z, 3)
+    return vec
+
+
+def make_points(count, seed=0):
+    rand = random.Random(seed)
+    return [
+        Vec(
+            rand.randrange(-2048, 2048, 8),
+            rand.randrange(-2048, 2048, 16),
+            rand.randrange(-2048, 2048, 32),
+        )
+        for _ in range(count)
+    ]
+
+
+def rotate_old(points):
+    for angles, vec in zip(itertools.cycle(ANGLES), points):
+        legacy_rotate(vec.copy(), *angles)
+
+
+def rotate_new(points):
+    for angles, vec in zip(itertools.cycle(ANGLES), points):
+        vec.copy().rotate(*angles)
+
+
+def rotate_str(points):
+    for angles, vec in zip(itertools.cycle(ANGLES), points):
+        vec.copy().rotate_by_str('{} {} {}'.format(*angles))
+
+
+def rotate_many(points):
+    # Rotate in batches of 64 points sharing the same angle.
+    for ind, angles in zip(range(0, len(points), 64), itertools.cycle(ANGLES)):
+        Vec.rotate_many([vec.copy() for vec in points[ind:ind+64]], angles)
+
+
+def main(count=100000):
+    points = make_points(count)
+    # The results must match exactly, including the sign of zeros - those
+    # end up in the exported keyvalues.
+    checked = 0
+    for angles in ANGLES:
+        for vec in points[:200]:
+            old = legacy_rotate(vec.copy(), *angles)
+            new = vec.copy().rotate(*angles)
+            checked += 1
+            if old != new or str(old) != str(new):
+                raise AssertionError('{} rotated by {}: {} != {}'.format(
+                    vec, angles, old, new,
+                ))
+        [many] = Vec.rotate_many([points[0].copy()], angles)
+        if str(many) != str(legacy_rotate(points[0].copy(), *angles)):
+            raise AssertionError('rotate_many() differs for ' + str(angles))
+    print('Checked {} rotations.'.format(checked))
+
+    print('Rotating {} points:'.format(count))
+    old_time = best_time(rotate_old, points)
+    new_time = best_time(rotate_new, points)
+    print('Old rotate():    {:.3f}s'.format(old_time))
+    print('New rotate():    {:.3f}s ({:.2f}x)'.format(
+        new_time, old_time / new_time,
+    ))
+    str_time = best_time(rotate_str, points)
+    print('rotate_by_str(): {:.3f}s'.format(str_time))
+    many_time = best_time(rotate_many, points)
+    print('rotate_many():   {:.3f}s ({:.2f}x)'.format(
+        many_time, old_time / many_time,
+    ))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
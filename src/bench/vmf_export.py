@@ -0,0 +1,242 @@
+"""Compare VMF.export() with the old write-per-line exporter.
+
+Run from the src/ folder:
+    python -m bench.vmf_export [brushes] [instances]
+"""
+import io
+import operator
+import os
+import sys
+import tempfile
+
+from bench.gen_map import generate_vmf
+from bench.property_parse import best_time
+import utils
+import vmfLib
+
+
+def legacy_side(side, buffer, ind=''):
+    """The original Side.export()."""
+    buffer.write(ind + 'side\n')
+    buffer.write(ind + '{\n')
+    buffer.write(ind + '\t"id" "' + str(side.id) + '"\n')
+    pl_str = ('(' + p.join(' ') + ')' for p in side.planes)
+    buffer.write(ind + '\t"plane" "' + ' '.join(pl_str) + '"\n')
+    buffer.write(ind + '\t"material" "' + side.mat + '"\n')
+    buffer.write(ind + '\t"uaxis" "' + str(side.uaxis) + '"\n')
+    buffer.write(ind + '\t"vaxis" "' + str(side.vaxis) + '"\n')
+    buffer.write(ind + '\t"rotation" "' + str(side.ham_rot) + '"\n')
+    buffer.write(ind + '\t"lightmapscale" "' + str(side.lightmap) + '"\n')
+    buffer.write(ind + '\t"smoothing_groups" "' + str(side.smooth) + '"\n')
+    if side.is_disp:
+        raise NotImplementedError('Displacements are not generated.')
+    buffer.write(ind + '}\n')
+
+
+def legacy_solid(solid, buffer, ind=''):
+    """The original Solid.export()."""
+    if solid.hidden:
+        buffer.write(ind + 'hidden\n' + ind + '{\n')
+        ind += '\t'
+    buffer.write(ind + 'solid\n')
+    buffer.write(ind + '{\n')
+    buffer.write(ind + '\t"id" "' + str(solid.id) + '"\n')
+    for s in solid.sides:
+        legacy_side(s, buffer, ind + '\t')
+
+    buffer.write(ind + '\teditor\n')
+    buffer.write(ind + '\t{\n')
+    if 'color' in solid.editor:
+        buffer.write(
+            ind + '\t\t"color" "' +
+            solid.editor['color'] + '"\n')
+    if 'groupid' in solid.editor:
+        buffer.write(ind + '\t\t"groupid" "' +
+                     solid.editor['groupid'] + '"\n')
+    for vis_id in solid.editor.get('visgroup', []):
+        buffer.write(ind + '\t\t"groupid" "' + str(vis_id) + '"\n')
+    for key in ('visgroupshown', 'visgroupautoshown', 'cordonsolid'):
+        if key in solid.editor:
+            buffer.write(
+                ind + '\t\t"' + key + '" "' +
+                utils.bool_as_int(solid.editor[key]) +
+                '"\n'
+                )
+    buffer.write(ind + '\t}\n')
+
+    buffer.write(ind + '}\n')
+    if solid.hidden:
+        buffer.write(ind[:-1] + '}\n')
+
+
+def legacy_fixup(fixup, buffer, ind):
+    """The original EntityFixup.export()."""
+    if len(fixup._fixup):
+        for (key, value, index) in sorted(
+                fixup._fixup.values(), key=operator.attrgetter('id')):
+            buffer.write(ind + '\t"replace{:02}" "${} {}"\n'.format(
+                index, key, value))
+
+
+def legacy_output(out, buffer, ind=''):
+    """The original Output.export()."""
+    buffer.write(ind + '"' + out.exp_out())
+
+    sep = ',' if out.comma_sep else vmfLib.OUTPUT_SEP
+
+    buffer.write(
+        '" "' +
+        sep.join((
+            out.target,
+            out.exp_in(),
+            out.params,
+            str(out.delay).replace('.0', ''),
+            str(out.times),
+        )) +
+        '"\n'
+    )
+
+
+def legacy_entity(ent, buffer, ent_name='entity', ind=''):
+    """The original Entity.export()."""
+    if ent.hidden:
+        buffer.write(ind + 'hidden\n' + ind + '{\n')
+        ind += '\t'
+
+    buffer.write(ind + ent_name + '\n')
+    buffer.write(ind + '{\n')
+    buffer.write(ind + '\t"id" "' + str(ent.id) + '"\n')
+    for key, value in sorted(ent.keys.items(), key=operator.itemgetter(0)):
+        buffer.write(
+            ind +
+            '\t"{}" "{!s}"\n'.format(key, value)
+        )
+
+    legacy_fixup(ent.fixup, buffer, ind)
+
+    if ent.is_brush():
+        for s in ent.solids:
+            legacy_solid(s, buffer, ind=ind+'\t')
+    if len(ent.outputs) > 0:
+        buffer.write(ind + '\tconnections\n')
+        buffer.write(ind + '\t{\n')
+        for o in ent.outputs:
+            legacy_output(o, buffer, ind=ind+'\t\t')
+        buffer.write(ind + '\t}\n')
+
+    buffer.write(ind + '\teditor\n')
+    buffer.write(ind + '\t{\n')
+    if 'color' in ent.editor:
+        buffer.write(ind + '\t\t"color" "' + ent.editor['color'] + '"\n')
+    if 'groupid' in ent.editor:
+        buffer.write(ind + '\t\t"groupid" "' + ent.editor['groupid'] + '"\n')
+    if 'visgroup' in ent.editor:
+        for vis_id in ent.editor['visgroup']:
+            buffer.write(ind + '\t\t"groupid" "' + str(vis_id) + '"\n')
+    for key in ('visgroupshown', 'visgroupautoshown'):
+        if key in ent.editor:
+            buffer.write(
+                ind + '\t\t"' + key + '" "' +
+                utils.bool_as_int(ent.editor[key]) + '"\n'
+            )
+    for key in ('logicalpos', 'comments'):
+        if key in ent.editor:
+            buffer.write(
+                ind +
+                '\t\t"{}" "{}"\n'.format(key, ent.editor[key])
+            )
+    buffer.write(ind + '\t}\n')
+
+    buffer.write(ind + '}\n')
+    if ent.hidden:
+        buffer.write(ind[:-1] + '}\n')
+
+
+def legacy_export(vmf, dest_file):
+    """The original VMF.export(), without incrementing the version."""
+    dest_file.write('versioninfo\n{\n')
+    dest_file.write('\t"editorversion" "' + str(vmf.hammer_ver) + '"\n')
+    dest_file.write('\t"editorbuild" "' + str(vmf.hammer_build) + '"\n')
+    dest_file.write('\t"mapversion" "' + str(vmf.map_ver) + '"\n')
+    dest_file.write('\t"formatversion" "' + str(vmf.format_ver) + '"\n')
+    dest_file.write('\t"prefab" "' +
+                    utils.bool_as_int(vmf.is_prefab) + '"\n}\n')
+
+    dest_file.write('viewsettings\n{\n')
+    dest_file.write('\t"bSnapToGrid" "' +
+                    utils.bool_as_int(vmf.snap_grid) + '"\n')
+    dest_file.write('\t"bShowGrid" "' +
+                    utils.bool_as_int(vmf.show_grid) + '"\n')
+    dest_file.write('\t"bShowLogicalGrid" "' +
+                    utils.bool_as_int(vmf.show_logic_grid) + '"\n')
+    dest_file.write('\t"nGridSpacing" "' +
+                    str(vmf.grid_spacing) + '"\n')
+    dest_file.write('\t"bShow3DGrid" "' +
+                    utils.bool_as_int(vmf.show_3d_grid) + '"\n}\n')
+
+    vmf.spawn['mapversion'] = str(vmf.map_ver)
+    legacy_entity(vmf.spawn, dest_file, ent_name='world')
+    del vmf.spawn['mapversion']
+
+    for ent in vmf.entities:
+        legacy_entity(ent, dest_file)
+
+    dest_file.write('cameras\n{\n')
+    if len(vmf.cameras) == 0:
+        vmf.active_cam = -1
+    dest_file.write('\t"activecamera" "' + str(vmf.active_cam) + '"\n')
+    for cam in vmf.cameras:
+        cam.export(dest_file, '\t')
+    dest_file.write('}\n')
+
+    dest_file.write('cordons\n{\n')
+    if len(vmf.cordons) > 0:
+        dest_file.write('\t"active" "' +
+                        utils.bool_as_int(vmf.cordon_enabled) +
+                        '"\n')
+        for cord in vmf.cordons:
+            cord.export(dest_file, '\t')
+    else:
+        dest_file.write('\t"active" "0"\n')
+    dest_file.write('}\n')
+
+    if vmf.quickhide_count > 0:
+        dest_file.write('quickhide\n{\n')
+        dest_file.write('\t"count" "' + str(vmf.quickhide_count) + '"\n')
+        dest_file.write('}\n')
+
+
+def save_legacy(vmf, path):
+    with utils.AtomicWriter(path) as file:
+        legacy_export(vmf, file)
+
+
+def save_new(vmf, path):
+    with utils.AtomicWriter(path) as file:
+        vmf.export(file, inc_version=False)
+
+
+def main(brushes=10000, instances=2000):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'bench.vmf')
+        with open(path, 'w') as file:
+            file.write(generate_vmf(brushes, instances))
+        vmf = vmfLib.VMF.parse(path)
+
+        old_text = io.StringIO()
+        legacy_export(vmf, old_text)
+        old_text = old_text.getvalue()
+        new_text = vmf.export(inc_version=False)
+        print('Exported VMF: {:.2f}MB'.format(len(new_text) / 1024 / 1024))
+        if old_text != new_text:
+            raise AssertionError('Exports produced different text!')
+
+        old_time = best_time(save_legacy, vmf, path)
+        new_time = best_time(save_new, vmf, path)
+    print('Old export: {:.3f}s'.format(old_time))
+    print('New export: {:.3f}s'.format(new_time))
+    print('Speedup:    {:.2f}x'.format(old_time / new_time))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,55 @@
+"""Measure how long parsing brushes takes, and how much memory they use.
+
+Run from the src/ folder:
+    python -m bench.vmf_memory [brushes]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench.gen_map import generate_vmf
+import vmfLib
+
+
+def measure(path, lazy):
+    """Parse the map, returning it with the time and memory used."""
+    start = time.perf_counter()
+    vmf = vmfLib.VMF.parse(path, lazy_brushes=lazy)
+    duration = time.perf_counter() - start
+
+    del vmf
+    gc.collect()
+    tracemalloc.start()
+    start_mem = tracemalloc.get_traced_memory()[0]
+    vmf = vmfLib.VMF.parse(path, lazy_brushes=lazy)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - start_mem
+    tracemalloc.stop()
+    return vmf, duration, used
+
+
+def main(brushes=50000):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'bench.vmf')
+        with open(path, 'w') as file:
+            file.write(generate_vmf(brushes, instances=0))
+
+        for lazy in (False, True):
+            vmf, duration, used = measure(path, lazy)
+            faces = sum(len(solid.sides) for solid in vmf.brushes)
+            del vmf
+            print('{} parse: {} brushes, {} faces'.format(
+                'Lazy' if lazy else 'Full',
+                brushes,
+                faces,
+            ))
+            print('Time:     {:.2f}s'.format(duration))
+            print('Total:    {:.1f}MB'.format(used / 1024 / 1024))
+            print('Per face: {:.0f} bytes'.format(used / faces))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,132 @@
+"""Record the time and memory used by each stage of a VBSP compile.
+
+StageTimer.stage() is a context manager timing one part of the compile.
+At the end the totals are logged, and saved to STATS_LOCATION so
+compile times can be compared between package versions.
+"""
+from contextlib import contextmanager
+import json
+import time
+
+import utils
+
+from typing import List
+
+LOGGER = utils.getLogger(__name__, alias='stats')
+
+STATS_LOCATION = 'bee2/compile_stats.json'
+
+if utils.WIN:
+    import ctypes
+    from ctypes import wintypes
+
+    class _MemoryCounters(ctypes.Structure):
+        """The PROCESS_MEMORY_COUNTERS struct."""
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    def peak_rss() -> int:
+        """Return the most memory this process has used, in bytes."""
+        counters = _MemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(),
+            ctypes.byref(counters),
+            counters.cb,
+        ):
+            return counters.PeakWorkingSetSize
+        return 0
+else:
+    import resource
+
+    def peak_rss() -> int:
+        """Return the most memory this process has used, in bytes."""
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # OS X gives bytes, Linux kilobytes.
+        return peak if utils.MAC else peak * 1024
+
+
+class Stage:
+    """The totals for one stage of the compile."""
+    __slots__ = ['name', 'wall_time', 'cpu_time', 'peak_rss']
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_rss = 0
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'peak_rss': self.peak_rss,
+        }
+
+
+class StageTimer:
+    """Times each stage of the compile in turn.
+
+    Peak RSS is for the whole process so far, so it only increases.
+    Subprocesses (the original VBSP) aren't included in it.
+    """
+    def __init__(self):
+        self.stages = []  # type: List[Stage]
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the code inside the with block as the named stage."""
+        stage = Stage(name)
+        self.stages.append(stage)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield stage
+        finally:
+            stage.wall_time = time.perf_counter() - wall_start
+            stage.cpu_time = time.process_time() - cpu_start
+            stage.peak_rss = peak_rss()
+
+    def report(self, path: str=STATS_LOCATION):
+        """Log the times for each stage, and write them to a file."""
+        LOGGER.info('Compile stages:\n{}', format_table(self.stages))
+        with open(path, 'w') as file:
+            json.dump(
+                {
+                    'version': utils.BEE_VERSION,
+                    'wall_time': sum(stage.wall_time for stage in self.stages),
+                    'cpu_time': sum(stage.cpu_time for stage in self.stages),
+                    'peak_rss': max(
+                        (stage.peak_rss for stage in self.stages),
+                        default=0,
+                    ),
+                    'stages': [stage.as_dict() for stage in self.stages],
+                },
+                file,
+                indent=1,
+            )
+        LOGGER.info('Compile stats saved to "{}"', path)
+
+
+def format_table(stages: List[Stage]) -> str:
+    """Produce a text table for a list of stages."""
+    lines = ['  Wall (s)   CPU (s)  Peak RSS  Stage']
+    for stage in stages:
+        lines.append('{:10.3f} {:9.3f} {:7.1f}M  {}'.format(
+            stage.wall_time,
+            stage.cpu_time,
+            stage.peak_rss / 2**20,
+            stage.name,
+        ))
+    return '\n'.join(lines)
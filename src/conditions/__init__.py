@@ -13,8 +13,8 @@ import vmfLib as VLib
 import utils
 
 from typing import (
-    Optional, Callable, Any,
-    Dict, List, Tuple, NamedTuple,
+    Optional, Callable, Any, Iterator, Iterable,
+    Dict, List, Tuple, Set, NamedTuple,
 )
 
 LOGGER = utils.getLogger(__name__, alias='cond.core')
@@ -26,9 +26,18 @@ VMF = None  # type: VLib.VMF
 
 conditions = []
 FLAG_LOOKUP = {}
+# Flags which parse their arguments once, mapped to functions producing
+# the check for a specific flag. See make_flag_compiler().
+FLAG_COMPILERS = {}
+# Flags which only pass for certain instance files, mapped to functions
+# producing a filename check for that flag. See make_file_filter().
+FILE_FILTERS = {}
 RESULT_LOOKUP = {}
 RESULT_SETUP = {}
 
+# Set by enable_profiling(), to time conditions, flags and results.
+PROFILER = None  # type: profiling.ConditionProfiler
+
 # Used to dump a list of the flags, results, meta-conds
 ALL_FLAGS = []
 ALL_RESULTS = []
@@ -55,6 +64,7 @@ class SWITCH_TYPE(Enum):
 
 
 
+
 class TEMP_TYPES(Enum):
     """Value used for import_template()'s force_type parameter.
     """
@@ -228,7 +238,15 @@ RES_EXHAUSTED = object()
 
 
 class Condition:
-    __slots__ = ['flags', 'results', 'else_results', 'priority']
+    __slots__ = [
+        'flags',
+        'results',
+        'else_results',
+        'priority',
+        'source',
+        'flag_funcs',
+        '_file_filters',
+    ]
 
     def __init__(
             self,
@@ -236,12 +254,22 @@ class Condition:
             results=None,
             else_results=None,
             priority=Decimal('0'),
+            source='',
     ):
         self.flags = flags or []
         self.results = results or []
         self.else_results = else_results or []
         self.priority = priority
+        # The package and item this came from, for profiling.
+        self.source = source
+        self._file_filters = None
         self.setup()
+        # Each flag, ready to be called with just the instance.
+        self.flag_funcs = [
+            compile_flag(flag)
+            for flag in
+            self.flags
+        ]  # type: List[Callable[[VLib.Entity], bool]]
 
     def __repr__(self):
         return (
@@ -262,6 +290,7 @@ class Condition:
         results = []
         else_results = []
         priority = Decimal('0')
+        source = ''
         for prop in prop_block:
             if prop.name == 'result':
                 results.extend(prop.value)  # join multiple ones together
@@ -282,6 +311,8 @@ class Condition:
                     priority = Decimal(prop.value)
                 except ArithmeticError:
                     pass
+            elif prop.name == 'source':
+                source = prop.value
             else:
                 flags.append(prop)
 
@@ -290,6 +321,7 @@ class Condition:
             results=results,
             else_results=else_results,
             priority=priority,
+            source=source,
         )
 
     def setup(self):
@@ -327,18 +359,50 @@ class Condition:
         else:
             return func(inst, res)
 
-    def test(self, inst):
-        """Try to satisfy this condition on the given instance."""
-        success = True
-        for flag in self.flags:
-            if not check_flag(flag, inst):
-                success = False
-                break
+    def file_filters(self) -> List[Callable[[str], bool]]:
+        """Return checks for the instance files this condition can pass on.
+
+        These come from the leading flags with a function in FILE_FILTERS.
+        Each check is passed a casefolded filename, and returns False if
+        the flag would fail for that file. Instances failing these never
+        get past the flags, so they don't need to be tested at all.
+        If the condition has else results, every instance matters and no
+        checks are returned.
+        """
+        if self._file_filters is None:
+            self._file_filters = []
+            if not self.else_results:
+                for flag in self.flags:
+                    try:
+                        make_filter = FILE_FILTERS[flag.name]
+                    except KeyError:
+                        # Later flags only run on instances passing this
+                        # one, so we can't use those.
+                        break
+                    self._file_filters.append(make_filter(flag))
+        return self._file_filters
+
+    def check_flags(self, inst) -> bool:
+        """Check if all the flags pass on the given instance."""
+        for flag_func in self.flag_funcs:
+            if not flag_func(inst):
+                return False
+        return True
+
+    def test(self, inst, success=None):
+        """Try to satisfy this condition on the given instance.
+
+        This returns True if the flags passed. If success is given, it's
+        used instead of checking the flags.
+        """
+        if success is None:
+            success = self.check_flags(inst)
         results = self.results if success else self.else_results
         for res in results[:]:
             should_del = self.test_result(inst, res)
             if should_del is RES_EXHAUSTED:
                 results.remove(res)
+        return success
 
 
     def __lt__(self, other):
@@ -419,6 +483,44 @@ def make_flag(orig_name, *aliases):
     return x
 
 
+def make_flag_compiler(orig_name, *aliases):
+    """Decorator to add flags which parse their arguments ahead of time.
+
+    The function is passed the flag once, and returns a function which
+    checks an instance. check_flag() compiles the flag on every call,
+    so conditions call compile_flag() when they are created instead.
+    """
+    def x(func: Callable[[Property], Callable[[VLib.Entity], bool]]):
+        def check(inst, flag):
+            return func(flag)(inst)
+        check.__doc__ = func.__doc__
+        FLAG_LOOKUP[orig_name.casefold()] = check
+        FLAG_COMPILERS[orig_name.casefold()] = func
+        for name in aliases:
+            FLAG_LOOKUP[name.casefold()] = check
+            FLAG_COMPILERS[name.casefold()] = func
+        ALL_FLAGS.append(
+            (orig_name, aliases, func)
+        )
+        return func
+    return x
+
+
+def make_file_filter(orig_name, *aliases):
+    """Decorator to add filename checks for a flag to FILE_FILTERS.
+
+    The function is passed the flag, and returns a function which checks
+    a casefolded instance filename. That should return False only if the
+    flag always fails for instances with that file.
+    """
+    def x(func: Callable[[Property], Callable[[str], bool]]):
+        FILE_FILTERS[orig_name.casefold()] = func
+        for name in aliases:
+            FILE_FILTERS[name.casefold()] = func
+        return func
+    return x
+
+
 def make_result(orig_name, *aliases):
     """Decorator to add results to the lookup."""
     def x(func: Callable[[VLib.Entity, Property], Any]):
@@ -466,19 +568,7 @@ def check_all():
     """Check all conditions."""
     LOGGER.info('Checking Conditions...')
     for condition in conditions:
-        for inst in VMF.by_class['func_instance']:
-            try:
-                condition.test(inst)
-            except NextInstance:
-                # This is raised to immediately stop running
-                # this condition, and skip to the next instance.
-                pass
-            except EndCondition:
-                # This is raised to immediately stop running
-                # this condition, and skip to the next condtion.
-                break
-            if not condition.results and not condition.else_results:
-                break  # Condition has run out of results, quit early
+        check_condition(condition)
 
     import vbsp
     LOGGER.info('Map has attributes: {}', [
@@ -490,6 +580,114 @@ def check_all():
     LOGGER.info('instanceLocs cache: {}', resolve_inst.cache_info())
     LOGGER.info('Style Vars: {}', dict(vbsp.settings['style_vars']))
     LOGGER.info('Global instances: {}', GLOBAL_INSTANCES)
+    if PROFILER is not None:
+        PROFILER.report()
+
+
+def enable_profiling():
+    """Record the time taken by each condition, flag and result.
+
+    This must be called before conditions are parsed.
+    """
+    global PROFILER
+    from conditions import profiling
+    PROFILER = profiling.ConditionProfiler()
+    PROFILER.install()
+
+
+def check_condition(condition: Condition):
+    """Run a condition on every instance it could apply to."""
+    for inst in condition_instances(condition):
+        try:
+            condition.test(inst)
+        except NextInstance:
+            # This is raised to immediately stop running
+            # this condition, and skip to the next instance.
+            pass
+        except EndCondition:
+            # This is raised to immediately stop running
+            # this condition, and skip to the next condtion.
+            break
+        if not condition.results and not condition.else_results:
+            break  # Condition has run out of results, quit early
+
+
+def condition_instances(condition: Condition) -> Iterable[VLib.Entity]:
+    """Return the instances a condition could apply to.
+
+    Like iterating the VMF's CopySet, instances added while this runs
+    are produced after the original ones.
+    """
+    instances = VMF.by_class['func_instance']
+    filters = condition.file_filters() if instances else None
+    if filters:
+        return _iter_filtered(instances, filters)
+    return instances
+
+
+def _iter_filtered(
+        instances: Set[VLib.Entity],
+        filters: List[Callable[[str], bool]],
+        ) -> Iterator[VLib.Entity]:
+    """Yield the filtered instances, then any added since this started."""
+    cur_items = set(instances)
+    yield from filter_instances(cur_items, filters)
+    new_items = instances - cur_items
+    if new_items:
+        yield from filter_instances(new_items, filters)
+
+
+def filter_instances(
+        instances: Set[VLib.Entity],
+        filters: List[Callable[[str], bool]],
+        ) -> List[VLib.Entity]:
+    """Find the instances whose file passes all the filters.
+
+    Each filename in the VMF's file index is only checked once.
+    The result is in the order the instances were added to the map.
+    """
+    found = []
+    for file, ents in VMF.register_index('file').items():
+        folded = (file or '').casefold()
+        if all(check(folded) for check in filters):
+            found.extend(ent for ent in ents if ent in instances)
+    return VMF.sort_ents(found)
+
+
+def compile_flag(flag: Property) -> Callable[[VLib.Entity], bool]:
+    """Convert a flag into a function which checks an instance.
+
+    Flags from make_flag_compiler() parse their arguments here, once.
+    Others are looked up now, and called with the flag each time.
+    Unknown or invalid flags produce a check which always fails.
+    """
+    try:
+        compiler = FLAG_COMPILERS[flag.name]
+    except KeyError:
+        try:
+            func = FLAG_LOOKUP[flag.name]
+        except KeyError:
+            LOGGER.warning(
+                '"' + flag.name + '" is not a valid condition flag!'
+            )
+            check = lambda inst: False
+        else:
+            check = lambda inst: func(inst, flag)
+    else:
+        try:
+            check = compiler(flag)
+        except (ValueError, KeyError) as exc:
+            LOGGER.warning(
+                'Invalid "{}" flag value "{}": {!r}',
+                flag.real_name,
+                flag.value,
+                exc,
+            )
+            check = lambda inst: False
+
+    if PROFILER is not None:
+        return PROFILER.wrap_flag(flag, check)
+    return check
 
 
 def check_flag(flag, inst):
@@ -851,9 +1049,7 @@ def resolve_value(inst: VLib.Entity, value: str):
 
 def load_templates():
     """Load in the template file, used for import_template()."""
-    with open(TEMPLATE_LOCATION) as file:
-        props = Property.parse(file, TEMPLATE_LOCATION)
-    vmf = VLib.VMF.parse(props)
+    vmf = VLib.VMF.parse(TEMPLATE_LOCATION)
     detail_ents = defaultdict(list)
     world_ents = defaultdict(list)
     overlay_ents = defaultdict(list)
@@ -923,9 +1119,10 @@ def import_template(
             (orig_detail, new_detail)
         ]:
         for old_brush in orig_list:
-            brush = old_brush.copy(map=VMF, side_mapping=id_mapping)
-            brush.localise(origin, angles)
-            new_list.append(brush)
+            new_list.append(
+                old_brush.copy(map=VMF, side_mapping=id_mapping)
+            )
+        VLib.localise_many(new_list, origin, angles)
 
     for overlay in orig_over:  # type: VLib.Entity
         new_overlay = overlay.copy(
@@ -1510,8 +1707,17 @@ def res_switch_setup(res):
     if method is SWITCH_TYPE.LAST:
         cases[:] = cases[::-1]
 
+    # Compile the flag for each case.
+    cases = [
+        (
+            None if flag is None else
+            compile_flag(Property(flag, case.real_name)),
+            case,
+        )
+        for case in cases
+    ]
+
     return (
-        flag,
         cases,
         method,
     )
@@ -1528,17 +1734,15 @@ def res_switch(inst, res):
     For 'random' mode, you can omit the flag to choose from all objects. In
     this case the flag arguments are ignored.
     """
-    flag_name, cases, method = res.value
+    cases, method = res.value
 
     if method is SWITCH_TYPE.RANDOM:
         cases = cases[:]
         random.shuffle(cases)
 
-    for case in cases:
-        if flag_name is not None:
-            flag = Property(flag_name, case.real_name)
-            if not check_flag(flag, inst):
-                continue
+    for flag_func, case in cases:
+        if flag_func is not None and not flag_func(inst):
+            continue
         for res in case:
             Condition.test_result(inst, res)
         if method is not SWITCH_TYPE.ALL:
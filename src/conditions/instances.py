@@ -5,7 +5,7 @@ import operator
 
 import utils
 from conditions import (
-    make_flag, make_result,
+    make_flag, make_flag_compiler, make_result, make_file_filter,
     ALL_INST,
 )
 from utils import Vec
@@ -14,16 +14,31 @@ import conditions
 import vmfLib as VLib
 
 
-@make_flag('instance')
-def flag_file_equal(inst, flag):
+@make_flag_compiler('instance')
+def flag_file_equal(flag):
     """Evaluates True if the instance matches the given file."""
-    return inst['file'].casefold() in resolve_inst(flag.value)
+    files = set(resolve_inst(flag.value))
+    return lambda inst: inst['file'].casefold() in files
 
 
-@make_flag('instFlag', 'InstPart')
-def flag_file_cont(inst, flag):
+@make_file_filter('instance')
+def filter_file_equal(flag):
+    """The files flag_file_equal() can match."""
+    return set(resolve_inst(flag.value)).__contains__
+
+
+@make_flag_compiler('instFlag', 'InstPart')
+def flag_file_cont(flag):
     """Evaluates True if the instance contains the given portion."""
-    return flag.value in inst['file'].casefold()
+    value = flag.value
+    return lambda inst: value in inst['file'].casefold()
+
+
+@make_file_filter('instFlag', 'InstPart')
+def filter_file_cont(flag):
+    """The files flag_file_cont() can match."""
+    value = flag.value
+    return lambda file: value in file
 
 
 @make_flag('hasInst')
@@ -54,8 +69,8 @@ INSTVAR_COMP = {
 }
 
 
-@make_flag('instVar')
-def flag_instvar(inst, flag):
+@make_flag_compiler('instVar')
+def flag_instvar(flag):
     """Checks if the $replace value matches the given value.
 
     The flag value follows the form "$start_enabled == 1", with or without
@@ -66,16 +81,26 @@ def flag_instvar(inst, flag):
     values = flag.value.split(' ')
     if len(values) == 3:
         variable, op, comp_val = values
-        value = inst.fixup[variable]
+        op = INSTVAR_COMP.get(op, operator.eq)
         try:
-            # Convert to floats if possible, otherwise handle both as strings
-            comp_val, value = float(comp_val), float(value)
+            comp_num = float(comp_val)
         except ValueError:
-            pass
-        return INSTVAR_COMP.get(op, operator.eq)(value, comp_val)
+            comp_num = None
+
+        def check(inst):
+            value = inst.fixup[variable]
+            if comp_num is not None:
+                try:
+                    # Convert to floats if possible,
+                    # otherwise handle both as strings
+                    return op(float(value), comp_num)
+                except ValueError:
+                    pass
+            return op(value, comp_val)
+        return check
     else:
         variable, value = values
-        return inst.fixup[variable] == value
+        return lambda inst: inst.fixup[variable] == value
 
 
 @make_result('rename', 'changeInstance')
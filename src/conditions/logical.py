@@ -1,42 +1,54 @@
 """Logical flags used to combine others (AND, OR, NOT, etc)."""
 
-from conditions import make_flag, check_flag
+from conditions import make_flag_compiler, compile_flag
 
 
-@make_flag('AND')
-def flag_and(inst, flag):
+@make_flag_compiler('AND')
+def flag_and(flag):
     """The AND group evaluates True if all sub-flags are True."""
-    for sub_flag in flag:
-        if not check_flag(sub_flag, inst):
-            return False
+    sub_flags = [compile_flag(sub_flag) for sub_flag in flag]
     # If the AND block is empty, return True
-    return len(flag.value) == 0
+    is_empty = len(flag.value) == 0
 
+    def check(inst):
+        for sub_flag in sub_flags:
+            if not sub_flag(inst):
+                return False
+        return is_empty
+    return check
 
-@make_flag('OR')
-def flag_or(inst, flag):
+
+@make_flag_compiler('OR')
+def flag_or(flag):
     """The OR group evaluates True if any sub-flags are True."""
-    for sub_flag in flag:
-        if check_flag(sub_flag, inst):
-            return True
-    return False
+    sub_flags = [compile_flag(sub_flag) for sub_flag in flag]
+
+    def check(inst):
+        for sub_flag in sub_flags:
+            if sub_flag(inst):
+                return True
+        return False
+    return check
 
 
-@make_flag('NOT')
-def flag_not(inst, flag):
+@make_flag_compiler('NOT')
+def flag_not(flag):
     """The NOT group inverts the value of it's one sub-flag."""
     if len(flag.value) == 1:
-        return not check_flag(flag[0], inst)
-    return False
+        sub_flag = compile_flag(flag[0])
+        return lambda inst: not sub_flag(inst)
+    return lambda inst: False
 
 
-@make_flag('NOR')
-def flag_nor(inst, flag):
+@make_flag_compiler('NOR')
+def flag_nor(flag):
     """The NOR group evaluates True if any sub-flags are False."""
-    return not flag_or(inst, flag)
+    check_or = flag_or(flag)
+    return lambda inst: not check_or(inst)
 
 
-@make_flag('NAND')
-def flag_nand(inst, flag):
+@make_flag_compiler('NAND')
+def flag_nand(flag):
     """The NAND group evaluates True if all sub-flags are False."""
-    return not flag_and(inst, flag)
\ No newline at end of file
+    check_and = flag_and(flag)
+    return lambda inst: not check_and(inst)
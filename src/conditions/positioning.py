@@ -1,14 +1,15 @@
 import math
 
 from conditions import (
-    make_flag, make_result,
+    make_flag_compiler, make_result,
     DIRECTIONS, SOLIDS, GOO_LOCS,
 )
 from utils import Vec
+import conditions
 import utils
 
 
-@make_flag(
+@make_flag_compiler(
     'rotation',
     'angle',
     'angles',
@@ -17,7 +18,7 @@ import utils
     'dir',
     'direction',
 )
-def flag_angles(inst, flag):
+def flag_angles(flag):
     """Check that a instance is pointed in a direction.
 
     The value should be either just the angle to check, or a block of
@@ -29,8 +30,6 @@ def flag_angles(inst, flag):
     - Allow_inverse: If true, this also returns True if the instance is
         pointed the opposite direction .
     """
-    angle = inst['angles', '0 0 0']
-
     if flag.has_children():
         targ_angle = flag['direction', '0 0 0']
         from_dir = flag['from_dir', '0 0 1']
@@ -46,22 +45,24 @@ def flag_angles(inst, flag):
 
     normal = DIRECTIONS.get(targ_angle.casefold(), None)
     if normal is None:
-        return False  # If it's not a special angle,
+        return lambda inst: False  # If it's not a special angle,
         # so it failed the exact match
 
-    inst_normal = from_dir.rotate_by_str(angle)
+    def check(inst):
+        inst_normal = from_dir.copy().rotate_by_matrix(inst.rotation)
 
-    if normal == 'WALL':
-        # Special case - it's not on the floor or ceiling
-        return not (inst_normal == (0, 0, 1) or inst_normal == (0, 0, -1))
-    else:
-        return inst_normal == normal or (
-            allow_inverse and -inst_normal == normal
-        )
+        if normal == 'WALL':
+            # Special case - it's not on the floor or ceiling
+            return not (inst_normal == (0, 0, 1) or inst_normal == (0, 0, -1))
+        else:
+            return inst_normal == normal or (
+                allow_inverse and -inst_normal == normal
+            )
+    return check
 
 
-@make_flag('posIsSolid')
-def flag_brush_at_loc(inst, flag):
+@make_flag_compiler('posIsSolid')
+def flag_brush_at_loc(flag):
     """Checks to see if a wall is present at the given location.
 
     - Pos is the position of the brush, where `0 0 0` is the floor-position
@@ -80,65 +81,74 @@ def flag_brush_at_loc(inst, flag):
       Only do this to EmbedFace brushes, since it will remove the other
       sides as well.
     """
-    from conditions import VMF
-    pos = Vec.from_str(flag['pos', '0 0 0'])
-    pos.z -= 64  # Subtract so origin is the floor-position
-    pos = pos.rotate_by_str(inst['angles', '0 0 0'])
-
-    # Relative to the instance origin
-    pos += Vec.from_str(inst['origin', '0 0 0'])
-
-    norm = flag['dir', None]
-    if norm is not None:
-        norm = Vec.from_str(norm).rotate_by_str(
-            inst['angles', '0 0 0'],
-        )
+    flag_pos = Vec.from_str(flag['pos', '0 0 0'])
+    flag_pos.z -= 64  # Subtract so origin is the floor-position
 
-    if utils.conv_bool(flag['gridpos', '0']) and norm is not None:
-        for axis in 'xyz':
-            # Don't realign things in the normal's axis -
-            # those are already fine.
-            if norm[axis] == 0:
-                pos[axis] = pos[axis] // 128 * 128 + 64
+    flag_norm = flag['dir', None]
+    if flag_norm is not None:
+        flag_norm = Vec.from_str(flag_norm)
 
+    grid_pos = utils.conv_bool(flag['gridpos', '0'])
     result_var = flag['setVar', '']
     should_remove = utils.conv_bool(flag['RemoveBrush', False], False)
     des_type = flag['type', 'any'].casefold()
 
-    brush = SOLIDS.get(pos.as_tuple(), None)
+    def check(inst):
+        pos = flag_pos.copy().rotate_by_matrix(inst.rotation)
 
-    if brush is None or (norm is not None and brush.normal != norm):
-        br_type = 'none'
-    else:
-        br_type = str(brush.color)
-        if should_remove:
-            VMF.remove_brush(
-                brush.solid,
-            )
+        # Relative to the instance origin
+        pos += inst.origin_vec
 
-    if result_var:
-        inst.fixup[result_var] = br_type
+        if flag_norm is not None:
+            norm = flag_norm.copy().rotate_by_matrix(inst.rotation)
+        else:
+            norm = None
+
+        if grid_pos and norm is not None:
+            for axis in 'xyz':
+                # Don't realign things in the normal's axis -
+                # those are already fine.
+                if norm[axis] == 0:
+                    pos[axis] = pos[axis] // 128 * 128 + 64
 
-    if des_type == 'any' and br_type != 'none':
-        return True
+        brush = SOLIDS.get(pos.as_tuple(), None)
+
+        if brush is None or (norm is not None and brush.normal != norm):
+            br_type = 'none'
+        else:
+            br_type = str(brush.color)
+            if should_remove:
+                conditions.VMF.remove_brush(
+                    brush.solid,
+                )
 
-    return des_type == br_type
+        if result_var:
+            inst.fixup[result_var] = br_type
 
+        if des_type == 'any' and br_type != 'none':
+            return True
 
-@make_flag('PosIsGoo')
-def flag_goo_at_loc(inst, flag):
+        return des_type == br_type
+    return check
+
+
+@make_flag_compiler('PosIsGoo')
+def flag_goo_at_loc(flag):
     """Check to see if a given location is submerged in goo.
 
     0 0 0 is the origin of the instance, values are in 128 increments.
     """
-    pos = Vec.from_str(flag.value).rotate_by_str(inst['angles', '0 0 0'])
-    pos *= 128
-    pos += Vec.from_str(inst['origin'])
+    flag_pos = Vec.from_str(flag.value)
+
+    def check(inst):
+        pos = flag_pos.copy().rotate_by_matrix(inst.rotation)
+        pos *= 128
+        pos += inst.origin_vec
 
-    # Round to 128 units, then offset to the center
-    pos = pos // 128 * 128 + 64  # type: Vec
-    val = pos.as_tuple() in GOO_LOCS
-    return val
+        # Round to 128 units, then offset to the center
+        pos = pos // 128 * 128 + 64  # type: Vec
+        return pos.as_tuple() in GOO_LOCS
+    return check
 
 
 @make_result('forceUpright')
@@ -148,7 +158,7 @@ def res_force_upright(inst, _):
     The result angle will have pitch and roll set to 0. Vertical
     instances are unaffected.
     """
-    normal = Vec(0, 0, 1).rotate_by_str(inst['angles'])
+    normal = Vec(0, 0, 1).rotate_by_matrix(inst.rotation)
     if normal.z != 0:
         return
     ang = math.degrees(math.atan2(normal.y, normal.x))
@@ -184,5 +194,5 @@ def res_translate_inst(inst, res):
     else:
         val = Vec.from_str(res.value)
 
-    offset = val.rotate_by_str(inst['angles'])
-    inst['origin'] = (offset + Vec.from_str(inst['origin'])).join(' ')
+    offset = val.rotate_by_matrix(inst.rotation)
+    inst.origin_vec = offset + inst.origin_vec
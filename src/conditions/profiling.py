@@ -0,0 +1,175 @@
+"""Time how long each condition, flag and result takes to run.
+
+This is enabled with the -bee2_profile VBSP argument, via
+conditions.enable_profiling(). At the end of check_all() the results are
+logged, and saved to PROFILE_LOCATION.
+"""
+import functools
+import json
+import time
+
+from property_parser import Property
+import conditions
+import utils
+
+from typing import Callable, Dict, List, Any
+
+LOGGER = utils.getLogger(__name__, alias='cond.profile')
+
+PROFILE_LOCATION = 'bee2/condition_profile.json'
+
+
+class Stat:
+    """The totals for one condition, flag or result."""
+    __slots__ = ['name', 'source', 'calls', 'passed', 'time']
+
+    def __init__(self, name: str, source: str=''):
+        self.name = name
+        self.source = source
+        self.calls = 0
+        self.passed = 0
+        self.time = 0.0
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'source': self.source,
+            'calls': self.calls,
+            'passed': self.passed,
+            'time': self.time,
+        }
+
+
+def describe_condition(cond: 'conditions.Condition') -> str:
+    """Produce a short description of a condition, from its flags."""
+    flags = ', '.join(
+        flag.real_name if flag.has_children() else
+        '{}="{}"'.format(flag.real_name, flag.value)
+        for flag in
+        cond.flags
+    ) or '<no flags>'
+    return 'Priority {} - {}'.format(cond.priority, flags)
+
+
+class ConditionProfiler:
+    """Collects the times for conditions, flags and results.
+
+    Flags and results are totalled by name, conditions individually.
+    Times include everything called inside - a condition's time contains
+    its flags and results.
+    """
+    def __init__(self):
+        self.conditions = {}  # type: Dict[conditions.Condition, Stat]
+        self.flags = {}  # type: Dict[str, Stat]
+        self.results = {}  # type: Dict[str, Stat]
+
+    def install(self):
+        """Wrap the functions which run conditions and results.
+
+        Flags are wrapped by compile_flag() instead, with wrap_flag().
+        """
+        orig_test = conditions.Condition.test
+        orig_test_result = conditions.Condition.test_result
+
+        @functools.wraps(orig_test)
+        def test(cond, inst, success=None):
+            try:
+                stat = self.conditions[cond]
+            except KeyError:
+                stat = self.conditions[cond] = Stat(
+                    describe_condition(cond),
+                    cond.source,
+                )
+            start = time.perf_counter()
+            try:
+                # Check the flags here, so the condition counts as passed
+                # even if a result raises NextInstance or EndCondition.
+                if success is None:
+                    success = cond.check_flags(inst)
+                if success:
+                    stat.passed += 1
+                return orig_test(cond, inst, success)
+            finally:
+                stat.time += time.perf_counter() - start
+                stat.calls += 1
+
+        @functools.wraps(orig_test_result)
+        def test_result(inst, res):
+            return self.run(
+                self.results, res.name,
+                orig_test_result, inst, res,
+                count_returns=True,
+            )
+
+        conditions.Condition.test = test
+        conditions.Condition.test_result = staticmethod(test_result)
+
+    def wrap_flag(self, flag: Property, func: Callable[[Any], bool]):
+        """Wrap a compiled flag to record its calls."""
+        name = flag.name
+        return lambda inst: self.run(self.flags, name, func, inst)
+
+    @staticmethod
+    def run(
+            stats: Dict[str, Stat],
+            name: str,
+            func,
+            *args,
+            count_returns=False
+            ):
+        """Call func, adding the time taken to the named stat.
+
+        Calls count as passing if they return a true value. If count_returns
+        is True, they pass if they return at all instead of raising
+        NextInstance or EndCondition.
+        """
+        try:
+            stat = stats[name]
+        except KeyError:
+            stat = stats[name] = Stat(name)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = func(*args)
+            if count_returns:
+                stat.passed += 1
+                result = None
+            return result
+        finally:
+            stat.time += time.perf_counter() - start
+            stat.calls += 1
+            if result:
+                stat.passed += 1
+
+    def report(self, path: str=PROFILE_LOCATION):
+        """Log tables of the slowest items, and write all of them to a file."""
+        sections = [
+            ('Conditions', self.conditions.values()),
+            ('Flags', self.flags.values()),
+            ('Results', self.results.values()),
+        ]
+        data = {}
+        for title, stats in sections:
+            stats = sorted(stats, key=lambda stat: stat.time, reverse=True)
+            data[title.casefold()] = [stat.as_dict() for stat in stats]
+            LOGGER.info('{}:\n{}', title, format_table(stats))
+
+        with open(path, 'w') as file:
+            json.dump(data, file, indent=1)
+        LOGGER.info('Condition profile saved to "{}"', path)
+
+
+def format_table(stats: List[Stat]) -> str:
+    """Produce a text table for a list of stats."""
+    lines = ['  Time (s)    Calls  Pass %  Name']
+    for stat in stats:
+        line = '{:10.4f} {:8} {:6.1f}%  {}'.format(
+            stat.time,
+            stat.calls,
+            100 * stat.passed / stat.calls if stat.calls else 0,
+            stat.name,
+        )
+        if stat.source:
+            line += ' (' + stat.source + ')'
+        lines.append(line)
+    return '\n'.join(lines)
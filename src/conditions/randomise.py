@@ -3,14 +3,15 @@ import random
 
 from property_parser import Property
 from conditions import (
-    Condition, make_flag,  make_result, make_result_setup, RES_EXHAUSTED,
+    Condition, make_flag_compiler, make_result, make_result_setup,
+    RES_EXHAUSTED,
 )
 import conditions
 import utils
 
 
-@make_flag('random')
-def flag_random(inst, res: Property):
+@make_flag_compiler('random')
+def flag_random(res: Property):
     """Randomly is either true or false."""
     if res.has_children():
         chance = res['chance', '100']
@@ -21,14 +22,17 @@ def flag_random(inst, res: Property):
 
     # Allow ending with '%' sign
     chance = utils.conv_int(chance.rstrip('%'), 100)
-
-    random.seed('random_chance_{}:{}_{}_{}'.format(
-        seed,
-        inst['targetname', ''],
-        inst['origin'],
-        inst['angles'],
-    ))
-    return random.randrange(100) < chance
+    seed_prefix = 'random_chance_{}:'.format(seed)
+
+    def check(inst):
+        random.seed('{}{}_{}_{}'.format(
+            seed_prefix,
+            inst['targetname', ''],
+            inst['origin'],
+            inst['angles'],
+        ))
+        return random.randrange(100) < chance
+    return check
 
 
 @make_result_setup('random')
@@ -181,11 +181,11 @@ def track_scan(
     :param x_dir: The direction to look (-1 or 1)
     """
     track = start_track
-    move_dir = Vec(x_dir*128, 0, 0).rotate_by_str(track['angles'])
+    move_dir = Vec(x_dir*128, 0, 0).rotate_by_matrix(track.rotation)
     while track:
         tr_set.add(track)
 
-        next_pos = Vec.from_str(track['origin']) + move_dir
+        next_pos = track.origin_vec + move_dir
         track = track_inst.get(next_pos.as_tuple(), None)
         if track is None:
             return
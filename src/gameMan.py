@@ -217,8 +217,7 @@ class Game:
             f.writelines(file_data)
             f.write(EDITOR_SOUND_LINE + '\n')
             for sound in sounds:
-                for line in sound.data.export():
-                    f.write(line)
+                sound.data.export_to(f)
                 f.write('\n')  # Add a little spacing
 
     def edit_gameinfo(self, add_line=False):
@@ -470,15 +469,13 @@ class Game:
         LOGGER.info('Writing Editoritems!')
         with utils.AtomicWriter(self.abs_path(
                 'portal2_dlc2/scripts/editoritems.txt')) as editor_file:
-            for line in editoritems.export():
-                editor_file.write(line)
+            editoritems.export_to(editor_file)
         export_screen.step('EXP')
 
         LOGGER.info('Writing VBSP Config!')
         os.makedirs(self.abs_path('bin/bee2/'), exist_ok=True)
         with open(self.abs_path('bin/bee2/vbsp_config.cfg'), 'w') as vbsp_file:
-            for line in vbsp_config.export():
-                vbsp_file.write(line)
+            vbsp_config.export_to(vbsp_file)
         export_screen.step('EXP')
 
         LOGGER.info('Copying Custom Compiler!')
@@ -359,4 +359,14 @@ def init_dev_tab(f):
         desc='Show Log Window',
         var=SHOW_LOG_WIN,
         tooltip='Show the log file in real-time.',
-    ).grid(row=2, column=1, sticky=W)
\ No newline at end of file
+    ).grid(row=2, column=1, sticky=W)
+
+    make_checkbox(
+        f,
+        section='Debug',
+        item='tag_condition_sources',
+        desc='Name condition sources',
+        tooltip='When exporting, record which item each condition came '
+                'from. VBSP shows this when profiling conditions with '
+                '-bee2_profile.',
+    ).grid(row=3, column=1, sticky=W)
\ No newline at end of file
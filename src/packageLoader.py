@@ -60,6 +60,9 @@ CLEAN_PACKAGE = 'BEE2_CLEAN_STYLE'
 # Check to see if the zip contains the resources referred to by the packfile.
 CHECK_PACKFILE_CORRECTNESS = False
 
+# Add the source item to exported conditions, for VBSP's profiler.
+TAG_CONDITION_SOURCES = False
+
 # The binary data comprising a blank VPK file.
 EMPTY_VPK = bytes([
     52, 18, 170, 85,  # VPK identifier
@@ -183,7 +186,8 @@ def get_config(
     """
     prop_block = prop_block.find_key(prop_name, "")
     if prop_block.has_children():
-        prop = prop_block.copy()
+        # Package data isn't modified, so the copy can share its children.
+        prop = prop_block.copy(lazy=True)
         prop.name = None
         return prop
 
@@ -268,9 +272,10 @@ def load_packages(
         log_missing_styles=False,
         log_missing_ent_count=False,
         log_incorrect_packfile=False,
+        tag_condition_sources=False,
         ):
     """Scan and read in all packages in the specified directory."""
-    global LOG_ENT_COUNT, CHECK_PACKFILE_CORRECTNESS
+    global LOG_ENT_COUNT, CHECK_PACKFILE_CORRECTNESS, TAG_CONDITION_SOURCES
     pak_dir = os.path.abspath(os.path.join(os.getcwd(), '..', pak_dir))
 
     if not os.path.isdir(pak_dir):
@@ -293,6 +298,7 @@ def load_packages(
 
     LOG_ENT_COUNT = log_missing_ent_count
     CHECK_PACKFILE_CORRECTNESS = log_incorrect_packfile
+    TAG_CONDITION_SOURCES = tag_condition_sources
     zips = []
     data['zips'] = []
 
@@ -984,7 +990,9 @@ class Item(PakObject):
             versions.get(self.id, 'VER_DEFAULT')
         ]['styles'][style_id]
 
-        new_editor = item_data['editor'].copy()
+        # Only a few parts of this are changed, the rest is shared with
+        # the original until it's written out.
+        new_editor = item_data['editor'].copy(lazy=True)
 
         new_editor['type'] = self.id  # Set the item ID to match our item
         # This allows the folders to be reused for different items if needed.
@@ -1024,9 +1032,33 @@ class Item(PakObject):
             new_editor,
             item_data['editor_extra'],
             # Add all_conf first so it's conditions run first by default
-            self.all_conf + item_data['vbsp'],
+            self._tag_conditions(self.all_conf + item_data['vbsp']),
         )
 
+    def _tag_conditions(self, config: Property) -> Property:
+        """Add a "Source" key to each condition, naming this item.
+
+        VBSP uses this to show where conditions came from when profiling.
+        This is only done if the tag_condition_sources option is enabled.
+        The condition blocks are shared with the package data, so they are
+        replaced by new blocks instead of being modified.
+        """
+        if not TAG_CONDITION_SOURCES:
+            return config
+        source = Property('Source', self.pak_id + ':' + self.id)
+        blocks = []
+        for block in config:
+            if block.name == 'conditions':
+                block = Property(block.real_name, [
+                    Property(cond.real_name, cond.value + [source])
+                    if cond.name == 'condition' else
+                    cond
+                    for cond in
+                    block
+                ])
+            blocks.append(block)
+        return Property(config.real_name, blocks)
+
 
 class QuotePack(PakObject):
     def __init__(
@@ -1868,8 +1900,7 @@ class PackList(PakObject, allow_mult=True, has_img=False):
 
         LOGGER.info('Writing packing list!')
         with open(exp_data.game.abs_path('bin/bee2/pack_list.cfg'), 'w') as pack_file:
-            for line in pack_block.export():
-                pack_file.write(line)
+            pack_block.export_to(pack_file)
 
 
 class EditorSound(PakObject, has_img=False):
@@ -1,5 +1,13 @@
 import utils
+import gc
+import io
+import marshal
+import os
 import re
+import struct
+import sys
+import weakref
+import zlib
 
 from typing import (
     Optional, Union, Any,
@@ -24,6 +32,20 @@ _RE_IDENTIFIER = re.compile('[^"{}]+')
 
 _Prop_Value = Union[List['Property'], str]
 
+# Blocks with at least this many children build an index of their names,
+# instead of searching through them all in find_key(), find_all() etc.
+INDEX_MIN_SIZE = 16
+
+LOGGER = utils.getLogger(__name__)
+
+# Cached parse trees for Property.parse_cached() start with this header:
+# magic, format version, marshal version, then the source file's
+# modification time, size and CRC32.
+CACHE_EXT = '.cache'
+_CACHE_MAGIC = b'BEE2KV'
+_CACHE_VERSION = 1
+_CACHE_HEADER = struct.Struct('<6sHHqqI')
+
 # Various [flags] used after property names in some Valve files.
 # See https://github.com/ValveSoftware/source-sdk-2013/blob/master/sp/src/tier1/KeyValues.cpp#L2055
 PROP_FLAGS = {
@@ -101,9 +123,6 @@ def read_multiline_value(file, line_num, filename):
     lines = ['']  # We return with a beginning newline
     # Re-looping over the same iterator means we don't repeat lines
     for line_num, line in file:
-        if isinstance(line, bytes):
-            # Decode bytes using utf-8
-            line = line.decode('utf-8')
         line = line.strip()
         if line.endswith('"'):
             lines.append(line[:-1])
@@ -118,6 +137,28 @@ def read_multiline_value(file, line_num, filename):
         )
 
 
+def read_lines(file_contents) -> Iterator[str]:
+    """Produce the lines of text in the given source.
+
+    This accepts a string, a file object (in text or bytes mode) or an
+    iterable of lines. Files are read lazily, so the whole text is never
+    held at once, and bytes are decoded as UTF-8.
+    The lines may or may not have newlines on the end.
+    """
+    if isinstance(file_contents, str):
+        lines = file_contents.split('\n')
+        if not lines[-1]:
+            # The text ends with a newline, which doesn't start another line.
+            lines.pop()
+        return lines
+
+    return (
+        line.decode('utf-8') if isinstance(line, bytes) else line
+        for line in
+        file_contents
+    )
+
+
 def read_flag(line_end, filename, line_num):
     """Read a potential [] flag."""
     flag = line_end.lstrip()
@@ -157,6 +198,53 @@ def read_flag(line_end, filename, line_num):
     return True
 
 
+class _ChildList(list):
+    """The children of a large Property block, which can be indexed.
+
+    Every change to the list increments version, so the name index can
+    tell it's out of date even if .value is edited directly. Indexed
+    children also increment it when they are renamed.
+    """
+    __slots__ = ['version', '__weakref__']
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.version = 0
+
+    def _changes(meth):
+        """Wrap a list method to increment the version when called."""
+        def changer(self, *args):
+            self.version += 1
+            return meth(self, *args)
+        changer.__name__ = meth.__name__
+        changer.__doc__ = meth.__doc__
+        return changer
+
+    __setitem__ = _changes(list.__setitem__)
+    __delitem__ = _changes(list.__delitem__)
+    __iadd__ = _changes(list.__iadd__)
+    __imul__ = _changes(list.__imul__)
+    append = _changes(list.append)
+    extend = _changes(list.extend)
+    insert = _changes(list.insert)
+    pop = _changes(list.pop)
+    remove = _changes(list.remove)
+    clear = _changes(list.clear)
+    sort = _changes(list.sort)
+    reverse = _changes(list.reverse)
+    del _changes
+
+
+def _child_list(children: list) -> list:
+    """Make the children list for a new block.
+
+    Large blocks get a _ChildList, so they can be indexed.
+    """
+    if len(children) >= INDEX_MIN_SIZE:
+        return _ChildList(children)
+    return children
+
+
 class Property:
     """Represents Property found in property files, like those used by Valve.
 
@@ -167,7 +255,7 @@ class Property:
         This is produced from Property.parse() calls.
     """
     # Helps decrease memory footprint with lots of Property values.
-    __slots__ = ('_folded_name', 'real_name', 'value')
+    __slots__ = ('_folded_name', 'real_name', 'value', '_index', '_parent')
 
     def __init__(
             self: 'Property',
@@ -183,6 +271,12 @@ class Property:
             None if name is None
             else name.casefold()
         )  # type: Optional[str]
+        # For large blocks, this is the value list, its version and a dict
+        # mapping folded names to the children with that name.
+        self._index = None  # type: Optional[Tuple[_ChildList, int, dict]]
+        # A weakref to the _ChildList which indexed us, so it can be told
+        # when we're renamed.
+        self._parent = None  # type: Optional[weakref.ref]
 
     @property
     def name(self) -> Optional[str]:
@@ -200,12 +294,21 @@ class Property:
             self._folded_name = None
         else:
             self._folded_name = new_name.casefold()
+        self._renamed()
+
+    def _renamed(self):
+        """Tell the block which indexed us that our name has changed."""
+        if self._parent is not None:
+            parent = self._parent()
+            if parent is not None:
+                parent.version += 1
 
     def edit(self, name=None, value=None):
         """Simultaneously modify the name and value."""
         if name is not None:
             self.real_name = name
             self._folded_name = name.casefold()
+            self._renamed()
         if value is not None:
             self.value = value
 
@@ -214,72 +317,106 @@ class Property:
         """Returns a Property tree parsed from given text.
 
         filename, if set should be the source of the text for debug purposes.
-        file_contents should be an iterable of strings
+        file_contents should be a string, a file object or an iterable of
+        lines.
         """
+        # The tree can't have reference cycles, so the garbage collector
+        # is just wasted time while we build up a large number of objects.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            # The special name 'None' marks it as the root property, which
+            # just outputs its children when exported. This way we can handle
+            # multiple root blocks in the file, while still returning a single
+            # Property object which has all the methods.
+            return Property(None, _child_list(list(
+                Property.iter_parse(file_contents, filename)
+            )))
+        finally:
+            if gc_enabled:
+                gc.enable()
 
-        file_iter = enumerate(file_contents, start=1)
+    @staticmethod
+    def iter_parse(file_contents, filename='') -> Iterator["Property"]:
+        """Parse text, yielding each root property once it is complete.
 
-        # The block we are currently adding to.
+        This takes the same parameters as parse(). Blocks are produced as
+        soon as their closing bracket is read, so each can be processed and
+        discarded without keeping the entire tree in memory.
+        """
+        line_iter = enumerate(read_lines(file_contents), start=1)
 
-        # The special name 'None' marks it as the root property, which
-        # just outputs its children when exported. This way we can handle
-        # multiple root blocks in the file, while still returning a single
-        # Property object which has all the methods.
-        cur_block = Property(None, [])
+        # A fake root property holds the top-level properties, until they
+        # are finished and can be yielded.
+        root = Property(None, [])
 
         # A queue of the properties we are currently in (outside to inside).
-        open_properties = [cur_block]
+        open_properties = [root]
+
+        # The list of children for the block we are currently adding to.
+        cur_list = root.value
 
         # Do we require a block to be opened next? ("name"\n must have { next.)
         requires_block = False
 
         is_identifier = _RE_IDENTIFIER.match
 
-        for line_num, line in file_iter:
-            if isinstance(line, bytes):
-                # Decode bytes using utf-8
-                line = line.decode('utf-8')
+        for line_num, line in line_iter:
             freshline = line.strip()
 
-            if not freshline or freshline[:2] == '//':
-                # Skip blank lines and comments!
+            if not freshline:
+                # Skip blank lines
                 continue
 
             if freshline[0] == '"':   # data string
                 line_contents = freshline.split('"')
-                name = line_contents[1]
-                try:
-                    value = line_contents[3]
-                except IndexError:  # It doesn't have a value - it's a block.
-                    cur_block.append(Property(name, ''))
-                    requires_block = True  # Ensure the next token must be a '{'.
-                    continue  # Ensure we skip the check for the above value
-
-                # Special case - comment between name/value sections -
-                # it's a name block then.
-                if line_contents[2].lstrip().startswith('//'):
-                    cur_block.append(Property(name, ''))
-                    requires_block = True
-                    continue
-                else:
-                    if len(line_contents) < 5:
-                        # It's a multiline value - no ending quote!
-                        value += read_multiline_value(
-                            file_iter,
-                            line_num,
-                            filename,
-                        )
-                    if value and '\\' in value:
-                        for orig, new in REPLACE_CHARS.items():
-                            value = value.replace(orig, new)
-
-                # Line_contents[4] is the start of the comment, check for [] flags.
-                if len(line_contents) >= 5:
-                    if read_flag(line_contents[4], filename, line_num):
-                        cur_block.append(Property(name, value))
+
+                if (
+                        len(line_contents) == 5 and
+                        not line_contents[4] and
+                        '/' not in line_contents[2] and
+                        '\\' not in line_contents[3]
+                        ):
+                    # The common case - "key" "value" with nothing
+                    # else on the line.
+                    cur_list.append(Property(
+                        line_contents[1],
+                        line_contents[3],
+                    ))
                 else:
-                    # No flag, add unconditionally
-                    cur_block.append(Property(name, value))
+                    name = line_contents[1]
+                    try:
+                        value = line_contents[3]
+                    except IndexError:  # It doesn't have a value - it's a block.
+                        cur_list.append(Property(name, ''))
+                        requires_block = True  # Ensure the next token must be a '{'.
+                        continue  # Ensure we skip the check for the above value
+
+                    # Special case - comment between name/value sections -
+                    # it's a name block then.
+                    if line_contents[2].lstrip().startswith('//'):
+                        cur_list.append(Property(name, ''))
+                        requires_block = True
+                        continue
+                    else:
+                        if len(line_contents) < 5:
+                            # It's a multiline value - no ending quote!
+                            value += read_multiline_value(
+                                line_iter,
+                                line_num,
+                                filename,
+                            )
+                        if value and '\\' in value:
+                            for orig, new in REPLACE_CHARS.items():
+                                value = value.replace(orig, new)
+
+                    # Line_contents[4] is the start of the comment, check for [] flags.
+                    if len(line_contents) >= 5:
+                        if read_flag(line_contents[4], filename, line_num):
+                            cur_list.append(Property(name, value))
+                    else:
+                        # No flag, add unconditionally
+                        cur_list.append(Property(name, value))
 
             elif freshline[0] == '{':
                 # Open a new block - make sure the last token was a name..
@@ -291,14 +428,16 @@ class Property:
                         line_num,
                     )
                 requires_block = False
-                cur_block = cur_block[-1]
-                cur_block.value = []
+                cur_block = cur_list[-1]
+                cur_block.value = cur_list = []
                 open_properties.append(cur_block)
             elif freshline[0] == '}':
                 # Move back a block
-                open_properties.pop()
+                closed = open_properties.pop()
+                if len(cur_list) >= INDEX_MIN_SIZE:
+                    closed.value = _ChildList(cur_list)
                 try:
-                    cur_block = open_properties[-1].value
+                    cur_list = open_properties[-1].value
                 except IndexError:
                     # No open blocks!
                     raise KeyValError(
@@ -306,11 +445,18 @@ class Property:
                         filename,
                         line_num,
                     )
+                if len(open_properties) == 1:
+                    # We're back at the root, so everything there is done.
+                    yield from cur_list
+                    cur_list.clear()
+            elif freshline[:2] == '//':
+                # Skip comments!
+                continue
 
             # Handle name bare on one line - it's a name block. This is used
             # in VMF files...
             elif is_identifier(freshline):
-                cur_block.append(Property(freshline, ''))
+                cur_list.append(Property(freshline, ''))
                 requires_block = True
                 continue
             else:
@@ -336,7 +482,144 @@ class Property:
                 filename,
                 line=None,
             )
-        return open_properties[0]
+        yield from root.value
+
+    @staticmethod
+    def parse_cached(path: str, encoding: str=None) -> "Property":
+        """Parse a file, using a cached copy of the tree if possible.
+
+        The tree is saved in binary form to path + CACHE_EXT. The cache is
+        used only if the file's modification time, size and contents
+        are unchanged, otherwise the text is parsed and the cache rewritten.
+        The encoding is used when reading the text, like with open().
+        """
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            data = file.read()
+        file_key = (stat.st_mtime_ns, stat.st_size, zlib.crc32(data))
+        cache_path = path + CACHE_EXT
+
+        try:
+            with open(cache_path, 'rb') as file:
+                cache_data = file.read()
+            (
+                magic, version, marshal_ver, *cache_key
+            ) = _CACHE_HEADER.unpack_from(cache_data)
+            if (
+                    magic == _CACHE_MAGIC and
+                    version == _CACHE_VERSION and
+                    marshal_ver == marshal.version and
+                    tuple(cache_key) == file_key
+                    ):
+                # Like parse(), the collector is just wasted time here.
+                gc_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    return Property._from_cache(None, marshal.loads(
+                        cache_data[_CACHE_HEADER.size:]
+                    ))
+                finally:
+                    if gc_enabled:
+                        gc.enable()
+        except (OSError, ValueError, EOFError, TypeError, struct.error):
+            # Missing or corrupt - ignore it, and replace it.
+            pass
+
+        props = Property.parse(
+            io.TextIOWrapper(io.BytesIO(data), encoding=encoding),
+            path,
+        )
+        try:
+            with utils.AtomicWriter(cache_path, is_bytes=True) as file:
+                file.write(_CACHE_HEADER.pack(
+                    _CACHE_MAGIC,
+                    _CACHE_VERSION,
+                    marshal.version,
+                    *file_key
+                ))
+                marshal.dump(props._to_cache(), file)
+        except OSError:
+            LOGGER.warning('Could not write cache for "{}"!', path)
+        return props
+
+    def _to_cache(self):
+        """Convert the tree into the plain values saved by parse_cached().
+
+        Names are interned, so marshal only stores each name once.
+        """
+        if isinstance(self.value, list):
+            return [
+                (sys.intern(prop.real_name), prop._to_cache())
+                for prop in self.value
+            ]
+        else:
+            return self.value
+
+    @staticmethod
+    def _from_cache(name: Optional[str], value: list) -> 'Property':
+        """Rebuild a Property block from the values made by _to_cache()."""
+        from_cache = Property._from_cache
+        children = []
+        for child_name, child_value in value:
+            if isinstance(child_value, str):
+                children.append(Property(child_name, child_value))
+            else:
+                children.append(from_cache(child_name, child_value))
+        return Property(name, _child_list(children))
+
+    def _name_index(self) -> Dict[str, List['Property']]:
+        """Return a dict mapping folded names to the children with that name.
+
+        This is only used when the value is a _ChildList. The index is
+        built the first time it's needed. It is rebuilt if the value list
+        is replaced or changed (even by editing .value directly), or if
+        one of the children is renamed.
+        """
+        value = self.value  # type: _ChildList
+        index = self._index
+        if (
+                index is not None and
+                index[0] is value and
+                index[1] == value.version
+                ):
+            return index[2]
+
+        # Without a callback, this is the same weakref every time.
+        parent = weakref.ref(value)
+        names = {}
+        for prop in value:
+            old_parent = prop._parent
+            if old_parent is not parent and old_parent is not None:
+                # The child is shared with another indexed block, which
+                # won't hear about renames any more. So it has to rebuild.
+                other = old_parent()
+                if other is not None:
+                    other.version += 1
+            prop._parent = parent
+            try:
+                names[prop._folded_name].append(prop)
+            except KeyError:
+                names[prop._folded_name] = [prop]
+        self._index = (value, value.version, names)
+        return names
+
+    def _find_indexed(self, key: str) -> List['Property']:
+        """Find all the children with this folded name, using the index."""
+        return self._name_index().get(key, [])
+
+    def _find_last(self, key: str) -> Optional['Property']:
+        """Find the last child with this folded name, or None."""
+        value = self.value
+        if type(value) is _ChildList:
+            props = self._find_indexed(key)
+            if props:
+                return props[-1]
+            return None
+
+        for prop in reversed(value):  # type: Property
+            if prop._folded_name == key:
+                return prop
+        return None
 
     def find_all(self, *keys) -> Iterator['Property']:
         """Search through a tree to obtain all properties that match a particular path.
@@ -347,6 +630,15 @@ class Property:
             raise ValueError("Cannot find_all without commands!")
 
         targ_key = keys[0].casefold()
+        if type(self.value) is _ChildList:
+            if depth > 1:
+                for prop in self._find_indexed(targ_key):
+                    if prop.has_children():
+                        yield from Property.find_all(prop, *keys[1:])
+            else:
+                yield from self._find_indexed(targ_key)
+            return
+
         for prop in self:
             if not isinstance(prop, Property):
                 raise ValueError(
@@ -367,9 +659,9 @@ class Property:
         - This prefers keys located closer to the end of the value list.
         """
         key = key.casefold()
-        for prop in reversed(self.value):  # type: Property
-            if prop._folded_name == key:
-                return prop
+        prop = self._find_last(key)
+        if prop is not None:
+            return prop
         if def_ is _NO_KEY_FOUND:
             raise NoKeyError(key)
         else:
@@ -408,17 +700,33 @@ class Property:
         except NoKeyError:
             current_prop.value.append(Property(path, value))
 
-    def copy(self):
-        """Deep copy this Property tree and return it."""
+    def copy(self, lazy=False):
+        """Deep copy this Property tree and return it.
+
+        If lazy is True, the copy shares this tree's children until it is
+        used. Then only the level being accessed is duplicated, so parts of
+        the copy which are never read or modified cost nothing. Changes to
+        this tree will show up in parts of lazy copies which haven't been
+        read yet, so only do this if the original won't be edited.
+        """
+        if lazy:
+            # Read the slot directly, so copying a lazy copy doesn't
+            # duplicate its children.
+            value = _VALUE_SLOT.__get__(self)
+            copy = Property(self.real_name, value)
+            if isinstance(value, list):
+                copy.__class__ = _LazyProperty
+            return copy
+
         if self.has_children():
             # This recurses if needed
             return Property(
                 self.real_name,
-                [
+                _child_list([
                     child.copy()
                     for child in
                     self.value
-                ]
+                ])
             )
         else:
             return Property(self.real_name, self.value)
@@ -504,10 +812,7 @@ class Property:
         """Check to see if a name is present in the children."""
         key = key.casefold()
         if self.has_children():
-            for prop in self.value:  # type: Property
-                if prop._folded_name == key:
-                    return True
-            return False
+            return self._find_last(key) is not None
 
         raise ValueError("Can't search through properties without children!")
 
@@ -558,6 +863,7 @@ class Property:
         if self.has_children():
             if isinstance(index, int) or isinstance(index, slice):
                 self.value[index] = value
+                self._index = None
             else:
                 self.set_key(index, value)
         else:
@@ -570,6 +876,7 @@ class Property:
         - If given a string, it will delete the last Property with that name.
         """
         if self.has_children():
+            self._index = None
             if isinstance(index, int):
                 del self.value[index]
             else:
@@ -607,6 +914,7 @@ class Property:
         This is the += op, where it does not copy the object.
         """
         if self.has_children():
+            self._index = None
             if isinstance(other, Property):
                 if other._folded_name is None:
                     self.value.extend(other.value)
@@ -659,29 +967,77 @@ class Property:
         return 'Property(' + repr(self.real_name) + ', ' + repr(self.value) + ')'
 
     def __str__(self):
-        return ''.join(self.export())
+        buffer = io.StringIO()
+        self.export_to(buffer)
+        return buffer.getvalue()
 
     def export(self):
         """Generate the set of strings for a property file.
 
-        Recursively calls itself for all child properties.
-        If the Property is marked invalid, it will immediately return.
+        This is a wrapper around export_to(), which is faster if the text
+        is just being written to a file.
         """
-        if isinstance(self.value, list):
-            if self.name is None:
+        lines = []
+        _export_props([self], '', lines.append)
+        yield from lines
+
+    def export_to(self, buffer, indent: str=''):
+        """Write the text for a property file into a file or other buffer.
+
+        Each line is prefixed with the given indent.
+        """
+        _export_props([self], indent, buffer.write)
+
+
+# The descriptor for the value slot, so _LazyProperty can bypass its property.
+_VALUE_SLOT = Property.value
+
+
+class _LazyProperty(Property):
+    """A Property block made by copy(lazy=True).
+
+    This shares the children list of the original. When the value is
+    first accessed or set, the children are replaced by lazy copies of
+    themselves, and this turns into a regular Property.
+    """
+    __slots__ = ()
+
+    @property
+    def value(self) -> _Prop_Value:
+        children = _child_list([
+            child.copy(lazy=True)
+            for child in
+            _VALUE_SLOT.__get__(self)
+        ])
+        self.__class__ = Property
+        self.value = children
+        return children
+
+    @value.setter
+    def value(self, value: _Prop_Value):
+        self.__class__ = Property
+        self.value = value
+
+
+def _export_props(props: List[Property], indent: str, write) -> None:
+    """Write out each Property, at the given indent level.
+
+    This recurses for child blocks. The indent for each level is only
+    built once, instead of being added to every line of the children.
+    """
+    block_indent = indent + '\t'
+    for prop in props:
+        value = prop.value
+        if isinstance(value, list):
+            if prop._folded_name is None:
                 # If the name is None, we just output the chilren
                 # without a "Name" { } surround. These Property
                 # objects represent the root.
-                for prop in self.value:
-                    yield from prop.export()
+                _export_props(value, indent, write)
             else:
-                yield '"' + self.real_name + '"\n'
-                yield '\t{\n'
-                yield from (
-                    '\t' + line
-                    for prop in self.value
-                    for line in prop.export()
-                    )
-                yield '\t}\n'
+                write(indent + '"' + prop.real_name + '"\n' +
+                      block_indent + '{\n')
+                _export_props(value, block_indent, write)
+                write(block_indent + '}\n')
         else:
-            yield '"' + self.real_name + '" "' + str(self.value) + '"\n'
+            write(indent + '"' + prop.real_name + '" "' + str(value) + '"\n')
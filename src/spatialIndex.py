@@ -0,0 +1,119 @@
+"""An index for quickly finding the boxes containing a point in the map.
+
+BoxIndex sorts boxes into a grid of cubes, storing each in every cell it
+overlaps. The boxes containing a point can then be found from that
+point's cell, instead of checking every box.
+"""
+from collections import defaultdict
+import itertools
+
+from utils import Vec, Vec_tuple
+
+from typing import (
+    Any, Iterator,
+    Dict, List, Tuple, Union,
+)
+
+# PeTI maps are built out of 128-unit blocks.
+DEFAULT_CELL_SIZE = 128
+# Boxes overlapping more cells than this are kept in a separate list
+# and checked against every point instead.
+MAX_BOX_CELLS = 512
+
+VecLike = Union[Vec, Tuple[float, float, float]]
+
+
+class BoxIndex:
+    """Stores items with bounding boxes, allowing finding the boxes around a point.
+
+    Each box is added to every cell it overlaps, so a point only needs to
+    check the boxes in its own cell. Items are always returned in the
+    order they were added.
+    """
+    __slots__ = ['cell_size', '_cells', '_large', '_count']
+
+    def __init__(self, cell_size: float=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        # Cell -> list of (order, min, max, item) tuples, sorted by order.
+        self._cells = defaultdict(list)  # type: Dict[Tuple[float, float, float], List[Tuple[int, Vec_tuple, Vec_tuple, Any]]]
+        # Boxes covering too many cells to store individually.
+        self._large = []  # type: List[Tuple[int, Vec_tuple, Vec_tuple, Any]]
+        self._count = 0
+
+    def _cell(self, x: float, y: float, z: float) -> Tuple[float, float, float]:
+        """Return the key for the cell containing this point."""
+        size = self.cell_size
+        return x // size, y // size, z // size
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        """Remove all the boxes."""
+        self._cells.clear()
+        self._large.clear()
+        self._count = 0
+
+    def add(self, bbox_min: VecLike, bbox_max: VecLike, item: Any):
+        """Add an item covering the given box, including the edges."""
+        min_x, min_y, min_z = bbox_min
+        max_x, max_y, max_z = bbox_max
+        entry = (
+            self._count,
+            Vec_tuple(min_x, min_y, min_z),
+            Vec_tuple(max_x, max_y, max_z),
+            item,
+        )
+        self._count += 1
+
+        if min_x > max_x or min_y > max_y or min_z > max_z:
+            # An inverted box can't contain anything.
+            return
+
+        cell_min_x, cell_min_y, cell_min_z = self._cell(min_x, min_y, min_z)
+        cell_max_x, cell_max_y, cell_max_z = self._cell(max_x, max_y, max_z)
+
+        box_cells = (
+            (cell_max_x - cell_min_x + 1) *
+            (cell_max_y - cell_min_y + 1) *
+            (cell_max_z - cell_min_z + 1)
+        )
+        if box_cells > MAX_BOX_CELLS:
+            self._large.append(entry)
+            return
+
+        # Entries are added in order, so each cell stays sorted.
+        for x in range(int(cell_min_x), int(cell_max_x) + 1):
+            for y in range(int(cell_min_y), int(cell_max_y) + 1):
+                for z in range(int(cell_min_z), int(cell_max_z) + 1):
+                    self._cells[x, y, z].append(entry)
+
+    def _candidates(self, x: float, y: float, z: float):
+        """Return the entries which might contain this point."""
+        cell = self._cells.get(self._cell(x, y, z), ())
+        if not self._large:
+            return cell
+        elif not cell:
+            return self._large
+        else:
+            return sorted(itertools.chain(cell, self._large))
+
+    def iter_point(self, pos: VecLike) -> Iterator[Any]:
+        """Yield the items whose boxes contain this point, in order."""
+        x, y, z = pos
+        for order, bbox_min, bbox_max, item in self._candidates(x, y, z):
+            if (
+                    bbox_min[0] <= x <= bbox_max[0] and
+                    bbox_min[1] <= y <= bbox_max[1] and
+                    bbox_min[2] <= z <= bbox_max[2]
+                    ):
+                yield item
+
+    def find_first(self, pos: VecLike, default: Any=None) -> Any:
+        """Return the first added item whose box contains this point.
+
+        If none do, default is returned.
+        """
+        for item in self.iter_point(pos):
+            return item
+        return default
@@ -0,0 +1,212 @@
+"""Test the condition system."""
+import unittest
+
+from property_parser import Property
+import conditions
+# Register the flags.
+import conditions.instances
+import conditions.logical
+import conditions.profiling
+import vmfLib
+
+
+class FileFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.old_vmf = conditions.VMF
+        vmf = conditions.VMF = vmfLib.VMF()
+        self.insts = [
+            vmf.create_ent(classname='func_instance', file=file)
+            for file in [
+                'instances/a.vmf',
+                'INSTANCES/B.vmf',
+                'instances/a.vmf',
+                'instances/c.vmf',
+            ]
+        ]
+        # Not an instance, so never checked.
+        vmf.create_ent(classname='info_target', file='instances/a.vmf')
+
+    def tearDown(self):
+        conditions.VMF = self.old_vmf
+
+    def test_leading_flags(self):
+        """Only leading file flags are used."""
+        cond = conditions.Condition(flags=[
+            Property('instance', 'instances/A.vmf'),
+            Property('instVar', '$x 1'),
+            Property('instFlag', 'b.vmf'),
+        ])
+        self.assertEqual(len(cond.file_filters()), 1)
+
+        cond = conditions.Condition(flags=[
+            Property('instVar', '$x 1'),
+            Property('instance', 'instances/a.vmf'),
+        ])
+        self.assertEqual(cond.file_filters(), [])
+
+        cond = conditions.Condition(
+            flags=[Property('instance', 'instances/a.vmf')],
+            else_results=[Property('nothing', '')],
+        )
+        self.assertEqual(cond.file_filters(), [])
+
+    def test_filter(self):
+        """filter_instances() finds the instances the flags pass on."""
+        cond = conditions.Condition(flags=[
+            Property('instFlag', 'instances/'),
+            Property('instance', 'instances/a.vmf'),
+        ])
+        found = conditions.filter_instances(
+            conditions.VMF.by_class['func_instance'],
+            cond.file_filters(),
+        )
+        self.assertEqual(found, [self.insts[0], self.insts[2]])
+
+        self.insts[1]['file'] = 'instances/a.vmf'
+        found = conditions.filter_instances(
+            conditions.VMF.by_class['func_instance'],
+            cond.file_filters(),
+        )
+        self.assertEqual(found, self.insts[:3])
+
+    def test_added_instances(self):
+        """Instances added by a condition's own results are tested too."""
+        added = []
+
+        def add_inst(inst, res):
+            inst.fixup['seen'] = '1'
+            if not added:
+                added.append(conditions.VMF.create_ent(
+                    classname='func_instance',
+                    file='instances/a.vmf',
+                ))
+
+        conditions.RESULT_LOOKUP['testaddinst'] = add_inst
+        try:
+            conditions.check_condition(conditions.Condition(
+                flags=[Property('instance', 'instances/a.vmf')],
+                results=[Property('testAddInst', '')],
+            ))
+        finally:
+            del conditions.RESULT_LOOKUP['testaddinst']
+
+        self.assertEqual(len(added), 1)
+        for inst in [self.insts[0], self.insts[2], added[0]]:
+            self.assertEqual(inst.fixup['seen', ''], '1')
+        self.assertEqual(self.insts[1].fixup['seen', ''], '')
+
+
+class CompileFlagTest(unittest.TestCase):
+    def setUp(self):
+        self.inst = vmfLib.VMF().create_ent(
+            classname='func_instance',
+            file='instances/a.vmf',
+        )
+        self.inst.fixup['num'] = '5'
+        self.inst.fixup['text'] = 'abc'
+
+    def check(self, name, value):
+        """Compile a flag, and check it on the instance."""
+        if isinstance(value, list):
+            value = [Property(*sub) for sub in value]
+        return conditions.compile_flag(Property(name, value))(self.inst)
+
+    def test_instvar(self):
+        self.assertTrue(self.check('instVar', '$num 5'))
+        self.assertTrue(self.check('instVar', '$num == 5.0'))
+        self.assertTrue(self.check('instVar', '$num > 4'))
+        self.assertFalse(self.check('instVar', '$num <= 4.5'))
+        # Compared as strings if either isn't a number.
+        self.assertTrue(self.check('instVar', '$text > 4'))
+        self.assertTrue(self.check('instVar', '$num < abc'))
+        self.assertFalse(self.check('instVar', '$text = abd'))
+
+    def test_invalid(self):
+        """Malformed flags log a warning, and always fail."""
+        with self.assertLogs(conditions.LOGGER.logger, 'WARNING') as logs:
+            self.assertFalse(self.check('instVar', '$num'))
+            self.assertFalse(self.check('instVar', '$num == 5 6'))
+            self.assertFalse(self.check('OR', [('instVar', '$num 5 6 7')]))
+        self.assertEqual(len(logs.records), 3)
+        self.assertIn('instVar', logs.output[0])
+
+    def test_logical(self):
+        passing = ('instance', 'instances/A.vmf')
+        failing = ('instFlag', 'b.vmf')
+        self.assertTrue(self.check('OR', [failing, passing]))
+        self.assertFalse(self.check('OR', [failing]))
+        self.assertFalse(self.check('AND', [passing, failing]))
+        self.assertTrue(self.check('AND', []))
+        self.assertTrue(self.check('NOT', [failing]))
+        self.assertFalse(self.check('NOT', [passing]))
+        self.assertTrue(self.check('NOR', [failing]))
+        self.assertTrue(self.check('NAND', [failing, passing]))
+
+    def test_unknown(self):
+        """Invalid flags always fail."""
+        self.assertFalse(self.check('notAFlag', ''))
+
+
+class ProfileTest(unittest.TestCase):
+    def test_parse_source(self):
+        """The Source key isn't treated as a flag."""
+        cond = conditions.Condition.parse(Property('Condition', [
+            Property('instance', 'instances/a.vmf'),
+            Property('Source', 'PAK:ITEM'),
+        ]))
+        self.assertEqual(cond.source, 'PAK:ITEM')
+        self.assertEqual(len(cond.flags), 1)
+
+    def test_wrap_flag(self):
+        """Wrapped flags total up their calls."""
+        profiler = conditions.profiling.ConditionProfiler()
+        inst = vmfLib.VMF().create_ent(
+            classname='func_instance',
+            file='instances/a.vmf',
+        )
+        flag = Property('instance', 'instances/a.vmf')
+        check = profiler.wrap_flag(flag, conditions.compile_flag(flag))
+        self.assertTrue(check(inst))
+        inst['file'] = 'instances/b.vmf'
+        self.assertFalse(check(inst))
+
+        stat = profiler.flags['instance']
+        self.assertEqual(stat.calls, 2)
+        self.assertEqual(stat.passed, 1)
+        self.assertIn('instance', conditions.profiling.format_table([stat]))
+
+    def test_passed_on_raise(self):
+        """Conditions count as passed even if a result ends them early."""
+        orig_test = conditions.Condition.test
+        # Keep the staticmethod wrapper.
+        orig_test_result = vars(conditions.Condition)['test_result']
+
+        def restore():
+            conditions.Condition.test = orig_test
+            conditions.Condition.test_result = orig_test_result
+        self.addCleanup(restore)
+
+        def next_inst(inst, res):
+            raise conditions.NextInstance
+        conditions.RESULT_LOOKUP['testnextinst'] = next_inst
+        self.addCleanup(conditions.RESULT_LOOKUP.pop, 'testnextinst')
+
+        profiler = conditions.profiling.ConditionProfiler()
+        profiler.install()
+        cond = conditions.Condition(
+            flags=[Property('instance', 'instances/a.vmf')],
+            results=[Property('testNextInst', '')],
+        )
+        inst = vmfLib.VMF().create_ent(
+            classname='func_instance',
+            file='instances/a.vmf',
+        )
+        with self.assertRaises(conditions.NextInstance):
+            cond.test(inst)
+        stat = profiler.conditions[cond]
+        self.assertEqual(stat.calls, 1)
+        self.assertEqual(stat.passed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,313 @@
+"""Test the Property parser."""
+import io
+import os
+import tempfile
+import unittest
+
+from property_parser import (
+    Property, KeyValError, NoKeyError,
+    CACHE_EXT, INDEX_MIN_SIZE, _ChildList,
+)
+
+PARSE_TEXT = '''\
+// A comment at the start
+"Root1"
+    {
+    "key" "value"
+    "Escaped" "tab\\there\\nnewline"
+    "Flagged" "pc" [win32]
+    "Commented" "val" // This is ignored
+
+    "Block" // Comment between name and block
+        {
+        "multi" "first line
+        second line"
+        }
+    }
+bare_name
+    {
+    "Key"	"tabbed"
+    }
+'''
+
+
+def flatten(prop):
+    """Convert a tree into nested tuples, so it can be compared."""
+    if prop.has_children():
+        return prop.real_name, [flatten(child) for child in prop]
+    return prop.real_name, prop.value
+
+
+class ParseTest(unittest.TestCase):
+    def check_tree(self, tree):
+        self.assertEqual(flatten(tree), (None, [
+            ('Root1', [
+                ('key', 'value'),
+                ('Escaped', 'tab\there\nnewline'),
+                ('Flagged', 'pc'),
+                ('Commented', 'val'),
+                ('Block', [
+                    ('multi', 'first line\nsecond line'),
+                ]),
+            ]),
+            ('bare_name', [
+                ('Key', 'tabbed'),
+            ]),
+        ]))
+
+    def test_parse(self):
+        self.check_tree(Property.parse(PARSE_TEXT))
+
+    def test_parse_sources(self):
+        """Files, lines with or without newlines, and bytes all work."""
+        lines = PARSE_TEXT.splitlines()
+        self.check_tree(Property.parse(io.StringIO(PARSE_TEXT)))
+        self.check_tree(Property.parse(io.BytesIO(PARSE_TEXT.encode('utf8'))))
+        self.check_tree(Property.parse(lines))
+        self.check_tree(Property.parse(PARSE_TEXT.splitlines(keepends=True)))
+        self.check_tree(Property.parse(
+            [line.encode('utf8') for line in lines]
+        ))
+
+    def test_iter_parse(self):
+        """Root blocks are produced as soon as they are closed."""
+        lines = iter(PARSE_TEXT.splitlines())
+        blocks = Property.iter_parse(lines)
+        root1 = next(blocks)
+        self.assertEqual(root1.real_name, 'Root1')
+        # The second block hasn't been read yet.
+        self.assertEqual(next(lines).strip(), 'bare_name')
+
+        # Files are also read a line at a time.
+        file = io.StringIO(PARSE_TEXT)
+        root1 = next(Property.iter_parse(file))
+        self.assertEqual(root1.real_name, 'Root1')
+        self.assertEqual(file.readline().strip(), 'bare_name')
+
+        text = '"a" "1"\n"b"\n{\n"c" "2"\n}\n"d" "3"\n'
+        self.assertEqual(
+            [flatten(prop) for prop in Property.iter_parse(text)],
+            [('a', '1'), ('b', [('c', '2')]), ('d', '3')],
+        )
+
+    def test_export_roundtrip(self):
+        tree = Property.parse(PARSE_TEXT)
+        exported = ''.join(tree.export())
+        self.assertEqual(flatten(Property.parse(exported)), flatten(tree))
+
+    def test_export_to(self):
+        tree = Property('Root', [
+            Property('key', 'value'),
+            Property('Block', [Property('inner', '1')]),
+        ])
+        expected = (
+            '"Root"\n'
+            '\t{\n'
+            '\t"key" "value"\n'
+            '\t"Block"\n'
+            '\t\t{\n'
+            '\t\t"inner" "1"\n'
+            '\t\t}\n'
+            '\t}\n'
+        )
+        buffer = io.StringIO()
+        tree.export_to(buffer)
+        self.assertEqual(buffer.getvalue(), expected)
+        self.assertEqual(''.join(tree.export()), expected)
+        self.assertEqual(str(tree), expected)
+
+        buffer = io.StringIO()
+        Property(None, [tree]).export_to(buffer, '\t')
+        self.assertEqual(
+            buffer.getvalue(),
+            ''.join('\t' + line for line in expected.splitlines(True)),
+        )
+
+    def assert_error_line(self, text, line_num):
+        with self.assertRaises(KeyValError) as ctx:
+            Property.parse(text, 'test.txt')
+        self.assertEqual(ctx.exception.line_num, line_num)
+        self.assertEqual(ctx.exception.file, 'test.txt')
+
+    def test_errors(self):
+        self.assert_error_line('"a" "b"\n{\n}\n', 2)
+        self.assert_error_line('"a"\n{\n}\n}\n', 4)
+        self.assert_error_line('"a"\n\n"b" "c"\n', 3)
+        self.assert_error_line('"a"\n{\n"b" "c" extra\n}\n', 3)
+        self.assert_error_line('"a"\n{\n"b" "c" [flag\n}\n', 3)
+        self.assert_error_line('"a" "multi\nline\n\nvalue\n', 4)
+        self.assert_error_line('"a"\n{\n"b" "c"\n', None)
+
+    def test_parse_cached(self):
+        """The cache is written, reused, and ignored once the file changes."""
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'test.cfg')
+            with open(path, 'w') as file:
+                file.write(PARSE_TEXT)
+
+            self.check_tree(Property.parse_cached(path))
+            self.assertTrue(os.path.exists(path + CACHE_EXT))
+            self.check_tree(Property.parse_cached(path))
+
+            with open(path, 'w') as file:
+                file.write('"Changed" "value"\n')
+            self.assertEqual(
+                flatten(Property.parse_cached(path)),
+                (None, [('Changed', 'value')]),
+            )
+
+            # A corrupt cache is just replaced.
+            with open(path + CACHE_EXT, 'wb') as file:
+                file.write(b'garbage')
+            self.assertEqual(
+                flatten(Property.parse_cached(path)),
+                (None, [('Changed', 'value')]),
+            )
+            self.assertEqual(
+                flatten(Property.parse_cached(path)),
+                (None, [('Changed', 'value')]),
+            )
+
+    def test_lazy_copy(self):
+        """Lazy copies match deep copies, and don't affect the original."""
+        tree = Property.parse(PARSE_TEXT)
+        copy = tree.copy(lazy=True)
+        self.assertEqual(flatten(copy), flatten(tree))
+        self.assertEqual(
+            flatten(copy.copy(lazy=True)),
+            flatten(tree.copy()),
+        )
+
+        copy = tree.copy(lazy=True)
+        copy.find_key('Root1').find_key('Block')['multi'] = 'changed'
+        copy.find_key('bare_name').value.append(Property('new', 'value'))
+        copy.find_key('Root1').value = 'replaced'
+        self.check_tree(tree)
+        self.assertEqual(flatten(copy), (None, [
+            ('Root1', 'replaced'),
+            ('bare_name', [
+                ('Key', 'tabbed'),
+                ('new', 'value'),
+            ]),
+        ]))
+
+        # Copying a lazy copy doesn't change the first one.
+        copy = tree.copy(lazy=True)
+        copy.copy(lazy=True).find_key('bare_name')['Key'] = 'changed'
+        self.assertEqual(copy.find_key('bare_name')['Key'], 'tabbed')
+        self.check_tree(tree)
+
+
+class IndexTest(unittest.TestCase):
+    """Check lookups on blocks large enough to use the name index."""
+    def setUp(self):
+        # Only parsed or copied blocks can be indexed.
+        self.block = Property.parse(
+            '"Block"\n{\n' +
+            ''.join(
+                '"Key{}" "{}"\n'.format(i % 10, i)
+                for i in range(100)
+            ) +
+            '}\n'
+        ).find_key('Block')
+        self.assertGreaterEqual(len(self.block), INDEX_MIN_SIZE)
+        self.assertIsInstance(self.block.value, _ChildList)
+
+    def test_last_key_wins(self):
+        self.assertEqual(self.block['key2'], '92')
+        self.assertEqual(self.block.find_key('KEY2').value, '92')
+        self.assertEqual(
+            [prop.value for prop in self.block.find_all('key2')],
+            [str(i) for i in range(2, 100, 10)],
+        )
+        self.assertIn('kEy5', self.block)
+        self.assertNotIn('missing', self.block)
+        self.assertEqual(self.block['missing', 'default'], 'default')
+        with self.assertRaises(NoKeyError):
+            self.block.find_key('missing')
+
+    def test_mutation(self):
+        self.assertEqual(self.block['key3'], '93')
+
+        self.block.append(Property('key3', 'appended'))
+        self.assertEqual(self.block['key3'], 'appended')
+
+        self.block += [Property('new', 'added')]
+        self.assertEqual(self.block['new'], 'added')
+
+        del self.block['key3']
+        self.assertEqual(self.block['key3'], '93')
+
+        self.block[0] = Property('replaced', 'value')
+        self.assertEqual(self.block['replaced'], 'value')
+        self.assertNotIn('key0', self.block[:1])
+
+        self.block['key4'] = 'set'
+        self.assertEqual(self.block['key4'], 'set')
+
+        # Editing the list directly, or renaming children also works.
+        self.block.value.append(Property('direct', 'value'))
+        self.assertEqual(self.block['direct'], 'value')
+        self.block.value[-1].name = 'renamed'
+        self.assertEqual(self.block['direct', None], None)
+        self.assertEqual(self.block['renamed'], 'value')
+
+    def test_direct_edits(self):
+        """Edits to .value which keep the same length are noticed."""
+        self.assertEqual(self.block['key1'], '91')
+
+        old = self.block.value[1]
+        self.block.value[1] = Property('swapped', 'value')
+        self.assertEqual(self.block['swapped'], 'value')
+        self.assertNotIn(old, list(self.block.find_all('key1')))
+
+        last = self.block.value[-1]
+        self.block.value.remove(last)
+        self.block.value.append(Property('other', 'value'))
+        self.assertEqual(self.block['key9'], '89')
+        self.assertEqual(self.block['other'], 'value')
+
+        # A child renamed to a name which wasn't there before.
+        self.block.value[0].name = 'first'
+        self.assertEqual(self.block['first'], '0')
+
+    def test_copies(self):
+        """Copies of indexed blocks are indexed too."""
+        for copy in [self.block.copy(), self.block.copy(lazy=True)]:
+            self.assertIsInstance(copy.value, _ChildList)
+            copy.value[2] = Property('changed', 'value')
+            self.assertEqual(copy['changed'], 'value')
+            self.assertEqual(copy['key2'], '92')
+        self.assertNotIn('changed', self.block)
+
+    def test_renames(self):
+        """Renaming a child only rebuilds the index of its own block."""
+        other = self.block.copy()
+        self.assertEqual(self.block['key5'], '95')
+        self.assertEqual(other['key5'], '95')
+        other_index = other._index
+
+        self.block.value[5].name = 'renamed'
+        self.assertEqual(self.block['renamed'], '5')
+        self.block.find_key('key6').edit(name='edited')
+        self.assertEqual(self.block['edited'], '96')
+        self.assertEqual(self.block['key6'], '86')
+        self.assertIs(other._index, other_index)
+        self.assertEqual(other['key5'], '95')
+        self.assertIs(other._index, other_index)
+
+        # A child in two indexed blocks still updates both.
+        shared = Property('shared', 'value')
+        self.block.append(shared)
+        other.append(shared)
+        self.assertEqual(self.block['shared'], 'value')
+        self.assertEqual(other['shared'], 'value')
+        shared.name = 'moved'
+        self.assertNotIn('shared', self.block)
+        self.assertNotIn('shared', other)
+        self.assertEqual(self.block['moved'], 'value')
+        self.assertEqual(other['moved'], 'value')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Test the spatial index."""
+import random
+import unittest
+
+from utils import Vec
+from spatialIndex import BoxIndex
+
+
+class BoxIndexTest(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(5678)
+        self.boxes = []
+        for _ in range(300):
+            pos = Vec(
+                rand.randrange(-1024, 1024, 128),
+                rand.randrange(-1024, 1024, 128),
+                rand.randrange(-512, 512, 128),
+            )
+            self.boxes.append((
+                pos - Vec(rand.randint(0, 2), rand.randint(0, 2), rand.randint(0, 4)) * 128,
+                pos + Vec(rand.randint(0, 2), rand.randint(0, 2), rand.randint(0, 4)) * 128,
+            ))
+        # A box bigger than the map, and an inverted one.
+        self.boxes.insert(150, (Vec(-8192, -8192, -8192), Vec(8192, 8192, 8192)))
+        self.boxes.insert(50, (Vec(128, 128, 128), Vec(0, 0, 0)))
+        self.index = BoxIndex()
+        for i, (bbox_min, bbox_max) in enumerate(self.boxes):
+            self.index.add(bbox_min, bbox_max, i)
+
+    def test_point(self):
+        """iter_point() and find_first() should match checking every box."""
+        rand = random.Random(91011)
+        self.assertEqual(len(self.index), 302)
+        points = [
+            Vec(
+                rand.randrange(-1280, 1280, 64),
+                rand.randrange(-1280, 1280, 64),
+                rand.randrange(-768, 768, 64),
+            )
+            for _ in range(500)
+        ]
+        # Directly on box edges.
+        points += [bbox_min for bbox_min, bbox_max in self.boxes[:50]]
+        points += [bbox_max for bbox_min, bbox_max in self.boxes[:50]]
+        for pos in points:
+            expected = [
+                i for i, (bbox_min, bbox_max) in enumerate(self.boxes)
+                if bbox_min <= pos <= bbox_max
+            ]
+            self.assertEqual(list(self.index.iter_point(pos)), expected)
+            self.assertEqual(
+                self.index.find_first(pos, -1),
+                expected[0] if expected else -1,
+            )
+
+    def test_clear(self):
+        """Clearing removes all the boxes."""
+        self.index.clear()
+        self.assertEqual(len(self.index), 0)
+        self.assertIsNone(self.index.find_first(Vec(0, 0, 0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
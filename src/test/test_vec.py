@@ -212,6 +212,25 @@ class VecTest(unittest.TestCase):
                 test(num, num, num, num, 0, num2)
                 test(num, num, num, num, num, 0)
 
+    def test_from_str(self):
+        """Test Vec.from_str(), including the cached and invalid cases."""
+        for x, y, z in iter_vec(VALID_ZERONUMS):
+            text = '{} {} {}'.format(x, y, z)
+            self.assertVec(Vec.from_str(text), x, y, z)
+            # A second lookup will come from the cache.
+            self.assertVec(Vec.from_str(text), x, y, z)
+            for brackets in ['()', '{}', '[]', '<>']:
+                self.assertVec(
+                    Vec.from_str(brackets[0] + text + brackets[1]),
+                    x, y, z,
+                )
+
+            self.assertVec(Vec.from_str(Vec(x, y, z)), x, y, z)
+
+        for text in ['', '1 2', '1 2 3 4', 'a b c', '1 2 x', ' 1 2', '()']:
+            self.assertVec(Vec.from_str(text), 0, 0, 0, text)
+            self.assertVec(Vec.from_str(text, 1, 2, 3), 1, 2, 3, text)
+
     def test_scalar_zero(self):
         """Check zero behaviour with division ops."""
         for x, y, z in iter_vec(VALID_NUMS):
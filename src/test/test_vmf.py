@@ -0,0 +1,482 @@
+"""Test the VMF library."""
+import io
+import os
+import tempfile
+import unittest
+
+from property_parser import Property
+from utils import Vec
+import vmfLib
+
+SIDE_TEXT = '''\
+side
+{
+\t"id" "1"
+\t"plane" "(0 0 128) (128 0 128) (128 -128 128)"
+\t"material" "TILE/WHITE_FLOOR_TILE002A"
+\t"uaxis" "[1 0 0 0] 0.25"
+\t"vaxis" "[0 -1 0 0] 0.25"
+\t"rotation" "0"
+\t"lightmapscale" "16"
+\t"smoothing_groups" "0"
+}
+'''
+
+
+class IDManTest(unittest.TestCase):
+    def test_lowest_free(self):
+        """IDs are always the lowest free one."""
+        ids = vmfLib.IDMan()
+        self.assertEqual([ids.get_id() for _ in range(5)], [1, 2, 3, 4, 5])
+        self.assertEqual(ids.get_id(10), 10)
+        self.assertEqual(ids.get_id(3), 6)
+        ids.remove(4)
+        ids.discard(2)
+        ids.discard(2)
+        self.assertEqual(ids.get_id(4), 4)
+        self.assertEqual(ids.get_id(), 2)
+        self.assertEqual([ids.get_id() for _ in range(4)], [7, 8, 9, 11])
+        ids.get_id(0)
+        ids.remove(0)
+        self.assertEqual(ids.get_id(), 12)
+
+
+class ParseOrderTest(unittest.TestCase):
+    def test_id_order(self):
+        """Entities, then hidden entities, then the world claim IDs."""
+        def solid(mat):
+            return (
+                'solid\n{\n"id" "3"\n' +
+                SIDE_TEXT.replace('TILE/WHITE_FLOOR_TILE002A', mat) +
+                '}\n'
+            )
+        text = (
+            'world\n{\n"id" "5"\n"classname" "worldspawn"\n' +
+            solid('world') + '}\n'
+            'hidden\n{\nentity\n{\n"id" "2"\n' +
+            solid('hidden') + '}\n}\n'
+            'entity\n{\n"id" "2"\n' + solid('visible') + '}\n'
+        )
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'map.vmf')
+            with open(path, 'w') as file:
+                file.write(text)
+            maps = [
+                vmfLib.VMF.parse(path),
+                vmfLib.VMF.parse(Property.parse(text)),
+            ]
+        for vmf in maps:
+            ent, hidden = vmf.entities
+            self.assertEqual(ent.solids[0].sides[0].mat, 'visible')
+            self.assertEqual(ent.id, 2)
+            self.assertEqual(ent.solids[0].id, 3)
+            self.assertEqual(hidden.solids[0].sides[0].mat, 'hidden')
+            self.assertEqual(hidden.id, 3)
+            self.assertEqual(hidden.editor['logicalpos'], '[0 3]')
+            self.assertEqual(hidden.solids[0].id, 1)
+            self.assertEqual(vmf.brushes[0].id, 2)
+
+
+class SideTest(unittest.TestCase):
+    def setUp(self):
+        self.vmf = vmfLib.VMF()
+        self.side = vmfLib.Side.parse(
+            self.vmf,
+            Property.parse(SIDE_TEXT).find_key('side'),
+        )
+
+    def test_planes(self):
+        """The plane points modify the side they came from."""
+        side = self.side
+        self.assertEqual(side.planes[1], Vec(128, 0, 128))
+        side.planes[0].z = 64
+        side.planes[2] += (1, 2, 3)
+        self.assertEqual(side.planes[0], Vec(0, 0, 64))
+        self.assertEqual(side.planes[2], Vec(129, -126, 131))
+
+        side.planes = [(0, 0, 0), Vec(1, 2, 3), ('4', '5', '6')]
+        self.assertEqual(side.planes[1], Vec(1, 2, 3))
+        self.assertEqual(side.planes[2], Vec(4, 5, 6))
+
+        bbox_min, bbox_max = side.get_bbox()
+        self.assertEqual(bbox_min, Vec(0, 0, 0))
+        self.assertEqual(bbox_max, Vec(4, 5, 6))
+
+    def test_copy(self):
+        copy = self.side.copy()
+        self.assertIs(copy.mat, self.side.mat)
+        copy.translate(Vec(0, 0, 16))
+        self.assertEqual(copy.planes[0], Vec(0, 0, 144))
+        self.assertEqual(self.side.planes[0], Vec(0, 0, 128))
+
+    def test_export(self):
+        buffer = io.StringIO()
+        self.side.export(buffer)
+        self.assertEqual(buffer.getvalue(), SIDE_TEXT)
+
+
+class LazySideTest(unittest.TestCase):
+    def parse(self, text):
+        return vmfLib.Side.parse(
+            vmfLib.VMF(),
+            Property.parse(text).find_key('side'),
+            lazy=True,
+        )
+
+    def export(self, side):
+        buffer = io.StringIO()
+        side.export(buffer)
+        return buffer.getvalue()
+
+    def test_verbatim(self):
+        """Unused values are exported exactly as they were."""
+        text = SIDE_TEXT.replace('[1 0 0 0]', '[1.0000 0 0 0.00]')
+        side = self.parse(text)
+        side.mat = 'TILE/WHITE_FLOOR_TILE002A'
+        self.assertEqual(self.export(side), text)
+
+        self.assertEqual(side.uaxis.x, 1)
+        self.assertEqual(self.export(side), SIDE_TEXT)
+
+    def test_parse_on_use(self):
+        """Values are parsed and modified like an ordinary side."""
+        side = self.parse(SIDE_TEXT)
+        self.assertFalse(side.is_disp)
+        self.assertEqual(side.get_origin(), Vec(64, -64, 128))
+        side.translate(Vec(0, 0, 16))
+        self.assertEqual(side.planes[0], Vec(0, 0, 144))
+        side.vaxis = vmfLib.UVAxis(0, 0, -1)
+        self.assertIn('"vaxis" "[0 0 -1 0] 0.25"', self.export(side))
+
+        side = self.parse(SIDE_TEXT.replace(
+            '"plane" "(0 0 128)', '"plane" "(0 0 abc)',
+        ))
+        with self.assertRaises(ValueError):
+            side.get_bbox()
+
+    def test_disp(self):
+        """Displacement data is read when first used."""
+        text = SIDE_TEXT[:-2] + (
+            '\tdispinfo\n'
+            '\t{\n'
+            '\t\t"power" "2"\n'
+            '\t\t"startposition" "[0 -128 128]"\n'
+            '\t\t"flags" "0"\n'
+            '\t\t"elevation" "0"\n'
+            '\t\t"subdiv" "0"\n'
+            '\t\tdistances\n'
+            '\t\t{\n'
+            '\t\t\t"row1" "4 4 4 4 4"\n'
+            '\t\t\t"row0" "1 2 3 4 5"\n'
+            '\t\t}\n'
+            '\t}\n'
+            '}\n'
+        )
+        side = self.parse(text)
+        self.assertTrue(side.is_disp)
+        self.assertEqual(side.disp_power, 2)
+        self.assertEqual(side.disp_pos, Vec(0, -128, 128))
+        self.assertEqual(side.disp_data['distances'], [
+            '1 2 3 4 5',
+            '4 4 4 4 4',
+        ])
+
+        side = self.parse(text)
+        side.disp_elev = 16
+        self.assertEqual(side.disp_power, 2)
+        self.assertIn('"elevation" "16"', self.export(side))
+
+
+class ExportTest(unittest.TestCase):
+    def test_chunked(self):
+        """Writing to a file in chunks matches the returned string."""
+        vmf = vmfLib.VMF()
+        for x in range(0, 1024, 128):
+            vmf.add_brush(vmf.make_prism(
+                Vec(x, 0, 0),
+                Vec(x + 128, 128, 128),
+            ).solid)
+        ent = vmf.create_ent(classname='func_detail')
+        ent.solids.append(vmf.make_prism(Vec(0, 0, 0), Vec(64, 64, 64)).solid)
+        ent.add_out(vmfLib.Output('OnTrigger', 'target', 'Kill'))
+
+        text = vmf.export(inc_version=False)
+        old_size = vmfLib.EXPORT_CHUNK_SIZE
+        vmfLib.EXPORT_CHUNK_SIZE = 256
+        try:
+            buffer = io.StringIO()
+            vmf.export(buffer, inc_version=False)
+        finally:
+            vmfLib.EXPORT_CHUNK_SIZE = old_size
+        self.assertEqual(buffer.getvalue(), text)
+        self.assertEqual(text.count('\tsolid\n'), 9)
+        self.assertIn('\t\t"OnTrigger" "target\x1bKill\x1b\x1b0\x1b-1"\n', text)
+
+
+class LocaliseTest(unittest.TestCase):
+    def setUp(self):
+        self.vmf = vmfLib.VMF()
+        self.brushes = []
+        for x in range(-2, 3):
+            prism = self.vmf.make_prism(
+                Vec(x * 64, -32, 0),
+                Vec(x * 64 + 48, 32, x * 16 + 64),
+            )
+            prism.north.uaxis.offset = 37 * x
+            prism.top.vaxis.scale = 0.5
+            self.brushes.append(prism.solid)
+        # NumPy's round() gives different results for these.
+        prism = self.vmf.make_prism(
+            Vec(0.0005, 12.3455, -2.0005),
+            Vec(64, 64.0015, 64),
+        )
+        self.brushes.append(prism.solid)
+
+    def check(self, origin, angles):
+        """localise_many() matches Solid.localise()."""
+        brushes = [brush.copy() for brush in self.brushes]
+        copies = [brush.copy() for brush in self.brushes]
+        for brush in brushes:
+            brush.localise(origin, angles)
+        vmfLib.localise_many(copies, origin, angles)
+        for brush, copy in zip(brushes, copies):
+            orig_text = io.StringIO()
+            copy_text = io.StringIO()
+            brush.export(orig_text)
+            copy.export(copy_text)
+            # IDs differ, so skip those lines.
+            self.assertEqual(
+                [line for line in orig_text.getvalue().splitlines()
+                 if '"id"' not in line],
+                [line for line in copy_text.getvalue().splitlines()
+                 if '"id"' not in line],
+            )
+
+    def check_all(self):
+        self.check(Vec(128, -64, 32), None)
+        self.check(Vec(0, 0, 0), Vec(0, 0, 0))
+        self.check(Vec(0, 0, 0), Vec(0, 90, 0))
+        self.check(Vec(-256, 12, 5), Vec(-90, 45, 0))
+        self.check(Vec(17, 0, 64), Vec(0, 270, 180))
+
+    def test_python(self):
+        numpy = vmfLib.numpy
+        vmfLib.numpy = None
+        try:
+            self.check_all()
+        finally:
+            vmfLib.numpy = numpy
+
+    @unittest.skipIf(vmfLib.numpy is None, 'NumPy not installed')
+    def test_numpy(self):
+        min_sides = vmfLib._NUMPY_MIN_SIDES
+        vmfLib._NUMPY_MIN_SIDES = 0
+        try:
+            self.check_all()
+        finally:
+            vmfLib._NUMPY_MIN_SIDES = min_sides
+
+class EntKeysTest(unittest.TestCase):
+    def test_case(self):
+        """Keyvalues are case-insensitive, but keep their original case."""
+        ent = vmfLib.VMF().create_ent(classname='info_target', Origin='1 2 3')
+        self.assertEqual(ent['origin'], '1 2 3')
+        self.assertIn('ORIGIN', ent)
+        ent['origin'] = Vec(4, 5, 6)
+        ent['angles'] = '0 90 0'
+        ent['Angles'] = '0 180 0'
+        self.assertEqual(list(ent.keys), ['classname', 'Origin', 'angles'])
+        self.assertEqual(ent['ORIGIN'], '4 5 6')
+        self.assertEqual(ent['angles'], '0 180 0')
+        self.assertEqual(ent['missing', 'default'], 'default')
+
+        del ent['ANGLES']
+        self.assertNotIn('angles', ent)
+        self.assertEqual(len(ent.keys), 2)
+        copy = ent.copy()
+        copy['origin'] = '0 0 0'
+        self.assertEqual(ent['origin'], '4 5 6')
+        self.assertEqual(list(copy.keys.items()), [
+            ('classname', 'info_target'),
+            ('Origin', '0 0 0'),
+        ])
+
+    def test_vec_cache(self):
+        """origin_vec/angles_vec/rotation follow the keyvalues."""
+        ent = vmfLib.VMF().create_ent(
+            classname='func_instance',
+            origin='64 128 -32',
+            angles='0 90 0',
+        )
+        origin = ent.origin_vec
+        self.assertEqual(origin, Vec(64, 128, -32))
+        origin.x = 0
+        self.assertEqual(ent.origin_vec, Vec(64, 128, -32))
+        self.assertEqual(
+            Vec(1, 0, 0).rotate_by_matrix(ent.rotation),
+            Vec(1, 0, 0).rotate_by_str(ent['angles']),
+        )
+
+        ent['Angles'] = '-90 0 0'
+        self.assertEqual(ent.angles_vec, Vec(-90, 0, 0))
+        self.assertEqual(Vec(1, 0, 0).rotate_by_matrix(ent.rotation), (0, 0, 1))
+        ent.origin_vec = Vec(1, 2, 3)
+        self.assertEqual(ent['origin'], '1 2 3')
+        self.assertEqual(ent.origin_vec, Vec(1, 2, 3))
+        del ent['angles']
+        self.assertEqual(ent.angles_vec, Vec(0, 0, 0))
+
+class EntIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.vmf = vmf = vmfLib.VMF()
+        self.ents = [
+            vmf.create_ent(
+                classname='func_instance',
+                file='instances/a.vmf' if i % 3 else 'instances/b.vmf',
+                origin='{} 0 0'.format(i % 4),
+                targetname='inst_' + str(i),
+            )
+            for i in range(12)
+        ]
+
+    def check(self, **cond):
+        """iter_ents() matches a plain scan through the entity list."""
+        expected = [
+            ent for ent in self.vmf.entities
+            if all(
+                key in ent and ent[key] == value
+                for key, value in cond.items()
+            )
+        ]
+        self.assertEqual(list(self.vmf.iter_ents(**cond)), expected)
+        return expected
+
+    def test_lookup(self):
+        self.assertEqual(len(self.check(file='instances/b.vmf')), 4)
+        self.assertEqual(
+            self.check(file='instances/a.vmf', origin='1 0 0'),
+            [self.ents[1], self.ents[5]],
+        )
+        self.assertEqual(self.check(File='instances/c.vmf'), [])
+        self.assertEqual(len(self.check(classname='func_instance')), 12)
+
+    def test_update(self):
+        ent = self.ents[3]
+        ent['FILE'] = 'instances/c.vmf'
+        self.assertEqual(self.check(file='instances/c.vmf'), [ent])
+        self.assertNotIn(ent, self.check(file='instances/b.vmf'))
+        del ent['file']
+        self.assertEqual(self.check(file='instances/c.vmf'), [])
+        self.vmf.remove_ent(self.ents[0])
+        self.assertEqual(len(self.check(file='instances/b.vmf')), 2)
+        self.vmf.add_ent(self.ents[0])
+        # Re-added entities go on the end.
+        self.assertEqual(self.check(file='instances/b.vmf')[-1], self.ents[0])
+
+    def test_register(self):
+        for ent in self.ents[::2]:
+            ent['angles'] = '0 90 0'
+        index = self.vmf.register_index('Angles')
+        self.assertIs(self.vmf.by_key['angles'], index)
+        self.assertEqual(len(index['0 90 0']), 6)
+        self.ents[1]['angles'] = '0 90 0'
+        self.assertEqual(len(self.check(angles='0 90 0')), 7)
+        self.assertEqual(
+            list(self.vmf.iter_ents_tags(
+                vals={'angles': '0 90 0'},
+                tags={'targetname': '_1'},
+            )),
+            [self.ents[1], self.ents[10]],
+        )
+
+
+class OutputIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.vmf = vmfLib.VMF()
+        self.ents = []
+        for i in range(6):
+            ent = self.vmf.create_ent(classname='logic_relay')
+            ent.add_out(
+                vmfLib.Output('OnTrigger', 'door_' + str(i), 'Open'),
+                vmfLib.Output('OnTrigger', 'light_' + str(i % 2), 'TurnOn'),
+            )
+            self.ents.append(ent)
+
+    def check(self, name):
+        """iter_inputs() matches a plain scan through the entities."""
+        name_strip = name.strip('*')
+        if name.startswith('*') and name.endswith('*'):
+            match = lambda targ: name_strip in targ
+        elif name.startswith('*'):
+            match = lambda targ: targ.endswith(name_strip)
+        elif name.endswith('*'):
+            match = lambda targ: targ.startswith(name_strip)
+        else:
+            match = lambda targ: targ == name
+        expected = [
+            out
+            for ent in self.vmf.entities
+            for out in ent.outputs
+            if match(out.target)
+        ]
+        self.assertEqual(list(self.vmf.iter_inputs(name)), expected)
+        return expected
+
+    def test_lookup(self):
+        self.assertEqual(len(self.check('door_3')), 1)
+        self.assertEqual(len(self.check('light_1')), 3)
+        self.assertEqual(len(self.check('door_*')), 6)
+        self.assertEqual(len(self.check('*_1')), 4)
+        self.assertEqual(len(self.check('*o*')), 6)
+        self.assertEqual(self.check('missing*'), [])
+
+    def test_update(self):
+        ent = self.ents[2]
+        ent.outputs[0].target = 'light_1'
+        self.assertEqual(len(self.check('light_1')), 4)
+        self.assertEqual(self.check('door_2'), [])
+
+        ent.outputs.remove(ent.outputs[1])
+        self.assertEqual(len(self.check('light_0')), 2)
+        ent.outputs.clear()
+        self.assertEqual(len(self.check('light_*')), 5)
+
+        ent.outputs = [vmfLib.Output('OnTrigger', 'door_9', 'Close')]
+        self.assertEqual(len(self.check('door_9')), 1)
+        ent.outputs.insert(0, vmfLib.Output('OnUser1', 'door_9', 'Open'))
+        self.assertEqual(self.check('door_9'), ent.outputs)
+
+        self.vmf.remove_ent(self.ents[0])
+        self.assertEqual(len(self.check('*')), 10)
+        # Not in the map, so this doesn't show up.
+        self.ents[0].outputs[0].target = 'door_9'
+        self.assertEqual(len(self.check('door_9')), 2)
+        self.vmf.add_ent(self.ents[0])
+        self.assertEqual(self.check('door_9')[-1], self.ents[0].outputs[0])
+
+    def test_move(self):
+        """Outputs can be moved from one entity to another."""
+        first, second = self.ents[:2]
+        moved = first.outputs
+        second.outputs = first.outputs
+        first.outputs = []
+        self.assertEqual(self.check('door_0'), moved[:1])
+        self.assertEqual(len(self.check('light_0')), 3)
+        self.assertIs(moved[0]._owner, second)
+
+    def test_no_cycle(self):
+        """Outputs don't keep their entity alive."""
+        ent = vmfLib.Entity(self.vmf, outputs=[
+            vmfLib.Output('OnTrigger', 'door_0', 'Open'),
+        ])
+        ent_id = ent.id
+        out = ent.outputs[0]
+        self.assertIn(ent_id, self.vmf.ent_id)
+        del ent
+        # Freed straight away, without the garbage collector.
+        self.assertNotIn(ent_id, self.vmf.ent_id)
+        self.assertIsNone(out._owner)
+
+
+if __name__ == '__main__':
+    unittest.main()
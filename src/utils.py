@@ -7,14 +7,15 @@ import os.path
 import tempfile
 from collections import abc
 import collections
+import functools
 
 from sys import platform
 from enum import Enum
 
 from typing import (
-    Union,
-    Tuple,
-    SupportsFloat, Iterator,
+    Union, Optional,
+    Tuple, List, Dict,
+    SupportsFloat, Iterator, Iterable,
 )
 
 try:
@@ -447,26 +448,26 @@ def conv_int(val: str, default=0):
         return default
 
 
-def parse_str(val: Union[str, 'Vec'], x=0.0, y=0.0, z=0.0) -> Tuple[int, int, int]:
-    """Convert a string in the form '(4 6 -4)' into a set of floats.
+# Vector strings repeat a lot ('0 0 0', common origins and plane points),
+# so remember the values for the most recent ones.
+PARSE_CACHE_SIZE = 8192
 
-     If the string is unparsable, this uses the defaults (x,y,z).
-     The string can start with any of the (), {}, [], <> bracket
-     types.
 
-     If the 'string' is actually a Vec, the values will be returned.
-     """
-    if isinstance(val, Vec):
-        return val.x, val.y, val.z
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_vec_str(val: str) -> Optional[Tuple[float, float, float]]:
+    """Convert a string in the form '(4 6 -4)' into a tuple of floats.
 
-    try:
-        str_x, str_y, str_z = val.split(' ')
-    except ValueError:
-        return x, y, z
+    This is parse_str() without the defaults - None is returned if the
+    string is unparsable. Results are cached.
+    """
+    parts = val.split(' ')
+    if len(parts) != 3:
+        return None
+    str_x, str_y, str_z = parts
 
-    if str_x[0] in '({[<':
+    if str_x and str_x[0] in '({[<':
         str_x = str_x[1:]
-    if str_z[-1] in ')}]>':
+    if str_z and str_z[-1] in ')}]>':
         str_z = str_z[:-1]
     try:
         return (
@@ -475,7 +476,30 @@ def parse_str(val: Union[str, 'Vec'], x=0.0, y=0.0, z=0.0) -> Tuple[int, int, in
             float(str_z),
         )
     except ValueError:
+        return None
+
+
+def parse_str_stats():
+    """Return the (hits, misses, maxsize, currsize) info for parse_str()."""
+    return parse_vec_str.cache_info()
+
+
+def parse_str(val: Union[str, 'Vec'], x=0.0, y=0.0, z=0.0) -> Tuple[int, int, int]:
+    """Convert a string in the form '(4 6 -4)' into a set of floats.
+
+     If the string is unparsable, this uses the defaults (x,y,z).
+     The string can start with any of the (), {}, [], <> bracket
+     types.
+
+     If the 'string' is actually a Vec, the values will be returned.
+     """
+    if isinstance(val, Vec):
+        return val.x, val.y, val.z
+
+    result = parse_vec_str(val)
+    if result is None:
         return x, y, z
+    return result
 
 
 def iter_grid(
@@ -1051,6 +1075,11 @@ def __i{func}__(self, other):
 '''
 
 
+# Vec.rotation_matrix() results, for each (pitch, yaw, roll).
+_ROT_MATRICES = {}  # type: Dict[Tuple[float, float, float], Tuple[tuple, tuple, tuple]]
+_ROT_MATRICES_MAX = 4096
+
+
 class Vec:
     """A 3D Vector. This has most standard Vector functions.
 
@@ -1117,14 +1146,20 @@ class Vec:
         self.y = (x * d) + (y * e) + (z * f)
         self.z = (x * g) + (y * h) + (z * i)
 
-    def rotate(self, pitch=0.0, yaw=0.0, roll=0.0, round_vals=True):
-        """Rotate a vector by a Source rotational angle.
-        Returns the vector, so you can use it in the form
-        val = Vec(0,1,0).rotate(p, y, r)
+    @staticmethod
+    def rotation_matrix(pitch=0.0, yaw=0.0, roll=0.0):
+        """Compute the matrices used to rotate by a Source rotational angle.
 
-        If round is True, all values will be rounded to 3 decimals
-        (since these calculations always have small inprecision.)
+        This returns the roll, pitch and yaw matrices, in the order they are
+        applied. Each is flattened into a 9-tuple. Maps only use a few
+        different angles, so the matrices are cached.
         """
+        key = (pitch, yaw, roll)
+        try:
+            return _ROT_MATRICES[key]
+        except KeyError:
+            pass
+
         # pitch is in the y axis
         # yaw is the z axis
         # roll is the x axis
@@ -1157,7 +1192,16 @@ class Vec:
             -sin_p, 0, cos_p,
         )
 
-        # Need to do transformations in roll, pitch, yaw order
+        # These are kept separate instead of multiplying them together,
+        # so the results (including the sign of zeros) are exactly the same.
+        matrices = (mat_roll, mat_pitch, mat_yaw)
+        if len(_ROT_MATRICES) < _ROT_MATRICES_MAX:
+            _ROT_MATRICES[key] = matrices
+        return matrices
+
+    def rotate_by_matrix(self, matrices, round_vals=True):
+        """Rotate a vector by the matrices from Vec.rotation_matrix()."""
+        mat_roll, mat_pitch, mat_yaw = matrices
         self.mat_mul(mat_roll)
         self.mat_mul(mat_pitch)
         self.mat_mul(mat_yaw)
@@ -1169,6 +1213,40 @@ class Vec:
 
         return self
 
+    def rotate(self, pitch=0.0, yaw=0.0, roll=0.0, round_vals=True):
+        """Rotate a vector by a Source rotational angle.
+        Returns the vector, so you can use it in the form
+        val = Vec(0,1,0).rotate(p, y, r)
+
+        If round is True, all values will be rounded to 3 decimals
+        (since these calculations always have small inprecision.)
+        """
+        return self.rotate_by_matrix(
+            Vec.rotation_matrix(pitch, yaw, roll),
+            round_vals,
+        )
+
+    @staticmethod
+    def rotate_many(
+            points: Iterable['Vec'],
+            angles: Union[str, 'Vec', Tuple[float, float, float]],
+            round_vals=True,
+    ) -> List['Vec']:
+        """Rotate many vectors in place by the same angle.
+
+        The angles can be a Vec, 3-tuple or string. The vectors are
+        returned as a list.
+        """
+        if isinstance(angles, tuple):
+            pitch, yaw, roll = angles
+        else:
+            pitch, yaw, roll = parse_str(angles)
+        matrices = Vec.rotation_matrix(pitch, yaw, roll)
+        points = list(points)
+        for vec in points:
+            vec.rotate_by_matrix(matrices, round_vals)
+        return points
+
     def rotate_by_str(self, ang, pitch=0.0, yaw=0.0, roll=0.0, round_vals=True):
         """Rotate a vector, using a string instead of a vector."""
         pitch, yaw, roll = parse_str(ang, pitch, yaw, roll)
@@ -15,14 +15,16 @@ from decimal import Decimal
 
 from property_parser import Property
 from utils import Vec
+from spatialIndex import BoxIndex
 from BEE2_config import ConfigFile
 import vmfLib as VLib
 import voiceLine
 import instanceLocs
 import conditions
+import compileStats
 
 from typing import (
-    Dict, Tuple,
+    Dict, List, Tuple,
 )
 
 
@@ -420,8 +422,7 @@ def load_settings():
     """Load in all our settings from vbsp_config."""
     global BEE2_config
     try:
-        with open("bee2/vbsp_config.cfg") as config:
-            conf = Property.parse(config, 'bee2/vbsp_config.cfg')
+        conf = Property.parse_cached('bee2/vbsp_config.cfg')
     except FileNotFoundError:
         LOGGER.warning('Error: No vbsp_config file!')
         conf = Property(None, [])
@@ -477,10 +478,7 @@ def load_settings():
 
     # Load in the config file holding item data.
     # This is used to lookup item's instances, or their connection commands.
-    with open('bee2/instances.cfg') as f:
-        instance_file = Property.parse(
-            f, 'bee2/instances.cfg'
-        )
+    instance_file = Property.parse_cached('bee2/instances.cfg')
     # Parse that data in the relevant modules.
     instanceLocs.load_conf(instance_file)
     conditions.build_connections_dict(instance_file)
@@ -587,11 +585,10 @@ def load_settings():
 def load_map(map_path):
     """Load in the VMF file."""
     global VMF
-    with open(map_path) as file:
-        LOGGER.info("Parsing Map...")
-        props = Property.parse(file, map_path)
-    LOGGER.info('Reading Map...')
-    VMF = VLib.VMF.parse(props)
+    LOGGER.info("Parsing Map...")
+    # Most brushes are only retextured, so only parse the rest of each
+    # face if it's needed.
+    VMF = VLib.VMF.parse(map_path, lazy_brushes=True)
     LOGGER.info("Loading complete!")
 
 
@@ -2385,6 +2382,8 @@ def random_walls():
     edge_off = get_bool_opt('reset_edge_off', False)
     edge_scale = utils.conv_float(get_opt('edge_scale'), 0.15)
 
+    preset_clumps = make_clump_index(PRESET_CLUMPS)
+
     for solid in VMF.iter_wbrushes(world=True, detail=True):
         for face in solid:
             if face in IGNORED_FACES:
@@ -2395,14 +2394,12 @@ def random_walls():
 
             # Conditions can define special clumps for items, we want to
             # do those if needed.
-            origin = face.get_origin()
-            for clump in PRESET_CLUMPS:
-                if clump.min_pos <= origin <= clump.max_pos:
-                    face.mat = clump.tex[get_tile_type(
-                        face.mat.casefold(),
-                        get_face_orient(face),
-                    )]
-                    break
+            clump = preset_clumps.find_first(face.get_origin())
+            if clump is not None:
+                face.mat = clump.tex[get_tile_type(
+                    face.mat.casefold(),
+                    get_face_orient(face),
+                )]
             else:  # No clump..
                 alter_mat(face, face_seed(face), texture_lock)
 
@@ -2414,6 +2411,14 @@ Clump = namedtuple('Clump', [
 ])
 
 
+def make_clump_index(clumps: List[Clump]) -> BoxIndex:
+    """Build an index for finding the first clump containing a point."""
+    index = BoxIndex()
+    for clump in clumps:
+        index.add(clump.min_pos, clump.max_pos, clump)
+    return index
+
+
 @conditions.make_result_setup('SetAreaTex')
 def cond_force_clump_setup(res):
     point1 = Vec.from_str(res['point1'])
@@ -2453,13 +2458,12 @@ def cond_force_clump(inst, res):
     This only works in styles using the clumping texture algorithm.
     """
     point1, point2, tex_data = res.value
-    origin = Vec.from_str(inst['origin'])
-    angles = Vec.from_str(inst['angles'])
+    origin = inst.origin_vec
 
-    point1 = point1.copy().rotate(*angles)
+    point1 = point1.copy().rotate_by_matrix(inst.rotation)
     point1 += origin
 
-    point2 = point2.copy().rotate(*angles)
+    point2 = point2.copy().rotate_by_matrix(inst.rotation)
     point2 += origin
 
     min_pos, max_pos = Vec.bbox((point1, point2))
@@ -2550,6 +2554,9 @@ def clump_walls():
         ))
         random.setstate(cur_state)
 
+    preset_clumps = make_clump_index(PRESET_CLUMPS)
+    clump_index = make_clump_index(clumps)
+
     # Now modify each texture!
     for face in VMF.iter_wfaces(world=True, detail=True):
         if face in IGNORED_FACES:
@@ -2575,13 +2582,9 @@ def clump_walls():
         # so they override the normal surfaces.
         # We want to do that regardless of the clump_floor and clump_ceil
         # settings
-        clump_changed = False
-        for clump in PRESET_CLUMPS:
-            if clump.min_pos <= origin <= clump.max_pos:
-                face.mat = clump.tex[get_tile_type(mat, orient)]
-                clump_changed = True
-                break
-        if clump_changed:
+        clump = preset_clumps.find_first(origin)
+        if clump is not None:
+            face.mat = clump.tex[get_tile_type(mat, orient)]
             continue
 
         if (
@@ -2592,10 +2595,9 @@ def clump_walls():
             continue
 
         # Clump the texture!
-        for clump in clumps:
-            if clump.min_pos <= origin <= clump.max_pos:
-                face.mat = clump.tex[get_tile_type(mat, orient)]
-                break
+        clump = clump_index.find_first(origin)
+        if clump is not None:
+            face.mat = clump.tex[get_tile_type(mat, orient)]
         else:
             # Not in a clump!
             # Allow using special textures for these, to fill in gaps.
@@ -3507,8 +3509,7 @@ def make_vrad_config():
         conf['MusicScript'] = settings['music_conf']
 
     with open('bee2/vrad_config.cfg', 'w') as f:
-        for line in conf.export():
-            f.write(line)
+        conf.export_to(f)
 
 
 def instance_symlink():
@@ -3738,6 +3739,8 @@ def main():
             '-dump_conditions: Print a list of all condition flags,\n'
             '  results, and metaconditions.\n'
             '-bee2_verbose: Print debug messages to the console.\n'
+            '-bee2_profile: Time each condition, and save the results to\n'
+            '  bee2/condition_profile.json.\n'
             '-verbose: A default VBSP command, has the same effect as above.\n'
             '-force_peti: Force enabling map conversion. \n'
             "-force_hammer: Don't convert the map at all.\n"
@@ -3752,6 +3755,10 @@ def main():
         utils.stdout_loghandler.setLevel('DEBUG')
         LOGGER.info('Switched to verbose logging.')
 
+    if '-bee2_profile' in folded_args:
+        conditions.enable_profiling()
+        LOGGER.info('Profiling conditions.')
+
     conditions.import_conditions()  # Import all the conditions and
     # register them.
 
@@ -3773,7 +3780,7 @@ def main():
 
     for i, a in enumerate(new_args):
         # We need to strip these out, otherwise VBSP will get confused.
-        if a == '-force_peti' or a == '-force_hammer':
+        if a in ('-force_peti', '-force_hammer', '-bee2_profile'):
             new_args[i] = ''
             old_args[i] = ''
         # Strip the entity limit, and the following number
@@ -3807,59 +3814,86 @@ def main():
     for file in os.listdir('bee2/inject'):
         os.remove(os.path.join('bee2', 'inject', file))
 
-    if is_hammer:
-        LOGGER.warning("Hammer map detected! skipping conversion..")
-        run_vbsp(
-            vbsp_args=old_args,
-            do_swap=False,
-            path=path,
-            new_path=new_path,
-        )
-    else:
-        LOGGER.info("PeTI map detected!")
+    timer = compileStats.StageTimer()
 
-        LOGGER.info("Loading settings...")
-        load_settings()
+    # Report the times even if a stage fails, or run_vbsp() exits.
+    try:
+        if is_hammer:
+            LOGGER.warning("Hammer map detected! skipping conversion..")
+            with timer.stage('run_vbsp'):
+                run_vbsp(
+                    vbsp_args=old_args,
+                    do_swap=False,
+                    path=path,
+                    new_path=new_path,
+                )
+        else:
+            LOGGER.info("PeTI map detected!")
 
-        load_map(path)
+            LOGGER.info("Loading settings...")
+            with timer.stage('load_settings'):
+                load_settings()
 
-        MAP_RAND_SEED = calc_rand_seed()
+            with timer.stage('load_map'):
+                load_map(path)
 
-        all_inst = get_map_info()
+            with timer.stage('get_map_info'):
+                MAP_RAND_SEED = calc_rand_seed()
+                all_inst = get_map_info()
 
-        conditions.init(
-            seed=MAP_RAND_SEED,
-            inst_list=all_inst,
-            vmf_file=VMF,
-            )
+            with timer.stage('conditions.init'):
+                conditions.init(
+                    seed=MAP_RAND_SEED,
+                    inst_list=all_inst,
+                    vmf_file=VMF,
+                    )
 
-        fix_inst()
-        alter_flip_panel()  # Must be done before conditions!
-        conditions.check_all()
-        add_extra_ents(mode=GAME_MODE)
-
-        change_ents()
-        change_goo_sides()  # Must be done before change_brush()!
-        change_brush()
-        change_overlays()
-        change_trig()
-        collapse_goo_trig()  # Do after make_bottomless_pits
-        change_func_brush()
-        remove_static_ind_toggles()
-        remove_barrier_ents()
-        fix_worldspawn()
-
-        make_packlist(path)
-        make_vrad_config()
-
-        save(new_path)
-        run_vbsp(
-            vbsp_args=new_args,
-            do_swap=True,
-            path=path,
-            new_path=new_path,
-        )
+            with timer.stage('check_all'):
+                fix_inst()
+                alter_flip_panel()  # Must be done before conditions!
+                conditions.check_all()
+                add_extra_ents(mode=GAME_MODE)
+
+            with timer.stage('change_ents'):
+                change_ents()
+                change_goo_sides()  # Must be done before change_brush()!
+
+            with timer.stage('change_brush'):
+                change_brush()
+
+            with timer.stage('change_overlays'):
+                change_overlays()
+                change_trig()
+                collapse_goo_trig()  # Do after make_bottomless_pits
+
+            with timer.stage('change_func_brush'):
+                change_func_brush()
+                remove_static_ind_toggles()
+                remove_barrier_ents()
+                fix_worldspawn()
+
+            with timer.stage('make_packlist'):
+                make_packlist(path)
+                make_vrad_config()
+
+            with timer.stage('save'):
+                save(new_path)
+
+            with timer.stage('run_vbsp'):
+                run_vbsp(
+                    vbsp_args=new_args,
+                    do_swap=True,
+                    path=path,
+                    new_path=new_path,
+                )
+    finally:
+        timer.report()
 
+    LOGGER.info(
+        'Vector parse cache: {0.hits} hits, {0.misses} misses, '
+        '{0.currsize}/{0.maxsize} entries.',
+        utils.parse_str_stats(),
+    )
     LOGGER.info("BEE2 VBSP hook finished!")
 
 
@@ -2,9 +2,15 @@
 Wraps property_parser tree in a set of classes which smartly handle
 specifics of VMF files.
 """
+import bisect
+import gc
+import heapq
 import io
 import operator
-from collections import defaultdict, namedtuple
+import sys
+import weakref
+from array import array
+from collections import abc, defaultdict, namedtuple
 from contextlib import suppress
 import itertools
 
@@ -17,6 +23,12 @@ from typing import (
     Dict, List, Tuple, Set, Iterable, Iterator
 )
 
+try:
+    # Optional - this lets localise_many() transform brushes in bulk.
+    import numpy
+except ImportError:
+    numpy = None
+
 # Used to set the defaults for versioninfo
 CURRENT_HAMMER_VERSION = 400
 CURRENT_HAMMER_BUILD = 5304
@@ -43,28 +55,159 @@ PrismFace = namedtuple(
 # The character used to separate output values.
 OUTPUT_SEP = chr(27)
 
+# Keyvalues which VMF objects index by default, in addition to classname
+# and targetname. More can be added with VMF.register_index().
+DEFAULT_ENT_INDEXES = ('file', 'origin')
+
+# When these keyvalues change, the Entity.origin_vec/angles_vec/rotation
+# cache entries that need to be cleared.
+_VEC_CACHE_KEYS = {
+    'origin': ('origin',),
+    'angles': ('angles', 'rotation'),
+}
+
+# VMF.export() collects text and writes it to the file once this many
+# characters have built up, instead of making a write() per line.
+EXPORT_CHUNK_SIZE = 1024 * 1024
+
+# %-templates used to export each block in one go. These are unindented -
+# _indented() produces the version for a specific indent level.
+_SIDE_TEMPLATE = (
+    'side\n'
+    '{\n'
+    '\t"id" "%s"\n'
+    '\t"plane" "(%g %g %g) (%g %g %g) (%g %g %g)"\n'
+    '\t"material" "%s"\n'
+    '\t"uaxis" "[%g %g %g %g] %g"\n'
+    '\t"vaxis" "[%g %g %g %g] %g"\n'
+    '\t"rotation" "%s"\n'
+    '\t"lightmapscale" "%s"\n'
+    '\t"smoothing_groups" "%s"\n'
+)
+# Lazily parsed sides fill in the plane and texture axes separately,
+# since some may still be the original text.
+_PLANE_TEMPLATE = '(%g %g %g) (%g %g %g) (%g %g %g)'
+_UV_TEMPLATE = '[%g %g %g %g] %g'
+_LAZY_SIDE_TEMPLATE = _SIDE_TEMPLATE.replace(
+    _PLANE_TEMPLATE, '%s',
+).replace(_UV_TEMPLATE, '%s')
+_SOLID_TEMPLATE = (
+    'solid\n'
+    '{\n'
+    '\t"id" "%s"\n'
+)
+_ENT_TEMPLATE = (
+    '%s\n'
+    '{\n'
+    '\t"id" "%s"\n'
+)
+_EDITOR_TEMPLATE = (
+    '\teditor\n'
+    '\t{\n'
+)
+
+_TEMPLATE_CACHE = {}  # type: Dict[Tuple[str, str], str]
+
+
+def _indented(template: str, ind: str) -> str:
+    """Return a template with every line prefixed by the given indent."""
+    try:
+        return _TEMPLATE_CACHE[template, ind]
+    except KeyError:
+        pass
+    result = _TEMPLATE_CACHE[template, ind] = ''.join(
+        ind + line
+        for line in
+        template.splitlines(keepends=True)
+    )
+    return result
+
+
+class _ChunkWriter:
+    """Collects exported text, and writes it to a file in large chunks."""
+    __slots__ = ['file', 'parts', 'size']
+
+    def __init__(self, file):
+        self.file = file
+        self.parts = []  # type: List[str]
+        self.size = 0
+
+    def write(self, text: str):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= EXPORT_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.file.write(''.join(self.parts))
+            self.parts.clear()
+            self.size = 0
+
 class IDMan(set):
-    """Allocate and manage a set of unique IDs."""
-    __slots__ = ()
+    """Allocate and manage a set of unique IDs.
+
+    New IDs are always the lowest free ID. Rather than checking from 1
+    every time, this keeps a cursor below which every ID is either used or
+    in a heap of IDs which have been freed.
+    """
+    __slots__ = ('_cursor', '_free')
+
+    def __init__(self, ids=()):
+        super().__init__(ids)
+        self._cursor = 1
+        self._free = []  # type: List[int]
 
     def get_id(self, desired=-1):
         """Get a valid ID."""
 
-        if desired == -1:
-            # Start with the lowest ID, and look upwards
-            desired = 1
-
-        if desired not in self:
+        if desired != -1 and desired not in self:
             # The desired ID is avalible!
             self.add(desired)
             return desired
 
-        # Check every ID in order to find a valid one
-        for poss_id in itertools.count(start=1):
+        # Reuse the lowest freed ID. These might have been taken again
+        # by a desired ID, so skip those.
+        free = self._free
+        while free:
+            poss_id = heapq.heappop(free)
             if poss_id not in self:
                 self.add(poss_id)
                 return poss_id
 
+        # Then the next ID past everything we've handed out.
+        poss_id = self._cursor
+        while poss_id in self:
+            poss_id += 1
+        self.add(poss_id)
+        self._cursor = poss_id + 1
+        return poss_id
+
+    def remove(self, id):
+        super().remove(id)
+        # Zero/negative IDs can be desired, but we never hand them out.
+        if 0 < id < self._cursor:
+            heapq.heappush(self._free, id)
+
+    def discard(self, id):
+        if id in self:
+            self.remove(id)
+
+
+class _DeferredIDs:
+    """Stands in for an IDMan while VMF._parse_deferred() is running.
+
+    Every desired ID is handed back unchanged.
+    """
+    __slots__ = []
+
+    @staticmethod
+    def get_id(desired=-1):
+        return desired
+
+
+_DEFERRED_IDS = _DeferredIDs()
+
 
 def find_empty_id(used_id, desired=-1):
         """Ensure this item has a unique ID.
@@ -174,6 +317,201 @@ def localise_overlay(over, origin, angles=None):
         over[key] = ang.join(' ')
 
 
+# Below this many faces, setting up NumPy arrays costs more than it saves.
+_NUMPY_MIN_SIDES = 64
+
+
+def localise_many(solids: Iterable['Solid'], origin: Vec, angles: Vec=None):
+    """Shift many brushes by the same origin and angles.
+
+    This is equivalent to calling Solid.localise() on each, but
+    rotates the points directly. If NumPy is available, all the plane
+    points and texture axes are transformed as one array.
+    """
+    sides = [
+        side
+        for solid in solids
+        for side in solid.sides
+    ]
+    if numpy is not None and len(sides) >= _NUMPY_MIN_SIDES:
+        _localise_numpy(sides, origin, angles)
+    else:
+        _localise_python(sides, origin, angles)
+
+
+def _localise_python(sides: List['Side'], origin: Vec, angles: Vec=None):
+    """The pure-Python version of localise_many()."""
+    off_x, off_y, off_z = origin.x, origin.y, origin.z
+
+    if angles is not None:
+        matrices = Vec.rotation_matrix(angles[0], angles[1], angles[2])
+
+        def rotate(x, y, z):
+            """Vec.rotate_by_matrix(), without creating Vecs."""
+            for a, b, c, d, e, f, g, h, i in matrices:
+                x, y, z = (
+                    (x * a) + (y * b) + (z * c),
+                    (x * d) + (y * e) + (z * f),
+                    (x * g) + (y * h) + (z * i),
+                )
+            return round(x, 3), round(y, 3), round(z, 3)
+    else:
+        rotate = None
+
+    for side in sides:
+        planes = side._planes
+        if rotate is not None:
+            for ind in (0, 3, 6):
+                x, y, z = rotate(planes[ind], planes[ind+1], planes[ind+2])
+                planes[ind] = x + off_x
+                planes[ind+1] = y + off_y
+                planes[ind+2] = z + off_z
+        else:
+            for ind in (0, 3, 6):
+                planes[ind] += off_x
+                planes[ind+1] += off_y
+                planes[ind+2] += off_z
+
+        for axis in (side.uaxis, side.vaxis):
+            x, y, z = float(axis.x), float(axis.y), float(axis.z)
+            if rotate is not None:
+                x, y, z = axis.x, axis.y, axis.z = rotate(x, y, z)
+            # Fix offset - see Side.localise().
+            axis.offset -= (off_x * x + off_y * y + off_z * z) / axis.scale
+            axis.offset = (axis.offset + 1024) % 2048 - 1024
+
+
+def _localise_numpy(sides: List['Side'], origin: Vec, angles: Vec=None):
+    """The NumPy version of localise_many().
+
+    Each face contributes 5 rows - 3 plane points, then the U and V axes.
+    The matrices are applied with the same operations as Vec.mat_mul(),
+    so the results match the pure-Python version. numpy.round() scales by
+    1000 and rounds to an integer, which gives different results to round()
+    for many values. So the rotated values are rounded with round() instead.
+    """
+    count = len(sides)
+    points = numpy.empty((count, 5, 3))
+    for ind, side in enumerate(sides):
+        row = points[ind]
+        row[0:3] = numpy.frombuffer(side._planes, dtype=float).reshape(3, 3)
+        uaxis = side.uaxis
+        vaxis = side.vaxis
+        row[3] = uaxis.x, uaxis.y, uaxis.z
+        row[4] = vaxis.x, vaxis.y, vaxis.z
+
+    offsets = numpy.array([
+        (side.uaxis.offset, side.vaxis.offset)
+        for side in sides
+    ], dtype=float)
+    scales = numpy.array([
+        (side.uaxis.scale, side.vaxis.scale)
+        for side in sides
+    ], dtype=float)
+
+    if angles is not None:
+        x, y, z = points[..., 0], points[..., 1], points[..., 2]
+        for a, b, c, d, e, f, g, h, i in Vec.rotation_matrix(
+                angles[0], angles[1], angles[2]):
+            x, y, z = (
+                (x * a) + (y * b) + (z * c),
+                (x * d) + (y * e) + (z * f),
+                (x * g) + (y * h) + (z * i),
+            )
+        rotated = numpy.stack((x, y, z), axis=-1).ravel().tolist()
+        points = numpy.array(
+            [round(val, 3) for val in rotated],
+        ).reshape(count, 5, 3)
+
+    off = numpy.array((origin.x, origin.y, origin.z))
+    points[:, 0:3] += off
+    # Fix offset - see Side.localise().
+    uv_axes = points[:, 3:5]
+    offsets -= (
+        off[0] * uv_axes[..., 0] +
+        off[1] * uv_axes[..., 1] +
+        off[2] * uv_axes[..., 2]
+    ) / scales
+    offsets = (offsets + 1024) % 2048 - 1024
+
+    for side, row, (u_off, v_off) in zip(
+            sides, points.tolist(), offsets.tolist()):
+        # Write in place, so existing PlanePoints see the change.
+        side._planes[:] = array('d', row[0] + row[1] + row[2])
+        uaxis = side.uaxis
+        vaxis = side.vaxis
+        if angles is not None:
+            uaxis.x, uaxis.y, uaxis.z = row[3]
+            vaxis.x, vaxis.y, vaxis.z = row[4]
+        uaxis.offset = u_off
+        vaxis.offset = v_off
+
+
+class KeyValueDict(abc.MutableMapping):
+    """A dictionary with case-insensitive string keys, used for keyvalues.
+
+    Internally this maps casefolded keys to (key, value) tuples. The
+    original casing (the first one set) is kept for iteration and export.
+    """
+    __slots__ = ['_data']
+
+    def __init__(self, items=()):
+        self._data = {}  # type: Dict[str, Tuple[str, str]]
+        if isinstance(items, abc.Mapping):
+            items = items.items()
+        for key, value in items:
+            self[key] = value
+
+    def __getitem__(self, key: str) -> str:
+        return self._data[key.casefold()][1]
+
+    def get(self, key: str, default=None):
+        try:
+            return self._data[key.casefold()][1]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key: str, value: str):
+        folded = key.casefold()
+        try:
+            key = self._data[folded][0]
+        except KeyError:
+            pass
+        self._data[folded] = (key, value)
+
+    def __delitem__(self, key: str):
+        del self._data[key.casefold()]
+
+    def __contains__(self, key: str):
+        return key.casefold() in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        for key, value in self._data.values():
+            yield key
+
+    def __len__(self):
+        return len(self._data)
+
+    def items(self):
+        """Return a view of the (key, value) pairs."""
+        return self._data.values()
+
+    def values(self):
+        return [value for key, value in self._data.values()]
+
+    def clear(self):
+        self._data.clear()
+
+    def copy(self):
+        return KeyValueDict(self.items())
+
+    def __repr__(self):
+        return '{}({!r})'.format(
+            self.__class__.__name__,
+            dict(self.items()),
+        )
+
+
 class CopySet(set):
     """Modified version of a Set which allows modification during iteration.
 
@@ -188,6 +526,71 @@ class CopySet(set):
         yield from (self - cur_items)
 
 
+class _OutputIndex:
+    """Maps target names to the Outputs in the map pointing at them.
+
+    The names are also kept in sorted lists (forwards and reversed), so
+    'name*' and '*name' lookups only need to check the matching range.
+    """
+    __slots__ = ['by_target', 'names', 'rev_names']
+
+    def __init__(self):
+        self.by_target = {}  # type: Dict[str, Set[Output]]
+        self.names = []  # type: List[str]
+        self.rev_names = []  # type: List[str]
+
+    def add(self, out: 'Output'):
+        targ = out.target
+        try:
+            self.by_target[targ].add(out)
+        except KeyError:
+            self.by_target[targ] = {out}
+            bisect.insort(self.names, targ)
+            bisect.insort(self.rev_names, targ[::-1])
+
+    def discard(self, out: 'Output'):
+        targ = out.target
+        try:
+            outs = self.by_target[targ]
+        except KeyError:
+            return
+        outs.discard(out)
+        if not outs:
+            del self.by_target[targ]
+            del self.names[bisect.bisect_left(self.names, targ)]
+            rev = targ[::-1]
+            del self.rev_names[bisect.bisect_left(self.rev_names, rev)]
+
+    @staticmethod
+    def _prefixed(names: List[str], prefix: str) -> Iterator[str]:
+        """Yield the names in the sorted list starting with the prefix."""
+        for ind in range(bisect.bisect_left(names, prefix), len(names)):
+            name = names[ind]
+            if not name.startswith(prefix):
+                return
+            yield name
+
+    def find(self, name: str, wild_start: bool, wild_end: bool):
+        """Yield the outputs with matching targets."""
+        if wild_start:
+            if wild_end:  # blah-target-blah
+                # Nothing to narrow this down, check each name once.
+                targets = [targ for targ in self.names if name in targ]
+            else:  # target-blah
+                targets = [
+                    rev[::-1]
+                    for rev in
+                    self._prefixed(self.rev_names, name[::-1])
+                ]
+        elif wild_end:  # blah-target
+            targets = list(self._prefixed(self.names, name))
+        else:  # target
+            targets = [name]
+
+        for targ in targets:
+            yield from self.by_target.get(targ, ())
+
+
 class VMF:
     """Represents a VMF file, and holds counters for various IDs used.
 
@@ -195,7 +598,8 @@ class VMF:
     converts to/from a property_parser tree.
 
     The dictionaries by_target and by_class allow quickly getting a set
-    of entities with the given class or targetname.
+    of entities with the given class or targetname. by_key holds the same
+    kind of dictionary for every indexed keyvalue (including those two).
     """
     def __init__(
             self,
@@ -215,6 +619,20 @@ class VMF:
         # the whole map
         self.by_target = defaultdict(CopySet)  # type: Dict[str, Set[Entity]]
         self.by_class = defaultdict(CopySet)  # type: Dict[str, Set[Entity]]
+        # Folded key -> value -> entities.
+        self.by_key = {
+            'classname': self.by_class,
+            'targetname': self.by_target,
+        }  # type: Dict[str, Dict[str, Set[Entity]]]
+        for key in DEFAULT_ENT_INDEXES:
+            self.by_key[key] = defaultdict(CopySet)
+
+        # The order entities were added in, so results from the indexes can
+        # be sorted to match self.entities.
+        self._ent_order = {}  # type: Dict[Entity, int]
+        self._ent_count = itertools.count()
+        # Target name -> outputs, for iter_inputs().
+        self._out_index = _OutputIndex()
 
         self.entities = []  # type: List[Entity]
         self.add_ents(entities or [])  # We need to set the by_ dicts too.
@@ -229,13 +647,18 @@ class VMF:
         self.spawn.solids = self.brushes
         self.spawn.hidden_brushes = self.brushes
 
-        self.is_prefab = utils.conv_bool(map_info.get('prefab'), False)
-        self.cordon_enabled = utils.conv_bool(map_info.get('cordons_on'), False)
-        self.map_ver = utils.conv_int(map_info.get('mapversion'))
         if 'mapversion' in self.spawn:
             # This is saved only in the main VMF object, delete the copy.
             del self.spawn['mapversion']
 
+        self._read_map_info(map_info)
+
+    def _read_map_info(self, map_info):
+        """Set the various map settings from the given dictionary."""
+        self.is_prefab = utils.conv_bool(map_info.get('prefab'), False)
+        self.cordon_enabled = utils.conv_bool(map_info.get('cordons_on'), False)
+        self.map_ver = utils.conv_int(map_info.get('mapversion'))
+
         # These three are mostly useless for us, but we'll preserve them anyway
         self.format_ver = utils.conv_int(
             map_info.get('formatversion'), 100)
@@ -274,8 +697,11 @@ class VMF:
         The entity should have been created with this VMF as a parent.
         """
         self.entities.append(item)
-        self.by_class[item['classname', None]].add(item)
-        self.by_target[item['targetname', None]].add(item)
+        self._ent_order[item] = next(self._ent_count)
+        for key, index in self.by_key.items():
+            index[item[key, None]].add(item)
+        for out in item.outputs:
+            self._out_index.add(out)
 
     def remove_ent(self, item):
         """Remove an entity from the map.
@@ -284,12 +710,32 @@ class VMF:
         The object still exists, so it can be reused.
         """
         self.entities.remove(item)
-        self.by_class[item['classname', None]].remove(item)
-        self.by_target[item['targetname', None]].remove(item)
+        self._ent_order.pop(item, None)
+        for key, index in self.by_key.items():
+            index[item[key, None]].discard(item)
+        for out in item.outputs:
+            self._out_index.discard(out)
 
         if item.id in self.ent_id:
             self.ent_id.remove(item.id)
 
+    def register_index(self, key: str) -> Dict[str, Set['Entity']]:
+        """Start indexing entities by the given keyvalue.
+
+        The index is kept up to date as keyvalues change, and is used
+        automatically by iter_ents() and iter_ents_tags().
+        It is also available as self.by_key[key.casefold()].
+        """
+        key = key.casefold()
+        try:
+            return self.by_key[key]
+        except KeyError:
+            pass
+        index = self.by_key[key] = defaultdict(CopySet)
+        for ent in self.entities:
+            index[ent[key, None]].add(ent)
+        return index
+
     def add_brushes(self, item):
         for i in item:
             self.add_brush(i)
@@ -309,16 +755,68 @@ class VMF:
         return ent
 
     @staticmethod
-    def parse(tree: Union[Property, str]):
+    def parse(tree: Union[Property, str], lazy_brushes=False):
         """Convert a property_parser tree into VMF classes.
+
+        If a filename is passed, the file is parsed one block at a time.
+        That way the whole property tree doesn't need to be kept in memory.
+        If lazy_brushes is True, brush faces only parse their planes,
+        texture axes and displacements when they are used - see Side.
         """
-        if not isinstance(tree, Property):
-            # if not a tree, try to read the file
-            with open(tree) as file:
-                tree = Property.parse(file)
+        if isinstance(tree, Property):
+            return VMF._parse_blocks(tree, lazy_brushes)
+
+        # if not a tree, try to read the file
+        with open(tree) as file:
+            # Like in Property.parse(), we won't produce any garbage to
+            # collect while reading.
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                return VMF._parse_blocks(
+                    Property.iter_parse(file, tree),
+                    lazy_brushes,
+                )
+            finally:
+                if gc_enabled:
+                    gc.enable()
+
+    @staticmethod
+    def _parse_blocks(blocks: Iterable[Property], lazy_brushes=False):
+        """Convert the top-level blocks of a VMF into the VMF classes.
+
+        Every entity is converted as its block is read. IDs are still
+        claimed in the same order as before - visible entities, hidden
+        entities, then the world. So the world and hidden entities are
+        parsed with their IDs deferred, and claimed at the end.
+        The small settings blocks are kept until the end.
+        """
+        map_obj = VMF()
+        # The last block of each other kind, like find_key().
+        settings = {}
+        spawn = None
+        hidden_ents = []
+
+        for block in blocks:
+            name = block.name
+            if name == 'entity':
+                map_obj.add_ent(Entity.parse(
+                    map_obj, block, hidden=False, lazy=lazy_brushes,
+                ))
+            elif name == 'hidden':
+                for ent in block:
+                    hidden_ents.append(map_obj._parse_deferred(
+                        ent, hidden=True, lazy=lazy_brushes,
+                    ))
+            elif name == 'world':
+                spawn = map_obj._parse_deferred(
+                    block, hidden=False, lazy=lazy_brushes,
+                )
+            else:
+                settings[name] = block
 
         map_info = {}
-        ver_info = tree.find_key('versioninfo', [])
+        ver_info = settings.get('versioninfo', Property('versioninfo', []))
         for key in ('editorversion',
                     'mapversion',
                     'editorbuild',
@@ -333,7 +831,7 @@ class VMF:
                 map_info['formatversion'] + '"!'
                 )
 
-        view_opt = tree.find_key('viewsettings', [])
+        view_opt = settings.get('viewsettings', Property('viewsettings', []))
         view_dict = {
             'bSnapToGrid': 'snaptogrid',
             'bShowGrid': 'showgrid',
@@ -344,15 +842,17 @@ class VMF:
         for key in view_dict:
             map_info[view_dict[key]] = view_opt[key, '']
 
-        cordons = tree.find_key('cordons', [])
+        cordons = settings.get('cordons', Property('cordons', []))
         map_info['cordons_on'] = cordons['active', '0']
 
-        cam_props = tree.find_key('cameras', [])
+        cam_props = settings.get('cameras', Property('cameras', []))
         map_info['active_cam'] = utils.conv_int(
             (cam_props['activecamera', '']), -1)
-        map_info['quickhide'] = tree.find_key('quickhide', [])['count', '']
+        map_info['quickhide'] = settings.get(
+            'quickhide', Property('quickhide', []),
+        )['count', '']
 
-        map_obj = VMF(map_info=map_info)
+        map_obj._read_map_info(map_info)
 
         for c in cam_props:
             if c.name != 'activecamera':
@@ -361,29 +861,54 @@ class VMF:
         for ent in cordons.find_all('cordon'):
             Cordon.parse(map_obj, ent)
 
-        for ent in tree.find_all('Entity'):
-            map_obj.add_ent(
-                Entity.parse(map_obj, ent, hidden=False)
-            )
+        for ent in hidden_ents:
+            map_obj._claim_deferred(ent)
+            map_obj.add_ent(ent)
 
-        # find hidden entities
-        for hidden_ent in tree.find_all('hidden'):
-            for ent in hidden_ent:
-                map_obj.add_ent(
-                    Entity.parse(map_obj, ent, hidden=True)
-                )
-
-        map_spawn = tree.find_key('world', [])
-        if map_spawn is None:
+        if spawn is None:
             # Generate a fake default to parse through
-            map_spawn = Property("world", [])
-        map_obj.spawn = Entity.parse(map_obj, map_spawn)
+            spawn = Entity.parse(map_obj, Property("world", []))
+        else:
+            map_obj._claim_deferred(spawn)
+        map_obj.spawn = spawn
 
         if map_obj.spawn.solids is not None:
             map_obj.brushes = map_obj.spawn.solids
 
         return map_obj
-    pass
+
+    def _parse_deferred(self, tree: Property, hidden=False, lazy=False):
+        """Parse an entity, without claiming any of its IDs yet.
+
+        The entity keeps the IDs it asked for, until _claim_deferred()
+        is called.
+        """
+        id_mans = self.solid_id, self.face_id, self.ent_id, self.group_id
+        self.solid_id = self.face_id = self.ent_id = self.group_id = (
+            _DEFERRED_IDS
+        )
+        try:
+            return Entity.parse(self, tree, hidden=hidden, lazy=lazy)
+        finally:
+            self.solid_id, self.face_id, self.ent_id, self.group_id = id_mans
+
+    def _claim_deferred(self, ent: 'Entity'):
+        """Claim the IDs of an entity from _parse_deferred().
+
+        This claims them in the same order as Entity.parse() does.
+        """
+        for solid in ent.solids:
+            for side in solid.sides:
+                side.id = self.face_id.get_id(side.id)
+            solid.id = self.solid_id.get_id(solid.id)
+        for group in ent.groups:
+            group.id = self.group_id.get_id(group.id)
+        old_id = ent.id
+        ent.id = self.ent_id.get_id(old_id)
+        # Entity() uses the ID for the default logicalpos.
+        if ent.id != old_id and ent.editor['logicalpos'] == (
+                '[0 ' + str(old_id) + ']'):
+            ent.editor['logicalpos'] = '[0 ' + str(ent.id) + ']'
 
     def export(self, dest_file=None, inc_version=True, minimal=False):
         """Serialises the object's contents into a VMF file.
@@ -402,6 +927,8 @@ class VMF:
             ret_string = True
         else:
             ret_string = False
+            # Buffer up the text so the file sees a few large writes.
+            dest_file = _ChunkWriter(dest_file)
 
         if inc_version:
             # Increment this to indicate the map was modified
@@ -466,6 +993,8 @@ class VMF:
             string = dest_file.getvalue()
             dest_file.close()
             return string
+        else:
+            dest_file.flush()
 
     def iter_wbrushes(self, world=True, detail=True) -> Iterator['Solid']:
         """Iterate through all world and detail solids in the map."""
@@ -480,10 +1009,44 @@ class VMF:
         for brush in self.iter_wbrushes(world, detail):
             yield from brush
 
+    def _ent_candidates(self, cond) -> List['Entity']:
+        """Return the entities which might match the given keyvalues.
+
+        This uses the smallest index matching a keyvalue, falling back to
+        a copy of the entity list if none are indexed.
+        The result is in the same order as self.entities.
+        """
+        best = None
+        for key, value in cond.items():
+            if not isinstance(value, str):
+                continue
+            index = self.by_key.get(key.casefold())
+            if index is None:
+                continue
+            ents = index.get(value, ())
+            if best is None or len(ents) < len(best):
+                best = ents
+                if not best:
+                    return []
+        if best is None:
+            return self.entities[:]
+        return self.sort_ents(best)
+
+    def sort_ents(self, ents: Iterable['Entity']) -> List['Entity']:
+        """Sort entities into the order they were added to the map.
+
+        Entities which aren't in the map are skipped.
+        """
+        order = self._ent_order
+        return sorted(
+            [ent for ent in ents if ent in order],
+            key=order.__getitem__,
+        )
+
     def iter_ents(self, **cond):
         """Iterate through entities having the given keyvalue values."""
         items = cond.items()
-        for ent in self.entities[:]:
+        for ent in self._ent_candidates(cond):
             for key, value in items:
                 if key not in ent or ent[key] != value:
                     break
@@ -496,7 +1059,7 @@ class VMF:
         The returned entities must have exactly the given keyvalue values,
         and have keyvalues containing the tags.
         """
-        for ent in self.entities[:]:
+        for ent in self._ent_candidates(vals):
             for key, value in vals.items():
                 if key not in ent or ent[key] != value:
                     break
@@ -518,22 +1081,28 @@ class VMF:
             name = name[1:]
         if wild_end:
             name = name[:-1]
-        for ent in self.entities:
-            for out in ent.outputs:
-                if wild_start:
-                    if wild_end:
-                        if name in out.target:  # blah-target-blah
-                            yield out
-                    else:
-                        if out.target.endswith(name):  # target-blah
-                            yield out
-                else:
-                    if wild_end:
-                        if out.target.startswith(name):  # blah-target
-                            yield out
-                    else:
-                        if out.target == name:  # target
-                            yield out
+
+        order = self._ent_order
+        # The position of each output in its owner's list. Each owner's
+        # outputs are only enumerated once.
+        out_pos = {}  # type: Dict[Output, int]
+        done_owners = set()
+
+        def sort_key(out: Output):
+            """Sort in entity, then output order."""
+            owner = out._owner
+            if owner is None:
+                return -1, 0
+            if owner not in done_owners:
+                done_owners.add(owner)
+                for ind, owner_out in enumerate(owner.outputs):
+                    out_pos[owner_out] = ind
+            return order.get(owner, -1), out_pos[out]
+
+        yield from sorted(
+            self._out_index.find(name, wild_start, wild_end),
+            key=sort_key,
+        )
 
     def make_prism(self, p1, p2, mat='tools/toolsnodraw') -> PrismFace:
         """Create an axis-aligned brush connecting the two points.
@@ -798,6 +1367,14 @@ class Cordon:
 
 class Solid:
     """A single brush, serving as both world brushes and brush entities."""
+    __slots__ = [
+        'map',
+        'sides',
+        'id',
+        'editor',
+        'hidden',
+    ]
+
     def __init__(
             self,
             vmf_file: VMF,
@@ -834,12 +1411,15 @@ class Solid:
         )
 
     @staticmethod
-    def parse(vmf_file, tree, hidden=False):
-        """Parse a Property tree into a Solid object."""
+    def parse(vmf_file, tree, hidden=False, lazy=False):
+        """Parse a Property tree into a Solid object.
+
+        lazy is passed along to Side.parse().
+        """
         solid_id = utils.conv_int(tree["id", '-1'], -1)
         sides = []
         for side in tree.find_all("side"):
-            sides.append(Side.parse(vmf_file, side))
+            sides.append(Side.parse(vmf_file, side, lazy=lazy))
 
         editor = {}
         for v in tree.find_key("editor", []):
@@ -865,38 +1445,35 @@ class Solid:
 
     def export(self, buffer, ind=''):
         """Generate the strings needed to define this brush."""
+        # Build the whole brush, then write it in one go.
+        parts = []
         if self.hidden:
-            buffer.write(ind + 'hidden\n' + ind + '{\n')
+            parts.append(ind + 'hidden\n' + ind + '{\n')
             ind += '\t'
-        buffer.write(ind + 'solid\n')
-        buffer.write(ind + '{\n')
-        buffer.write(ind + '\t"id" "' + str(self.id) + '"\n')
+        parts.append(_indented(_SOLID_TEMPLATE, ind) % self.id)
+        side_ind = ind + '\t'
         for s in self.sides:
-            s.export(buffer, ind + '\t')
-
-        buffer.write(ind + '\teditor\n')
-        buffer.write(ind + '\t{\n')
-        if 'color' in self.editor:
-            buffer.write(
-                ind + '\t\t"color" "' +
-                self.editor['color'] + '"\n')
-        if 'groupid' in self.editor:
-            buffer.write(ind + '\t\t"groupid" "' +
-                         self.editor['groupid'] + '"\n')
-        for vis_id in self.editor.get('visgroup', []):
-            buffer.write(ind + '\t\t"groupid" "' + str(vis_id) + '"\n')
+            s._export_text(parts, side_ind)
+
+        parts.append(_indented(_EDITOR_TEMPLATE, ind))
+        editor = self.editor
+        if 'color' in editor:
+            parts.append(ind + '\t\t"color" "' + editor['color'] + '"\n')
+        if 'groupid' in editor:
+            parts.append(ind + '\t\t"groupid" "' + editor['groupid'] + '"\n')
+        for vis_id in editor.get('visgroup', ()):
+            parts.append(ind + '\t\t"groupid" "' + str(vis_id) + '"\n')
         for key in ('visgroupshown', 'visgroupautoshown', 'cordonsolid'):
-            if key in self.editor:
-                buffer.write(
+            if key in editor:
+                parts.append(
                     ind + '\t\t"' + key + '" "' +
-                    utils.bool_as_int(self.editor[key]) +
+                    utils.bool_as_int(editor[key]) +
                     '"\n'
                     )
-        buffer.write(ind + '\t}\n')
-
-        buffer.write(ind + '}\n')
+        parts.append(ind + '\t}\n' + ind + '}\n')
         if self.hidden:
-            buffer.write(ind[:-1] + '}\n')
+            parts.append(ind[:-1] + '}\n')
+        buffer.write(''.join(parts))
 
     def __str__(self):
         """Return a user-friendly description of our data."""
@@ -936,11 +1513,31 @@ class Solid:
             s.translate(diff)
 
     def localise(self, origin: Vec, angles: Vec=None):
-        """Shift this brush by the given origin/angles."""
+        """Shift this brush by the given origin/angles.
+
+        To move many brushes, localise_many() is faster.
+        """
         for s in self.sides:
             s.localise(origin, angles)
 
 
+# UV axes mostly use the same few numbers, so share those float objects
+# instead of keeping a separate copy for every face.
+_UV_FLOATS = {}  # type: Dict[str, float]
+_UV_FLOATS_MAX = 4096
+
+
+def _uv_float(text: str) -> float:
+    """Convert a UVAxis value to a float, reusing previous results."""
+    try:
+        return _UV_FLOATS[text]
+    except KeyError:
+        value = float(text)
+        if len(_UV_FLOATS) < _UV_FLOATS_MAX:
+            _UV_FLOATS[text] = value
+        return value
+
+
 class UVAxis:
     """Values saved into Side.uaxis and Side.vaxis.
 
@@ -963,11 +1560,11 @@ class UVAxis:
     def parse(value):
         vals = value.split()
         return UVAxis(
-            x=float(vals[0].lstrip('[')),
-            y=float(vals[1]),
-            z=float(vals[2]),
-            offset=float(vals[3].rstrip(']')),
-            scale=float(vals[4]),
+            x=_uv_float(vals[0].lstrip('[')),
+            y=_uv_float(vals[1]),
+            z=_uv_float(vals[2]),
+            offset=_uv_float(vals[3].rstrip(']')),
+            scale=_uv_float(vals[4]),
         )
 
     def copy(self):
@@ -1003,25 +1600,130 @@ class UVAxis:
         return rep + ')'
 
 
+class PlanePoint(Vec):
+    """One of the three points in Side.planes.
+
+    Instead of storing its own values, this reads and writes the face's
+    packed array of coordinates.
+    """
+    __slots__ = ['_coords', '_ind']
+
+    def __init__(self, coords: array, ind: int):
+        self._coords = coords
+        self._ind = ind
+
+    @property
+    def x(self) -> float:
+        return self._coords[self._ind]
+
+    @x.setter
+    def x(self, value: float):
+        self._coords[self._ind] = value
+
+    @property
+    def y(self) -> float:
+        return self._coords[self._ind + 1]
+
+    @y.setter
+    def y(self, value: float):
+        self._coords[self._ind + 1] = value
+
+    @property
+    def z(self) -> float:
+        return self._coords[self._ind + 2]
+
+    @z.setter
+    def z(self, value: float):
+        self._coords[self._ind + 2] = value
+
+
+def _parse_planes(text: str) -> List[Tuple[float, float, float]]:
+    """Parse the plane keyvalue of a side into the three points."""
+    # planes = "(x1 y1 z1) (x2 y2 z2) (x3 y3 z3)"
+    verts = text[1:-1].split(") (")
+    planes = [0, 0, 0]
+    for i, v in enumerate(verts):
+        if i > 3:
+            raise ValueError('Wrong number of solid planes in "' +
+                             text +
+                             '"')
+        planes[i] = utils.parse_vec_str(v)
+        if planes[i] is None:
+            raise ValueError('Invalid planes in "' +
+                             text +
+                             '"!')
+    return planes
+
+
+def _parse_disp(disp_tree: Property) -> dict:
+    """Read the values from a dispinfo block, for Side(disp_data=...)."""
+    disp_data = {
+        'power': disp_tree['power', '4'],
+        'pos': disp_tree['startposition', '4'],
+        'flags': disp_tree['flags', '0'],
+        'elevation': disp_tree['elevation', '0'],
+        'subdiv': disp_tree['subdiv', '0'],
+        'allowed_verts': {},
+    }
+    for prop in disp_tree.find_key('allowed_verts', []):
+        disp_data['allowed_verts'][prop.name] = prop.value
+    for v in _DISP_ROWS:
+        rows = disp_tree[v, []]
+        if len(rows) > 0:
+            rows.sort(key=lambda x: utils.conv_int(x.name[3:]))
+            disp_data[v] = [v.value for v in rows]
+    return disp_data
+
+
+def _lazy_disp_attr(name: str) -> property:
+    """Make a property for one of Side's displacement values.
+
+    The dispinfo block of lazily parsed sides is read the first time
+    any of these are used.
+    """
+    slot = '_' + name
+
+    def getter(self: 'Side'):
+        if self._raw_disp is not None:
+            self._load_disp()
+        return getattr(self, slot)
+
+    def setter(self: 'Side', value):
+        if self._raw_disp is not None:
+            self._load_disp()
+        setattr(self, slot, value)
+
+    return property(getter, setter)
+
+
 class Side:
-    """A brush face."""
+    """A brush face.
+
+    Sides parsed with lazy=True keep the text of their planes, texture
+    axes and displacement data, and only parse each the first time it is
+    used. Any values which are never used are exported unchanged.
+    """
     __slots__ = [
         'map',
-        'planes',
+        '_plane_coords',
+        '_raw_plane',
         'id',
         'lightmap',
         'smooth',
         'mat',
         'ham_rot',
-        'uaxis',
-        'vaxis',
-        'disp_power',
-        'disp_pos',
-        'disp_flags',
-        'disp_elev',
-        'disp_is_subdiv',
-        'disp_allowed_verts',
-        'disp_data',
+        '_uaxis',
+        '_raw_uaxis',
+        '_vaxis',
+        '_raw_vaxis',
+        '_disp_power',
+        '_disp_pos',
+        '_disp_flags',
+        '_disp_elev',
+        '_disp_is_subdiv',
+        '_disp_allowed_verts',
+        '_disp_data',
+        '_raw_disp',
         'is_disp',
     ]
 
@@ -1046,89 +1748,169 @@ class Side:
         :type planes: list of [(int, int, int)]
         """
         self.map = vmf_file
-        self.planes = [Vec(), Vec(), Vec()]
+        self.planes = planes
         self.id = vmf_file.face_id.get_id(des_id)
-        for i, pln in enumerate(planes):
-            self.planes[i] = Vec(x=pln[0], y=pln[1], z=pln[2])
         self.lightmap = lightmap
         self.smooth = smoothing
-        self.mat = mat
+        # Most faces share only a few materials.
+        self.mat = sys.intern(mat)
         self.ham_rot = rotation
         self.uaxis = uaxis or UVAxis(0, 1, 0)
         self.vaxis = vaxis or UVAxis(0, 0, -1)
+        self._raw_disp = None
         if disp_data is not None:
-            self.disp_power = utils.conv_int(
-                disp_data.get('power', '_'), 4)
-            self.disp_pos = Vec.from_str(
-                disp_data.get('pos', '_'))
-            self.disp_flags = utils.conv_int(
-                disp_data.get('flags', '_'))
-            self.disp_elev = utils.conv_float(
-                disp_data.get('elevation', '_'))
-            self.disp_is_subdiv = utils.conv_bool(
-                disp_data.get('subdiv', '_'), False)
-            self.disp_allowed_verts = disp_data.get('allowed_verts', {})
-            self.disp_data = {}
-            for v in _DISP_ROWS:
-                self.disp_data[v] = disp_data.get(v, [])
-            self.is_disp = True
+            self._set_disp(disp_data)
         else:
             self.is_disp = False
 
+    def _set_disp(self, disp_data: dict):
+        """Set the displacement values from a dict of data."""
+        self._disp_power = utils.conv_int(
+            disp_data.get('power', '_'), 4)
+        self._disp_pos = Vec.from_str(
+            disp_data.get('pos', '_'))
+        self._disp_flags = utils.conv_int(
+            disp_data.get('flags', '_'))
+        self._disp_elev = utils.conv_float(
+            disp_data.get('elevation', '_'))
+        self._disp_is_subdiv = utils.conv_bool(
+            disp_data.get('subdiv', '_'), False)
+        self._disp_allowed_verts = disp_data.get('allowed_verts', {})
+        self._disp_data = {}
+        for v in _DISP_ROWS:
+            self._disp_data[v] = disp_data.get(v, [])
+        self.is_disp = True
+
+    def _load_disp(self):
+        """Parse the dispinfo block kept by a lazily parsed side."""
+        disp_tree = self._raw_disp
+        self._raw_disp = None
+        self._set_disp(_parse_disp(disp_tree))
+
+    disp_power = _lazy_disp_attr('disp_power')
+    disp_pos = _lazy_disp_attr('disp_pos')
+    disp_flags = _lazy_disp_attr('disp_flags')
+    disp_elev = _lazy_disp_attr('disp_elev')
+    disp_is_subdiv = _lazy_disp_attr('disp_is_subdiv')
+    disp_allowed_verts = _lazy_disp_attr('disp_allowed_verts')
+    disp_data = _lazy_disp_attr('disp_data')
+
+    @property
+    def _planes(self) -> array:
+        """The array of the 9 plane coordinates.
+
+        For lazily parsed sides, this is parsed when first used.
+        """
+        coords = self._plane_coords
+        if coords is None:
+            self.planes = _parse_planes(self._raw_plane)
+            coords = self._plane_coords
+        return coords
+
+    @property
+    def planes(self) -> List[Vec]:
+        """The three points defining this face.
+
+        These are stored together in one array of 9 coordinates, which is
+        much smaller than three Vecs. Editing the returned points modifies
+        the face.
+        """
+        coords = self._planes
+        return [
+            PlanePoint(coords, 0),
+            PlanePoint(coords, 3),
+            PlanePoint(coords, 6),
+        ]
+
+    @planes.setter
+    def planes(self, planes):
+        coords = array('d', bytes(9 * 8))
+        for i, pln in enumerate(planes):
+            coords[3*i] = float(pln[0])
+            coords[3*i + 1] = float(pln[1])
+            coords[3*i + 2] = float(pln[2])
+        self._plane_coords = coords
+        self._raw_plane = None
+
+    @property
+    def uaxis(self) -> UVAxis:
+        """The texture alignment along the U axis."""
+        axis = self._uaxis
+        if axis is None:
+            axis = self._uaxis = UVAxis.parse(self._raw_uaxis)
+            self._raw_uaxis = None
+        return axis
+
+    @uaxis.setter
+    def uaxis(self, axis: UVAxis):
+        self._uaxis = axis
+        self._raw_uaxis = None
+
+    @property
+    def vaxis(self) -> UVAxis:
+        """The texture alignment along the V axis."""
+        axis = self._vaxis
+        if axis is None:
+            axis = self._vaxis = UVAxis.parse(self._raw_vaxis)
+            self._raw_vaxis = None
+        return axis
+
+    @vaxis.setter
+    def vaxis(self, axis: UVAxis):
+        self._vaxis = axis
+        self._raw_vaxis = None
+
     @staticmethod
-    def parse(vmf_file, tree):
-        """Parse the property tree into a Side object."""
-        # planes = "(x1 y1 z1) (x2 y2 z2) (x3 y3 z3)"
-        verts = tree["plane", "(0 0 0) (0 0 0) (0 0 0)"][1:-1].split(") (")
-        side_id = utils.conv_int(tree["id", '-1'])
-        planes = [0, 0, 0]
-        for i, v in enumerate(verts):
-            if i > 3:
-                raise ValueError('Wrong number of solid planes in "' +
-                                 tree['plane', ''] +
-                                 '"')
-            verts = v.split(" ")
-            if len(verts) == 3:
-                planes[i] = [float(v) for v in verts]
-            else:
-                raise ValueError('Invalid planes in "' +
-                                 tree['plane', ''] +
-                                 '"!')
+    def parse(vmf_file, tree, lazy=False):
+        """Parse the property tree into a Side object.
 
+        If lazy is True, the planes, texture axes and displacement data
+        are kept as text until they are used. Errors in those values
+        will only be raised then.
+        """
+        side_id = utils.conv_int(tree["id", '-1'])
+        plane = tree["plane", "(0 0 0) (0 0 0) (0 0 0)"]
+        uaxis = tree['uaxis', '[0 1 0 0] 0.25']
+        vaxis = tree['vaxis', '[0 0 -1 0] 0.25']
         disp_tree = tree.find_key('dispinfo', [])
-        if len(disp_tree) > 0:
-            disp_data = {
-                'power': disp_tree['power', '4'],
-                'pos': disp_tree['startposition', '4'],
-                'flags': disp_tree['flags', '0'],
-                'elevation': disp_tree['elevation', '0'],
-                'subdiv': disp_tree['subdiv', '0'],
-                'allowed_verts': {},
-            }
-            for prop in disp_tree.find_key('allowed_verts', []):
-                disp_data['allowed_verts'][prop.name] = prop.value
-            for v in _DISP_ROWS:
-                rows = disp_tree[v, []]
-                if len(rows) > 0:
-                    rows.sort(key=lambda x: utils.conv_int(x.name[3:]))
-                    disp_data[v] = [v.value for v in rows]
-        else:
-            disp_data = None
+        rotation = utils.conv_int(tree['rotation', '0'])
+        lightmap = utils.conv_int(tree['lightmapscale', '16'], 16)
+        smoothing = utils.conv_int(tree['smoothing_groups', '0'])
+
+        if lazy:
+            # Skip __init__(), so the default values aren't built.
+            side = Side.__new__(Side)
+            side.map = vmf_file
+            side.id = vmf_file.face_id.get_id(side_id)
+            side.lightmap = lightmap
+            side.smooth = smoothing
+            side.mat = sys.intern(tree['material', ''])
+            side.ham_rot = rotation
+            side._plane_coords = None
+            side._raw_plane = plane
+            side._uaxis = None
+            side._raw_uaxis = uaxis
+            side._vaxis = None
+            side._raw_vaxis = vaxis
+            if len(disp_tree) > 0:
+                side._raw_disp = disp_tree
+                side.is_disp = True
+            else:
+                side._raw_disp = None
+                side.is_disp = False
+            return side
 
         return Side(
             vmf_file,
-            planes=planes,
+            planes=_parse_planes(plane),
             des_id=side_id,
-            disp_data=disp_data,
+            disp_data=_parse_disp(disp_tree) if len(disp_tree) > 0 else None,
             mat=tree['material', ''],
-            uaxis=UVAxis.parse(tree['uaxis', '[0 1 0 0] 0.25']),
-            vaxis=UVAxis.parse(tree['vaxis', '[0 0 -1 0] 0.25']),
-            rotation=utils.conv_int(
-                tree['rotation', '0']),
-            lightmap=utils.conv_int(
-                tree['lightmapscale', '16'], 16),
-            smoothing=utils.conv_int(
-                tree['smoothing_groups', '0']),
+            uaxis=UVAxis.parse(uaxis),
+            vaxis=UVAxis.parse(vaxis),
+            rotation=rotation,
+            lightmap=lightmap,
+            smoothing=smoothing,
         )
 
     def copy(self, des_id=-1, map=None, side_mapping=utils.EmptyMapping):
@@ -1138,7 +1920,8 @@ class Side:
         map is the VMF to add the new side to (defaults to the same map).
         If passed, side_mapping will be updated with a old -> new ID pair.
         """
-        planes = [p.as_tuple() for p in self.planes]
+        planes = self._planes
+        planes = [planes[0:3], planes[3:6], planes[6:9]]
         if self.is_disp:
             disp_data = self.disp_data.copy()
             disp_data['power'] = self.disp_power
@@ -1169,49 +1952,80 @@ class Side:
 
     def export(self, buffer, ind=''):
         """Generate the strings required to define this side in a VMF."""
-        buffer.write(ind + 'side\n')
-        buffer.write(ind + '{\n')
-        buffer.write(ind + '\t"id" "' + str(self.id) + '"\n')
-        pl_str = ('(' + p.join(' ') + ')' for p in self.planes)
-        buffer.write(ind + '\t"plane" "' + ' '.join(pl_str) + '"\n')
-        buffer.write(ind + '\t"material" "' + self.mat + '"\n')
-        buffer.write(ind + '\t"uaxis" "' + str(self.uaxis) + '"\n')
-        buffer.write(ind + '\t"vaxis" "' + str(self.vaxis) + '"\n')
-        buffer.write(ind + '\t"rotation" "' + str(self.ham_rot) + '"\n')
-        buffer.write(ind + '\t"lightmapscale" "' + str(self.lightmap) + '"\n')
-        buffer.write(ind + '\t"smoothing_groups" "' + str(self.smooth) + '"\n')
+        parts = []
+        self._export_text(parts, ind)
+        buffer.write(''.join(parts))
+
+    def _export_text(self, parts: List[str], ind: str):
+        """Append the text for this side to a list of strings."""
+        pl = self._plane_coords
+        uaxis = self._uaxis
+        vaxis = self._vaxis
+        if pl is not None and uaxis is not None and vaxis is not None:
+            parts.append(_indented(_SIDE_TEMPLATE, ind) % (
+                self.id,
+                pl[0], pl[1], pl[2],
+                pl[3], pl[4], pl[5],
+                pl[6], pl[7], pl[8],
+                self.mat,
+                uaxis.x, uaxis.y, uaxis.z, uaxis.offset, uaxis.scale,
+                vaxis.x, vaxis.y, vaxis.z, vaxis.offset, vaxis.scale,
+                self.ham_rot,
+                self.lightmap,
+                self.smooth,
+            ))
+        else:
+            # Values which were never parsed are written out unchanged.
+            parts.append(_indented(_LAZY_SIDE_TEMPLATE, ind) % (
+                self.id,
+                self._raw_plane if pl is None else _PLANE_TEMPLATE % (
+                    pl[0], pl[1], pl[2],
+                    pl[3], pl[4], pl[5],
+                    pl[6], pl[7], pl[8],
+                ),
+                self.mat,
+                self._raw_uaxis if uaxis is None else _UV_TEMPLATE % (
+                    uaxis.x, uaxis.y, uaxis.z, uaxis.offset, uaxis.scale,
+                ),
+                self._raw_vaxis if vaxis is None else _UV_TEMPLATE % (
+                    vaxis.x, vaxis.y, vaxis.z, vaxis.offset, vaxis.scale,
+                ),
+                self.ham_rot,
+                self.lightmap,
+                self.smooth,
+            ))
         if self.is_disp:
-            buffer.write(ind + '\tdispinfo\n')
-            buffer.write(ind + '\t{\n')
+            parts.append(ind + '\tdispinfo\n')
+            parts.append(ind + '\t{\n')
 
-            buffer.write(ind + '\t\t"power" "' + str(self.disp_power) + '"\n')
-            buffer.write(ind + '\t\t"startposition" "[' +
+            parts.append(ind + '\t\t"power" "' + str(self.disp_power) + '"\n')
+            parts.append(ind + '\t\t"startposition" "[' +
                          self.disp_pos.join(' ') +
                          ']"\n')
-            buffer.write(ind + '\t\t"flags" "' + str(self.disp_flags) +
+            parts.append(ind + '\t\t"flags" "' + str(self.disp_flags) +
                          '"\n')
-            buffer.write(ind + '\t\t"elevation" "' + str(self.disp_elev) +
+            parts.append(ind + '\t\t"elevation" "' + str(self.disp_elev) +
                          '"\n')
-            buffer.write(ind + '\t\t"subdiv" "' +
+            parts.append(ind + '\t\t"subdiv" "' +
                          utils.bool_as_int(self.disp_is_subdiv) +
                          '"\n')
             for v in _DISP_ROWS:
                 if len(self.disp_data[v]) > 0:
-                    buffer.write(ind + '\t\t' + v + '\n')
-                    buffer.write(ind + '\t\t{\n')
+                    parts.append(ind + '\t\t' + v + '\n')
+                    parts.append(ind + '\t\t{\n')
                     for i, data in enumerate(self.disp_data[v]):
-                        buffer.write(ind + '\t\t\t"row' + str(i) +
+                        parts.append(ind + '\t\t\t"row' + str(i) +
                                      '" "' + data +
                                      '"\n')
-                    buffer.write(ind + '\t\t}\n')
+                    parts.append(ind + '\t\t}\n')
             if len(self.disp_allowed_verts) > 0:
-                buffer.write(ind + '\t\tallowed_verts\n')
-                buffer.write(ind + '\t\t{\n')
+                parts.append(ind + '\t\tallowed_verts\n')
+                parts.append(ind + '\t\t{\n')
                 for k, v in self.disp_allowed_verts.items():
-                    buffer.write(ind + '\t\t\t"' + k + '" "' + v + '"\n')
-                buffer.write(ind + '\t\t}\n')
-            buffer.write(ind + '\t}\n')
-        buffer.write(ind + '}\n')
+                    parts.append(ind + '\t\t\t"' + k + '" "' + v + '"\n')
+                parts.append(ind + '\t\t}\n')
+            parts.append(ind + '\t}\n')
+        parts.append(ind + '}\n')
 
     def __str__(self):
         """Dump a user-friendly representation of the side."""
@@ -1228,12 +2042,11 @@ class Side:
 
     def get_bbox(self) -> Tuple[Vec, Vec]:
         """Generate the highest and lowest points these planes form."""
-        bbox_max = self.planes[0].copy()
-        bbox_min = self.planes[0].copy()
-        for v in self.planes[1:]:
-            bbox_max.max(v)
-            bbox_min.min(v)
-        return bbox_min, bbox_max
+        x1, y1, z1, x2, y2, z2, x3, y3, z3 = self._planes
+        return (
+            Vec(min(x1, x2, x3), min(y1, y2, y3), min(z1, z2, z3)),
+            Vec(max(x1, x2, x3), max(y1, y2, y3), max(z1, z2, z3)),
+        )
 
     def get_origin(self) -> Vec:
         """Calculates a vector representing the exact center of this plane."""
@@ -1246,8 +2059,15 @@ class Side:
 
         - A tuple can be passed in instead if desired.
         """
-        for p in self.planes:
-            p += diff
+        if isinstance(diff, Vec):
+            diff_x, diff_y, diff_z = diff.x, diff.y, diff.z
+        else:
+            diff_x, diff_y, diff_z = diff
+        coords = self._planes
+        for i in (0, 3, 6):
+            coords[i] += diff_x
+            coords[i + 1] += diff_y
+            coords[i + 2] += diff_z
 
         u_axis = Vec(self.uaxis.x, self.uaxis.y, self.uaxis.z)
         v_axis = Vec(self.vaxis.x, self.vaxis.y, self.vaxis.z)
@@ -1291,9 +2111,7 @@ class Side:
          This is for use in texture randomisation.
          """
         return (
-            self.planes[0].join(' ') +
-            self.planes[1].join(' ') +
-            self.planes[2].join(' ')
+            '{:g} {:g} {:g}{:g} {:g} {:g}{:g} {:g} {:g}'.format(*self._planes)
             )
 
     def normal(self) -> Vec:
@@ -1303,8 +2121,9 @@ class Side:
         # The three points are in clockwise order, so we need the first and last
         # starting from the center point. Then calculate in reverse to get the
         # normal in the correct direction.
-        point_1 = self.planes[0] - self.planes[1]
-        point_2 = self.planes[2] - self.planes[1]
+        x1, y1, z1, x2, y2, z2, x3, y3, z3 = self._planes
+        point_1 = Vec(x1 - x2, y1 - y2, z1 - z2)
+        point_2 = Vec(x3 - x2, y3 - y2, z3 - z2)
 
         return point_2.cross(point_1).norm()
 
@@ -1342,15 +2161,17 @@ class Entity:
             hidden=False,
             groups=()):
         self.map = vmf_file
-        self.keys = {
+        # Parsed versions of origin/angles - see origin_vec etc.
+        self._vec_cache = {}  # type: Dict[str, object]
+        self.keys = KeyValueDict(
             # Ensure all values are strings. This allows passing ints and Vecs
             # normally.
-            k: str(v)
+            (k, str(v))
             for k, v in
             keys.items()
-        }
+        )
         self.fixup = EntityFixup(fixup)
-        self.outputs = outputs or []  # type: List[Output]
+        self.outputs = outputs or []
         self.solids = solids or []  # type: List[Solid]
         self.id = vmf_file.ent_id.get_id(ent_id)
         self.hidden = hidden
@@ -1368,11 +2189,9 @@ class Entity:
 
     def copy(self, des_id=-1, map=None, side_mapping=utils.EmptyMapping):
         """Duplicate this entity entirely, including solids and outputs."""
-        new_keys = {}
+        new_keys = self.keys.copy()
         new_fixup = self.fixup.copy_values()
         new_editor = {}
-        for key, value in self.keys.items():
-            new_keys[key] = value
 
         for key, value in self.editor.items():
             if key != 'visgroup':
@@ -1401,8 +2220,11 @@ class Entity:
         )
 
     @staticmethod
-    def parse(vmf_file, tree_list: Property, hidden=False):
-        """Parse a property tree into an Entity object."""
+    def parse(vmf_file, tree_list: Property, hidden=False, lazy=False):
+        """Parse a property tree into an Entity object.
+
+        If lazy is True, the sides of brushes are parsed lazily.
+        """
         ent_id = -1
         solids = []
         keys = {}
@@ -1427,13 +2249,13 @@ class Entity:
                     value = vals[1]
                     fixup.append(FixupTuple(var, value, int(index)))
             elif name == "solid" and item.has_children():
-                solids.append(Solid.parse(vmf_file, item))
+                solids.append(Solid.parse(vmf_file, item, lazy=lazy))
             elif name == "connections" and item.has_children():
                 for out in item:
                     outputs.append(Output.parse(out))
             elif name == "hidden" and item.has_children():
                     solids.extend(
-                        Solid.parse(vmf_file, br, hidden=True)
+                        Solid.parse(vmf_file, br, hidden=True, lazy=lazy)
                         for br in
                         item
                     )
@@ -1486,68 +2308,112 @@ class Entity:
         ent_name is the key used for the item's block, which is used to allow
         generating the MapSpawn data block from the entity object.
         """
-
+        parts = []
         if self.hidden:
-            buffer.write(ind + 'hidden\n' + ind + '{\n')
+            parts.append(ind + 'hidden\n' + ind + '{\n')
             ind += '\t'
 
-        buffer.write(ind + ent_name + '\n')
-        buffer.write(ind + '{\n')
-        buffer.write(ind + '\t"id" "' + str(self.id) + '"\n')
+        parts.append(_indented(_ENT_TEMPLATE, ind) % (ent_name, self.id))
+        key_line = ind + '\t"%s" "%s"\n'
         for key, value in sorted(self.keys.items(), key=operator.itemgetter(0)):
-            buffer.write(
-                ind +
-                '\t"{}" "{!s}"\n'.format(key, value)
-            )
+            parts.append(key_line % (key, value))
 
-        self.fixup.export(buffer, ind)
+        self.fixup._export_text(parts, ind)
 
         if self.is_brush():
+            # Brushes are written individually, so the chunks stay small
+            # for worldspawn.
+            buffer.write(''.join(parts))
+            parts.clear()
             for s in self.solids:
                 s.export(buffer, ind=ind+'\t')
         if len(self.outputs) > 0:
-            buffer.write(ind + '\tconnections\n')
-            buffer.write(ind + '\t{\n')
+            parts.append(ind + '\tconnections\n' + ind + '\t{\n')
             for o in self.outputs:
-                o.export(buffer, ind=ind+'\t\t')
-            buffer.write(ind + '\t}\n')
-
-        buffer.write(ind + '\teditor\n')
-        buffer.write(ind + '\t{\n')
-        if 'color' in self.editor:
-            buffer.write(
-                ind +
-                '\t\t"color" "' +
-                self.editor['color'] +
-                '"\n'
-            )
-        if 'groupid' in self.editor:
-            buffer.write(
-                ind +
-                '\t\t"groupid" "' +
-                self.editor['groupid'] +
-                '"\n'
-            )
-        if 'visgroup' in self.editor:
-            for vis_id in self.editor['visgroup']:
-                buffer.write(ind + '\t\t"groupid" "' + str(vis_id) + '"\n')
+                o._export_text(parts, ind+'\t\t')
+            parts.append(ind + '\t}\n')
+
+        parts.append(_indented(_EDITOR_TEMPLATE, ind))
+        editor = self.editor
+        if 'color' in editor:
+            parts.append(ind + '\t\t"color" "' + editor['color'] + '"\n')
+        if 'groupid' in editor:
+            parts.append(ind + '\t\t"groupid" "' + editor['groupid'] + '"\n')
+        if 'visgroup' in editor:
+            for vis_id in editor['visgroup']:
+                parts.append(ind + '\t\t"groupid" "' + str(vis_id) + '"\n')
         for key in ('visgroupshown', 'visgroupautoshown'):
-            if key in self.editor:
-                buffer.write(
+            if key in editor:
+                parts.append(
                     ind + '\t\t"' + key + '" "' +
-                    utils.bool_as_int(self.editor[key]) + '"\n'
+                    utils.bool_as_int(editor[key]) + '"\n'
                 )
         for key in ('logicalpos', 'comments'):
-            if key in self.editor:
-                buffer.write(
+            if key in editor:
+                parts.append(
                     ind +
-                    '\t\t"{}" "{}"\n'.format(key, self.editor[key])
+                    '\t\t"{}" "{}"\n'.format(key, editor[key])
                 )
-        buffer.write(ind + '\t}\n')
-
-        buffer.write(ind + '}\n')
+        parts.append(ind + '\t}\n' + ind + '}\n')
         if self.hidden:
-            buffer.write(ind[:-1] + '}\n')
+            parts.append(ind[:-1] + '}\n')
+        buffer.write(''.join(parts))
+
+    @property
+    def origin_vec(self) -> Vec:
+        """The origin keyvalue, parsed into a Vec.
+
+        This is cached until the keyvalue changes. A copy is returned, so
+        it can be freely modified. Setting this sets the keyvalue.
+        """
+        try:
+            origin = self._vec_cache['origin']
+        except KeyError:
+            origin = self._vec_cache['origin'] = Vec.from_str(self['origin'])
+        return origin.copy()
+
+    @origin_vec.setter
+    def origin_vec(self, origin: Vec):
+        self['origin'] = origin.join(' ')
+
+    @property
+    def angles_vec(self) -> Vec:
+        """The angles keyvalue, parsed into a Vec.
+
+        This is cached until the keyvalue changes. A copy is returned, so
+        it can be freely modified. Setting this sets the keyvalue.
+        """
+        try:
+            angles = self._vec_cache['angles']
+        except KeyError:
+            angles = self._vec_cache['angles'] = Vec.from_str(self['angles'])
+        return angles.copy()
+
+    @angles_vec.setter
+    def angles_vec(self, angles: Vec):
+        self['angles'] = angles.join(' ')
+
+    @property
+    def rotation(self):
+        """The rotation matrices for the angles keyvalue.
+
+        Use this with Vec.rotate_by_matrix() - that gives the same result
+        as vec.rotate_by_str(ent['angles']). This is cached until the
+        keyvalue changes.
+        """
+        try:
+            return self._vec_cache['rotation']
+        except KeyError:
+            pass
+        angles = self._vec_cache.get('angles')
+        if angles is None:
+            angles = self._vec_cache['angles'] = Vec.from_str(self['angles'])
+        matrices = self._vec_cache['rotation'] = Vec.rotation_matrix(
+            angles.x,
+            angles.y,
+            angles.z,
+        )
+        return matrices
 
     def sides(self):
         """Iterate through all our brush sides."""
@@ -1556,6 +2422,32 @@ class Entity:
                 for face in solid:
                     yield face
 
+    @property
+    def outputs(self) -> List['Output']:
+        """The outputs on this entity.
+
+        This list keeps the map's output index up to date.
+        """
+        return self._outputs
+
+    @outputs.setter
+    def outputs(self, outputs: Iterable['Output']):
+        try:
+            old_outputs = self._outputs
+        except AttributeError:
+            pass
+        else:
+            old_outputs._removed(old_outputs)
+            old_outputs.ent = None
+        self._outputs = _OutputList(self)
+        self._outputs.extend(outputs)
+
+    def _out_index(self) -> Optional[_OutputIndex]:
+        """Return the map's output index, if we're in the map."""
+        if self in self.map._ent_order:
+            return self.map._out_index
+        return None
+
     def add_out(self, *outputs):
         """Add the outputs to our list."""
         self.outputs.extend(outputs)
@@ -1601,12 +2493,7 @@ class Entity:
         """
         if isinstance(key, tuple):
             key, default = key
-        key = key.casefold()
-        for k in self.keys:
-            if k.casefold() == key:
-                return self.keys[k]
-        else:
-            return default
+        return self.keys.get(key, default)
 
     def __setitem__(self, key, val):
         """Allow using [] syntax to save a keyvalue.
@@ -1614,67 +2501,52 @@ class Entity:
         - It is case-insensitive, so it will overwrite a key which only
           differs by case.
         """
+        val = str(val)
+        orig_val = self.keys.get(key)
+        self.keys[key] = val
         key_fold = key.casefold()
-        for k in self.keys:
-            if k.casefold() == key_fold:
-                # Check case-insensitively for this key first
-                orig_val = self.keys.get(k)
-                self.keys[k] = str(val)
-                break
-        else:
-            orig_val = self.keys.get(key)
-            self.keys[key] = str(val)
 
-        # Update the by_class/target dicts with our new value
-        if key_fold == 'classname':
-            with suppress(KeyError):
-                self.map.by_class[orig_val].remove(self)
-            self.map.by_class[val].add(self)
-        elif key_fold == 'targetname':
+        if key_fold in _VEC_CACHE_KEYS and self._vec_cache:
+            for cache_key in _VEC_CACHE_KEYS[key_fold]:
+                self._vec_cache.pop(cache_key, None)
+
+        # Update the by_class/target/key dicts with our new value
+        index = self.map.by_key.get(key_fold)
+        if index is not None:
             with suppress(KeyError):
-                self.map.by_target[orig_val].remove(self)
-            self.map.by_target[val].add(self)
+                index[orig_val].remove(self)
+            index[val].add(self)
 
     def __delitem__(self, key):
         key = key.casefold()
-        if key == 'targetname':
-            with suppress(KeyError):
-                self.map.by_target[
-                    self.keys.get('targetname', None)
-                ].remove(self)
-            self.map.by_target[None].add(self)
+        if key in _VEC_CACHE_KEYS:
+            for cache_key in _VEC_CACHE_KEYS[key]:
+                self._vec_cache.pop(cache_key, None)
 
-        if key == 'classname':
+        index = self.map.by_key.get(key)
+        if index is not None:
             with suppress(KeyError):
-                self.map.by_class[
-                    self.keys.get('classname', None)
-                ].remove(self)
-            self.map.by_class[None].add(self)
+                index[self[key, None]].remove(self)
+            index[None].add(self)
 
-        for k in self.keys:
-            if k.casefold() == key:
-                del self.keys[k]
-                break
+        with suppress(KeyError):
+            del self.keys[key]
 
     get = __getitem__
 
     def clear_keys(self):
         """Remove all keyvalues from an item."""
-        # Delete these so the .by_class/name values are cleared.
-        del self['targetname']
-        del self['classname']
+        # Delete these so the .by_class/name/key values are cleared.
+        for key in list(self.map.by_key):
+            del self[key]
         self.keys.clear()
+        self._vec_cache.clear()
         # Clear $fixup as well.
         self.fixup.clear()
 
     def __contains__(self, key: str):
         """Determine if a value exists for the given key."""
-        key = key.casefold()
-        for k in self.keys:
-            if k.casefold() == key:
-                return True
-        else:
-            return False
+        return key in self.keys
 
     get_key = __contains__
 
@@ -1831,11 +2703,17 @@ class EntityFixup:
 
     def export(self, buffer, ind):
         """Export all the replace values into the VMF."""
+        parts = []
+        self._export_text(parts, ind)
+        buffer.write(''.join(parts))
+
+    def _export_text(self, parts: List[str], ind: str):
+        """Append the replace values to a list of strings."""
         if len(self._fixup):
             for (key, value, index) in sorted(
                     self._fixup.values(), key=operator.attrgetter('id')):
                 # When exporting, pad with zeros if needed
-                buffer.write(ind + '\t"replace{:02}" "${} {}"\n'.format(
+                parts.append(ind + '\t"replace{:02}" "${} {}"\n'.format(
                     index, key, value))
 
     def __str__(self):
@@ -1913,6 +2791,100 @@ class EntityGroup:
 
 
 
+class _OutputList(list):
+    """The list of outputs on an entity.
+
+    This tracks which entity owns each output, and updates the map's output
+    index when they're added or removed. The entity is only weakly
+    referenced, so it isn't kept alive by a reference cycle.
+    """
+    __slots__ = ['_ent']
+
+    def __init__(self, ent: Entity):
+        super().__init__()
+        self.ent = ent
+
+    @property
+    def ent(self) -> Optional[Entity]:
+        """The entity these outputs are on, or None."""
+        return None if self._ent is None else self._ent()
+
+    @ent.setter
+    def ent(self, ent: Optional[Entity]):
+        self._ent = None if ent is None else weakref.ref(ent)
+
+    def _added(self, outputs: Iterable['Output']):
+        ent = self.ent
+        if ent is None:
+            return
+        index = ent._out_index()
+        for out in outputs:
+            out._owner = ent
+            if index is not None:
+                index.add(out)
+
+    def _removed(self, outputs: Iterable['Output']):
+        ent = self.ent
+        if ent is None:
+            return
+        index = ent._out_index()
+        for out in outputs:
+            # If the output was moved to another entity, it's still in
+            # the index for that one.
+            if out._owner is ent:
+                out._owner = None
+                if index is not None:
+                    index.discard(out)
+
+    def append(self, out: 'Output'):
+        super().append(out)
+        self._added((out,))
+
+    def extend(self, outputs: Iterable['Output']):
+        outputs = list(outputs)
+        super().extend(outputs)
+        self._added(outputs)
+
+    def __iadd__(self, outputs: Iterable['Output']):
+        self.extend(outputs)
+        return self
+
+    def insert(self, ind: int, out: 'Output'):
+        super().insert(ind, out)
+        self._added((out,))
+
+    def remove(self, out: 'Output'):
+        super().remove(out)
+        if out not in self:
+            self._removed((out,))
+
+    def pop(self, ind=-1) -> 'Output':
+        out = super().pop(ind)
+        if out not in self:
+            self._removed((out,))
+        return out
+
+    def clear(self):
+        outputs = self[:]
+        super().clear()
+        self._removed(outputs)
+
+    def __setitem__(self, ind, value):
+        if isinstance(ind, slice):
+            old = self[ind]
+            value = list(value)
+        else:
+            old = [self[ind]]
+        super().__setitem__(ind, value)
+        self._removed([out for out in old if out not in self])
+        self._added(value if isinstance(ind, slice) else (value,))
+
+    def __delitem__(self, ind):
+        old = self[ind] if isinstance(ind, slice) else [self[ind]]
+        super().__delitem__(ind)
+        self._removed([out for out in old if out not in self])
+
+
 class Output:
     """An output from one entity pointing to another.
 
@@ -1938,13 +2910,14 @@ class Output:
     __slots__ = [
         'output',
         'inst_out',
-        'target',
+        '_target',
         'input',
         'inst_in',
         'params',
         'delay',
         'times',
         'comma_sep',
+        '_owner_ref',  # A weakref to the entity we're on, if any.
     ]
 
     def __init__(
@@ -1961,9 +2934,10 @@ class Output:
         inst_in: str=None,
         comma_sep=False
     ):
+        self._owner_ref = None
         self.output = out
         self.inst_out = inst_out
-        self.target = targ
+        self._target = targ
         self.input = inp
         self.inst_in = inst_in
         self.params = param
@@ -1971,6 +2945,33 @@ class Output:
         self.times = 1 if only_once else times
         self.comma_sep = comma_sep
 
+    @property
+    def _owner(self) -> Optional[Entity]:
+        """The entity this output is on, if any."""
+        ref = self._owner_ref
+        return None if ref is None else ref()
+
+    @_owner.setter
+    def _owner(self, owner: Optional[Entity]):
+        self._owner_ref = None if owner is None else weakref.ref(owner)
+
+    @property
+    def target(self) -> str:
+        """The entity this output triggers."""
+        return self._target
+
+    @target.setter
+    def target(self, targ: str):
+        # Move ourselves to the new name in the map's output index.
+        owner = self._owner
+        index = None if owner is None else owner._out_index()
+        if index is not None:
+            index.discard(self)
+            self._target = targ
+            index.add(self)
+        else:
+            self._target = targ
+
     @property
     def only_once(self):
         """Check if the output is active only once."""
@@ -2076,12 +3077,16 @@ class Output:
 
     def export(self, buffer, ind=''):
         """Generate the text required to define this output in the VMF."""
-        buffer.write(ind + '"' + self.exp_out())
+        parts = []
+        self._export_text(parts, ind)
+        buffer.write(''.join(parts))
 
+    def _export_text(self, parts: List[str], ind: str):
+        """Append the text for this output to a list of strings."""
         sep = ',' if self.comma_sep else OUTPUT_SEP
 
-        buffer.write(
-            '" "' +
+        parts.append(
+            ind + '"' + self.exp_out() + '" "' +
             sep.join((
                 self.target,
                 self.exp_in(),
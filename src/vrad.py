@@ -357,8 +357,7 @@ def gen_sound_manifest(additional, excludes):
 
     inject_loc = os.path.join('bee2', 'inject', 'soundscript_manifest.txt')
     with open(inject_loc, 'w') as f:
-        for line in new_props.export():
-            f.write(line)
+        new_props.export_to(f)
     LOGGER.info('Written new soundscripts_manifest..')
 
 
@@ -398,8 +397,7 @@ def gen_part_manifest(additional):
 
     inject_loc = os.path.join('bee2', 'inject', 'particles_manifest.txt')
     with open(inject_loc, 'w') as f:
-        for line in new_props.export():
-            f.write(line)
+        new_props.export_to(f)
 
     LOGGER.info('Written new particles_manifest..')
 